@@ -1,8 +1,14 @@
 """Main FastAPI application."""
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routes import upload, chat
+from app.routes import upload, documents, chat, diagnostics, metrics
 from app.models.schemas import HealthResponse
+from app.services.ingestion import get_ingestion_pool
+from app.services.llm_clients import get_provider_clients
+from app.services.generator import get_response_generator
+from app.utils.config import METRICS_ENABLED, SERVER_TIMING_ENABLED
+from app.utils.metrics import MetricsMiddleware
+from app.utils.pdf_loader import shutdown_pdf_workers
 
 # Create FastAPI app
 app = FastAPI(
@@ -18,11 +24,45 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
+# Per-stage timings: Server-Timing header and latency histograms
+if METRICS_ENABLED or SERVER_TIMING_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(upload.router, prefix="/api", tags=["Upload"])
+app.include_router(documents.router, prefix="/api", tags=["Documents"])
 app.include_router(chat.router, prefix="/api", tags=["Chat"])
+app.include_router(diagnostics.router, prefix="/api", tags=["Diagnostics"])
+if METRICS_ENABLED:
+    app.include_router(metrics.router, tags=["Diagnostics"])
+
+
+@app.on_event("startup")
+def start_ingestion_pool():
+    """Start background ingestion workers (resumes jobs left by a restart)."""
+    get_ingestion_pool().start()
+
+
+@app.on_event("startup")
+def resolve_llm_model():
+    """Resolve the Gemini model once, off the request path."""
+    get_response_generator().warm_up()
+
+
+@app.on_event("shutdown")
+def shutdown_ingestion_pool():
+    """Let in-flight ingestions finish before the worker exits."""
+    get_ingestion_pool().shutdown(wait=True)
+    shutdown_pdf_workers()
+
+
+@app.on_event("shutdown")
+async def close_provider_clients():
+    """Close pooled LLM/embedding provider connections."""
+    await get_provider_clients().aclose()
 
 
 @app.get("/health", response_model=HealthResponse)
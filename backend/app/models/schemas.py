@@ -1,24 +1,85 @@
 """Pydantic schemas for request/response models."""
-from pydantic import BaseModel
+from datetime import datetime
+from pydantic import BaseModel, Field
 from typing import Optional, List
 
 
+class SearchFilterRequest(BaseModel):
+    """Metadata filter of a chat request; every field that is set must match."""
+    filenames: Optional[List[str]] = None  # Chunks of any of these documents
+    uploaded_after: Optional[datetime] = None  # ISO 8601 or Unix time
+    uploaded_before: Optional[datetime] = None
+    page_from: Optional[int] = Field(None, ge=1)  # Chunks overlapping this page range
+    page_to: Optional[int] = Field(None, ge=1)
+    tags: Optional[List[str]] = None  # Chunks of documents carrying all of these tags
+
+
 class ChatRequest(BaseModel):
     """Request model for chat endpoint."""
     question: str
+    filters: Optional[SearchFilterRequest] = None  # Restrict retrieval to matching chunks
+    nprobe: Optional[int] = Field(None, ge=1)  # FAISS IVF lists to probe
+    ef_search: Optional[int] = Field(None, ge=1)  # FAISS HNSW search breadth
+    vector_weight: Optional[float] = Field(None, ge=0)  # Hybrid fusion weight of dense results
+    keyword_weight: Optional[float] = Field(None, ge=0)  # Hybrid fusion weight of BM25 results
+
+
+class ChatBatchRequest(BaseModel):
+    """Request model for batch chat endpoint."""
+    questions: List[str] = Field(..., min_length=1)
+    filters: Optional[SearchFilterRequest] = None  # Restrict retrieval to matching chunks
+    nprobe: Optional[int] = Field(None, ge=1)  # FAISS IVF lists to probe
+    ef_search: Optional[int] = Field(None, ge=1)  # FAISS HNSW search breadth
+    vector_weight: Optional[float] = Field(None, ge=0)  # Hybrid fusion weight of dense results
+    keyword_weight: Optional[float] = Field(None, ge=0)  # Hybrid fusion weight of BM25 results
+    concurrency: Optional[int] = Field(None, ge=1)  # Generations in flight (default CHAT_BATCH_CONCURRENCY)
 
 
 class ChatResponse(BaseModel):
     """Response model for chat endpoint."""
     answer: str
     sources: Optional[List[dict]] = None
+    cached: bool = False  # True when served from the semantic answer cache
+    context: Optional[dict] = None  # Prompt context stats: chunks merged/deduplicated, tokens before/after/saved
 
 
 class UploadResponse(BaseModel):
     """Response model for upload endpoint."""
     message: str
     filename: str
+    job_id: Optional[str] = None  # None when the upload was skipped
+    status: str  # queued, or skipped (same content already indexed)
+    chunks_count: Optional[int] = None
+
+
+class JobStatusResponse(BaseModel):
+    """Response model for ingestion job status endpoint."""
+    job_id: str
+    filename: str
+    status: str  # queued, running, completed, failed
+    stage: str  # queued, extract, chunk, embed, index, done
+    progress_done: int
+    progress_total: int
+    chunks_count: Optional[int] = None
+    error: Optional[str] = None
+    created_at: float
+    updated_at: float
+
+
+class DocumentResponse(BaseModel):
+    """Response model for an indexed document."""
+    id: str
+    filename: str
     chunks_count: int
+    content_hash: Optional[str] = None  # None for documents indexed before hashes were recorded
+    created_at: float
+    updated_at: float
+
+
+class DocumentListResponse(BaseModel):
+    """Response model for the document listing endpoint."""
+    documents: List[DocumentResponse]
+    total: int
 
 
 class HealthResponse(BaseModel):
@@ -1,20 +1,89 @@
 """Chat route for handling questions and generating responses."""
-from fastapi import APIRouter, HTTPException
-from app.models.schemas import ChatRequest, ChatResponse
+import json
+from typing import Dict, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from app.models.schemas import ChatRequest, ChatResponse, ChatBatchRequest, SearchFilterRequest
+from app.routes.dependencies import get_tenant
 from app.services.vectorstore import get_vector_store
-from app.services.generator import get_response_generator
+from app.services.generator import (
+    get_response_generator, format_sources, NO_DOCUMENTS_ANSWER, NO_RESULTS_ANSWER
+)
+from app.services.answer_cache import get_answer_cache
+from app.services.batch import answer_batch
+from app.services.search_filter import SearchFilter
+from app.utils.config import CHAT_BATCH_MAX_QUESTIONS
+from app.utils.context_builder import build_context
+from app.utils.metrics import span
 
 router = APIRouter()
 
+def _sse(event: str, data: Dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _search_filter(filters: Optional[SearchFilterRequest]) -> Optional[SearchFilter]:
+    """Convert a request filter to a ``SearchFilter`` (None if absent or empty)."""
+    if filters is None:
+        return None
+    search_filter = SearchFilter(
+        filenames=filters.filenames,
+        uploaded_after=filters.uploaded_after.timestamp() if filters.uploaded_after else None,
+        uploaded_before=filters.uploaded_before.timestamp() if filters.uploaded_before else None,
+        page_from=filters.page_from,
+        page_to=filters.page_to,
+        tags=filters.tags
+    )
+    return None if search_filter.is_empty else search_filter
+
+
+async def _retrieve(request: ChatRequest, tenant: str):
+    """
+    Embed the question, check the answer cache and search the tenant's index, without blocking the loop.
+    
+    Returns:
+        Tuple (vector_store, query_embedding, cached_answer, relevant_docs,
+        cache_scope); query_embedding is None when no documents are stored
+    """
+    search_filter = _search_filter(request.filters)
+    scope = search_filter.key() if search_filter is not None else None
+    # Opening a tenant's index for the first time reads it from disk
+    vector_store = await run_in_threadpool(get_vector_store, tenant)
+    if vector_store.count() == 0:
+        return vector_store, None, None, [], scope
+    
+    # Embed the question once (LRU-cached) and reuse it for both caches
+    query_embedding = await vector_store.embedding_service.aembed_query(request.question)
+    
+    # Serve near-duplicate questions (searched with the same filter) from the semantic answer cache
+    cached = get_answer_cache().lookup(query_embedding, vector_store.version, scope, tenant)
+    if cached is not None:
+        return vector_store, query_embedding, cached, [], scope
+    
+    # Index search and SQLite lookups are CPU/disk bound: run them in a worker thread
+    relevant_docs = await run_in_threadpool(
+        vector_store.search,
+        request.question,
+        query_embedding=query_embedding,
+        nprobe=request.nprobe,
+        ef_search=request.ef_search,
+        filters=search_filter,
+        vector_weight=request.vector_weight,
+        keyword_weight=request.keyword_weight
+    )
+    return vector_store, query_embedding, None, relevant_docs, scope
+
 
 @router.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, tenant: str = Depends(get_tenant)):
     """
     Process a user question and generate a response using RAG.
     
     Args:
         request: ChatRequest with user question
-        
+        tenant: Tenant whose documents are searched (``X-Tenant-ID`` header)
+    
     Returns:
         ChatResponse with answer and sources
     """
@@ -23,53 +92,150 @@ async def chat(request: ChatRequest):
     
     try:
         # Get vector store and search for relevant documents
-        vector_store = get_vector_store()
+        vector_store, query_embedding, cached, relevant_docs, scope = await _retrieve(request, tenant)
         
         # Check if vector store has any documents
-        if vector_store.use_chroma:
-            # For Chroma, we can check collection count
-            collection = vector_store.collection
-            if collection.count() == 0:
-                return ChatResponse(
-                    answer="No documents have been uploaded yet. Please upload a PDF document first.",
-                    sources=[]
-                )
-        else:
-            # For FAISS, check if index has vectors
-            if vector_store.index.ntotal == 0:
-                return ChatResponse(
-                    answer="No documents have been uploaded yet. Please upload a PDF document first.",
-                    sources=[]
-                )
+        if query_embedding is None:
+            return ChatResponse(answer=NO_DOCUMENTS_ANSWER, sources=[])
         
-        # Search for relevant documents
-        relevant_docs = vector_store.search(request.question)
+        if cached is not None:
+            return ChatResponse(answer=cached["answer"], sources=cached["sources"], cached=True)
         
         if not relevant_docs:
-            return ChatResponse(
-                answer="I couldn't find relevant information to answer your question. Please try rephrasing your question or upload more documents.",
-                sources=[]
-            )
+            return ChatResponse(answer=NO_RESULTS_ANSWER, sources=[])
+        
+        # Merge overlapping chunks, drop duplicates and fit the token budget
+        context, context_stats = build_context(relevant_docs)
         
-        # Generate response using LLM
+        # Generate response using LLM (async client, event loop stays free)
         generator = get_response_generator()
-        answer = generator.generate_response(request.question, relevant_docs)
+        answer = await generator.agenerate_response(request.question, relevant_docs, context=context)
         
         # Prepare sources
-        sources = [
-            {
-                "text": doc['text'][:200] + "..." if len(doc['text']) > 200 else doc['text'],
-                "score": doc['score'],
-                "metadata": doc.get('metadata', {})
-            }
-            for doc in relevant_docs
-        ]
+        sources = format_sources(relevant_docs)
+        
+        if not answer.startswith("Error generating response"):
+            get_answer_cache().store(query_embedding, answer, sources, vector_store.version, scope, tenant)
         
         return ChatResponse(
             answer=answer,
-            sources=sources
+            sources=sources,
+            context=context_stats
         )
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing chat request: {str(e)}")
 
+
+@router.post("/chat/stream")
+async def chat_stream(request: ChatRequest, http_request: Request, tenant: str = Depends(get_tenant)):
+    """
+    Answer a question as a Server-Sent Events stream.
+    
+    Emits one ``sources`` event as soon as retrieval finishes, then a
+    ``token`` event per piece of generated text, and finally ``done`` with
+    the full answer and context stats (or ``error``). If the client
+    disconnects, the upstream LLM stream is closed.
+    
+    Args:
+        request: ChatRequest with user question
+        http_request: Incoming request, used to detect disconnects
+        tenant: Tenant whose documents are searched (``X-Tenant-ID`` header)
+    
+    Returns:
+        StreamingResponse with ``text/event-stream`` content
+    """
+    if not request.question or not request.question.strip():
+        raise HTTPException(status_code=400, detail="Question cannot be empty")
+    
+    try:
+        vector_store, query_embedding, cached, relevant_docs, scope = await _retrieve(request, tenant)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing chat request: {str(e)}")
+    
+    async def events():
+        if cached is not None:
+            yield _sse("sources", {"sources": cached["sources"], "cached": True})
+            yield _sse("token", {"text": cached["answer"]})
+            yield _sse("done", {"answer": cached["answer"]})
+            return
+        if not relevant_docs:
+            answer = NO_DOCUMENTS_ANSWER if query_embedding is None else NO_RESULTS_ANSWER
+            yield _sse("sources", {"sources": [], "cached": False})
+            yield _sse("token", {"text": answer})
+            yield _sse("done", {"answer": answer})
+            return
+        
+        sources = format_sources(relevant_docs)
+        yield _sse("sources", {"sources": sources, "cached": False})
+        
+        context, context_stats = build_context(relevant_docs)
+        tokens = get_response_generator().stream_response(request.question, relevant_docs, context=context)
+        parts = []
+        try:
+            # Streamed after the headers: recorded in the histogram only
+            with span("generate"):
+                async for piece in tokens:
+                    if await http_request.is_disconnected():
+                        return
+                    parts.append(piece)
+                    yield _sse("token", {"text": piece})
+        except Exception as e:
+            yield _sse("error", {"detail": f"Error generating response: {str(e)}"})
+            return
+        finally:
+            # Closes the upstream LLM stream, also when the server cancels us on disconnect
+            await tokens.aclose()
+        
+        answer = "".join(parts).strip()
+        get_answer_cache().store(query_embedding, answer, sources, vector_store.version, scope, tenant)
+        yield _sse("done", {"answer": answer, "context": context_stats})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/chat/batch")
+async def chat_batch(request: ChatBatchRequest, tenant: str = Depends(get_tenant)):
+    """
+    Answer many questions in one request, streamed as NDJSON.
+    
+    Questions are embedded and searched in batches and answered with
+    bounded concurrency; one JSON line per question is written in input
+    order as soon as it (and every earlier question) is answered.
+    
+    Args:
+        request: ChatBatchRequest with the questions and search options
+        tenant: Tenant whose documents are searched (``X-Tenant-ID`` header)
+    
+    Returns:
+        StreamingResponse with ``application/x-ndjson`` content
+    """
+    if len(request.questions) > CHAT_BATCH_MAX_QUESTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many questions: {len(request.questions)} (max {CHAT_BATCH_MAX_QUESTIONS})"
+        )
+    
+    results = answer_batch(
+        request.questions,
+        concurrency=request.concurrency,
+        tenant=tenant,
+        nprobe=request.nprobe,
+        ef_search=request.ef_search,
+        filters=_search_filter(request.filters),
+        vector_weight=request.vector_weight,
+        keyword_weight=request.keyword_weight
+    )
+    
+    async def lines():
+        try:
+            async for result in results:
+                yield json.dumps(result) + "\n"
+        finally:
+            await results.aclose()
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
@@ -0,0 +1,22 @@
+"""Request dependencies shared by the API routes."""
+from typing import Optional
+from fastapi import Header, HTTPException
+from app.services.tenancy import DEFAULT_TENANT_ID, validate_tenant
+
+
+def get_tenant(x_tenant_id: Optional[str] = Header(None)) -> str:
+    """
+    Tenant of a request, from the ``X-Tenant-ID`` header.
+    
+    Each tenant has its own index, documents and ingestion jobs; requests
+    without the header use the default tenant.
+    
+    Returns:
+        The normalized tenant id
+    """
+    if not x_tenant_id:
+        return DEFAULT_TENANT_ID
+    try:
+        return validate_tenant(x_tenant_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,36 @@
+"""Diagnostics routes exposing runtime statistics."""
+from fastapi import APIRouter
+from app.services.embedding import get_embedding_service
+from app.services.answer_cache import get_answer_cache
+from app.services.generator import get_response_generator
+
+router = APIRouter()
+
+
+@router.get("/diagnostics/cache")
+def cache_stats():
+    """
+    Report hit/miss counters for the embedding and answer caches.
+    
+    A plain function, so FastAPI runs it in the threadpool: the first call
+    may load the embedding model.
+    
+    Returns:
+        Dict with embedding (persistent + query LRU) and answer cache stats
+    """
+    return {
+        "embedding": get_embedding_service().cache_stats(),
+        "answer": get_answer_cache().stats()
+    }
+
+
+@router.get("/diagnostics/llm")
+async def llm_stats():
+    """
+    Report the active LLM provider and model.
+    
+    Returns:
+        Dict with the configured and active model; for Gemini also the
+        fallback counts and model-probe circuit breaker state
+    """
+    return get_response_generator().model_stats()
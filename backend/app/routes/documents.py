@@ -0,0 +1,53 @@
+"""Document routes for listing and deleting indexed PDFs."""
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from app.models.schemas import DocumentResponse, DocumentListResponse
+from app.routes.dependencies import get_tenant
+from app.services.ingestion import delete_document
+from app.services.vectorstore import get_vector_store
+
+router = APIRouter()
+
+
+@router.get("/documents", response_model=DocumentListResponse)
+async def list_documents(
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    tenant: str = Depends(get_tenant)
+):
+    """
+    List a tenant's indexed documents, most recently updated first.
+    
+    Args:
+        limit: Maximum number of documents returned
+        offset: Number of documents skipped
+        tenant: Tenant owning the documents (``X-Tenant-ID`` header)
+    
+    Returns:
+        DocumentListResponse with one page of documents and the total count
+    """
+    documents = (await run_in_threadpool(get_vector_store, tenant)).documents
+    page = await run_in_threadpool(documents.list, limit, offset)
+    total = await run_in_threadpool(documents.count)
+    return DocumentListResponse(documents=[DocumentResponse(**document) for document in page], total=total)
+
+
+@router.delete("/documents/{document_id}", response_model=DocumentResponse)
+async def remove_document(document_id: str, tenant: str = Depends(get_tenant)):
+    """
+    Delete an indexed document and its chunks.
+    
+    Its chunks stop appearing in search results immediately; with FAISS
+    their vectors are reclaimed by a later background compaction.
+    
+    Args:
+        document_id: Id from the document listing
+        tenant: Tenant owning the document (``X-Tenant-ID`` header)
+    
+    Returns:
+        DocumentResponse of the deleted document
+    """
+    document = await run_in_threadpool(delete_document, document_id, tenant)
+    if document is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return DocumentResponse(**document)
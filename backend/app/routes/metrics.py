@@ -0,0 +1,71 @@
+"""Prometheus metrics endpoint."""
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.services import embedding, vectorstore, answer_cache
+from app.utils.metrics import get_metrics
+
+router = APIRouter()
+
+
+def _cache_samples():
+    """Cache hit/miss counters; services not created yet are skipped (no model load on scrape)."""
+    stats = {}
+    if embedding._embedding_service is not None:
+        embedding_stats = embedding._embedding_service.cache_stats()
+        stats["query_embedding"] = embedding_stats["query"]
+        if embedding_stats["persistent"]["enabled"]:
+            stats["persistent_embedding"] = embedding_stats["persistent"]
+    if answer_cache._answer_cache is not None:
+        stats["answer"] = answer_cache._answer_cache.stats()
+    
+    return [
+        ("rag_cache_hits_total", "counter", "Cache lookups that found an entry.",
+         [({"cache": name}, cache["hits"]) for name, cache in stats.items()]),
+        ("rag_cache_misses_total", "counter", "Cache lookups that found no entry.",
+         [({"cache": name}, cache["misses"]) for name, cache in stats.items()]),
+        ("rag_cache_entries", "gauge", "Entries currently cached.",
+         [({"cache": name}, cache["entries"]) for name, cache in stats.items()]),
+    ]
+
+
+def _index_samples():
+    """Size of every loaded tenant index and the tenant pool; nothing is loaded on scrape."""
+    pool = vectorstore._vector_store_pool
+    if pool is None:
+        return []
+    loaded = pool.loaded()
+    stats = pool.stats()
+    return [
+        ("rag_index_chunks", "gauge", "Chunks in the vector index.",
+         [({"tenant": tenant}, store.count()) for tenant, store in loaded]),
+        ("rag_index_version", "gauge", "Corpus version (changes with every update).",
+         [({"tenant": tenant}, store.version) for tenant, store in loaded]),
+        ("rag_index_deleted_vectors", "gauge", "Deleted vectors awaiting compaction.",
+         [({"tenant": tenant}, store.index.deleted_count) for tenant, store in loaded if not store.use_chroma]),
+        ("rag_tenants_loaded", "gauge", "Tenant indexes loaded in memory.", [({}, stats["loaded"])]),
+        ("rag_tenant_memory_bytes", "gauge", "Estimated memory of the loaded tenant indexes.",
+         [({}, stats["memory_bytes"])]),
+        ("rag_tenant_memory_budget_bytes", "gauge", "Memory budget of the loaded tenant indexes.",
+         [({}, stats["memory_budget_bytes"])]),
+        ("rag_tenant_loads_total", "counter", "Tenant indexes loaded from disk.", [({}, stats["loads"])]),
+        ("rag_tenant_evictions_total", "counter", "Tenant indexes unloaded to stay within the budget.",
+         [({}, stats["evictions"])]),
+    ]
+
+
+get_metrics().add_collector(_cache_samples)
+get_metrics().add_collector(_index_samples)
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """
+    Expose metrics in the Prometheus text format.
+    
+    Includes per-stage and per-route latency histograms, ingestion
+    counters, cache hit/miss counters, the index size per tenant and the tenant pool.
+    
+    Returns:
+        Plain-text exposition (format version 0.0.4)
+    """
+    return PlainTextResponse(get_metrics().render(), media_type="text/plain; version=0.0.4; charset=utf-8")
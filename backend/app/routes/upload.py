@@ -1,64 +1,124 @@
 """Upload route for handling PDF uploads."""
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from app.models.schemas import UploadResponse
-from app.utils.pdf_loader import extract_text_from_pdf, save_pdf_to_disk
-from app.utils.chunker import chunk_text
+import uuid
+from typing import BinaryIO, Dict, Optional
+from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
+from app.models.schemas import UploadResponse, JobStatusResponse
+from app.utils.pdf_loader import save_pdf_stream_to_disk
+from app.routes.dependencies import get_tenant
+from app.services.ingestion import get_ingestion_pool, incoming_dir, IngestionQueueFull
+from app.services.jobs import get_job_store
+from app.services.document_registry import content_hash
+from app.services.search_filter import parse_tags
+from app.services.tenancy import DEFAULT_TENANT_ID
 from app.services.vectorstore import get_vector_store
-from app.utils.config import RAW_DATA_DIR
+from app.utils.metrics import span
 
 router = APIRouter()
 
 
-@router.post("/upload", response_model=UploadResponse)
-async def upload_pdf(file: UploadFile = File(...)):
+@router.post("/upload", response_model=UploadResponse, status_code=202)
+async def upload_pdf(
+    response: Response,
+    file: UploadFile = File(...),
+    tags: Optional[str] = Form(None),
+    tenant: str = Depends(get_tenant)
+):
     """
-    Upload a PDF file, extract text, chunk it, and store embeddings.
+    Upload a PDF file and queue it for ingestion.
+    
+    The file is saved to disk and a background worker extracts, chunks,
+    embeds and indexes it. Poll ``GET /api/jobs/{job_id}`` for progress.
+    If a document with exactly the same content is already indexed, the
+    upload is not saved or queued: the response is 200 with status
+    ``skipped`` and the indexed document's filename and chunk count.
     
     Args:
         file: Uploaded PDF file
-        
+        tags: Optional comma-separated tags to filter searches on
+        tenant: Tenant whose index the PDF goes into (``X-Tenant-ID`` header)
+    
     Returns:
-        UploadResponse with upload details
+        UploadResponse with the ingestion job id
     """
     # Validate file type
     if not file.filename.endswith('.pdf'):
         raise HTTPException(status_code=400, detail="Only PDF files are supported")
     
     try:
-        # Read file content
-        file_content = await file.read()
-        
-        # Save to disk
-        file_path = save_pdf_to_disk(file_content, file.filename, RAW_DATA_DIR)
-        
-        # Extract text from PDF
-        text = extract_text_from_pdf(file_content)
+        # Hash the spooled upload first; the worker re-checks in case of concurrent uploads
+        with span("upload_hash"):
+            existing = await run_in_threadpool(_indexed_document, file.file, tenant)
+        if existing is not None:
+            response.status_code = 200
+            return UploadResponse(
+                message="PDF already indexed",
+                filename=existing["filename"],
+                status="skipped",
+                chunks_count=existing["chunks_count"]
+            )
         
-        if not text or not text.strip():
-            raise HTTPException(status_code=400, detail="Could not extract text from PDF")
+        # Copy the (already spooled) upload to disk block by block, never whole in memory. It gets
+        # a unique name until indexed: earlier jobs for the same filename may still be reading theirs
+        with span("upload_save"):
+            file_path = await run_in_threadpool(
+                save_pdf_stream_to_disk, file.file, f"{uuid.uuid4().hex}.pdf", incoming_dir(tenant)
+            )
         
-        # Chunk text
-        chunks = chunk_text(text)
-        
-        if not chunks:
-            raise HTTPException(status_code=400, detail="Failed to chunk document")
-        
-        # Get vector store and add documents
-        vector_store = get_vector_store()
-        metadatas = [
-            {"filename": file.filename, "chunk_index": i}
-            for i in range(len(chunks))
-        ]
-        doc_ids = vector_store.add_documents(chunks, metadatas)
+        try:
+            job_id = get_ingestion_pool().submit(file.filename, file_path, parse_tags(tags), tenant)
+        except BaseException:
+            file_path.unlink(missing_ok=True)
+            raise
         
         return UploadResponse(
-            message="PDF uploaded and processed successfully",
+            message="PDF uploaded and queued for processing",
             filename=file.filename,
-            chunks_count=len(chunks)
+            job_id=job_id,
+            status="queued"
         )
     
+    except IngestionQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing PDF: {str(e)}")
 
+
+def _indexed_document(stream: BinaryIO, tenant: str) -> Optional[Dict]:
+    """The tenant's indexed document with the upload's content, if any (rewinds the stream)."""
+    digest = content_hash(stream)
+    stream.seek(0)
+    return get_vector_store(tenant).documents.find_by_hash(digest)
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_job(job_id: str, tenant: str = Depends(get_tenant)):
+    """
+    Report the status of an ingestion job.
+    
+    Args:
+        job_id: Id returned by the upload endpoint
+        tenant: Tenant that uploaded the PDF (``X-Tenant-ID`` header)
+    
+    Returns:
+        JobStatusResponse with stage and progress counts
+    """
+    job = await run_in_threadpool(get_job_store().get, job_id)
+    # Other tenants' jobs are reported as missing
+    if job is None or (job["tenant"] or DEFAULT_TENANT_ID) != tenant:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return JobStatusResponse(
+        job_id=job["id"],
+        filename=job["filename"],
+        status=job["status"],
+        stage=job["stage"],
+        progress_done=job["progress_done"],
+        progress_total=job["progress_total"],
+        chunks_count=job["chunks_count"],
+        error=job["error"],
+        created_at=job["created_at"],
+        updated_at=job["updated_at"]
+    )
@@ -0,0 +1,154 @@
+"""Semantic answer cache for repeated and near-duplicate questions."""
+import threading
+import time
+from typing import Dict, List, Optional
+import numpy as np
+from app.utils.config import (
+    ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_TTL_SECONDS, ANSWER_CACHE_SIMILARITY
+)
+from app.services.tenancy import DEFAULT_TENANT_ID
+
+
+class SemanticAnswerCache:
+    """
+    Cache of generated answers looked up by question-embedding similarity.
+    
+    A question hits when the cosine similarity between its embedding and a
+    cached question's embedding is at least ``threshold``. Entries expire
+    after ``ttl`` seconds, the oldest are dropped beyond ``max_entries``, and
+    a tenant's entries are dropped when its corpus version changes. Answers
+    are only shared between questions of the same tenant searched with the
+    same ``scope`` (filter).
+    """
+    
+    def __init__(self, max_entries: int = None, ttl: float = None, threshold: float = None):
+        self.max_entries = max_entries if max_entries is not None else ANSWER_CACHE_MAX_ENTRIES
+        self.ttl = ttl if ttl is not None else ANSWER_CACHE_TTL_SECONDS
+        self.threshold = threshold if threshold is not None else ANSWER_CACHE_SIMILARITY
+        self._lock = threading.Lock()
+        self._vectors = None  # (n, dim) unit-normalized question embeddings
+        self._entries: List[Dict] = []
+        self._corpus_versions: Dict[str, int] = {}  # Per tenant
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+    
+    def lookup(
+        self, embedding: List[float], corpus_version: int, scope: Optional[str] = None, tenant: str = DEFAULT_TENANT_ID
+    ) -> Optional[Dict]:
+        """
+        Return the cached ``{"answer", "sources"}`` for a similar question, if any.
+        
+        Args:
+            embedding: Question embedding
+            corpus_version: Current version of the tenant's vector store
+            scope: Search filter key (None = whole corpus)
+            tenant: Tenant whose corpus was searched
+        """
+        query = self._normalize(embedding)
+        with self._lock:
+            self._check_version(tenant, corpus_version)
+            self._expire()
+            if not self._entries:
+                self.misses += 1
+                return None
+            
+            similarities = self._vectors @ query
+            similarities[[entry["scope"] != scope or entry["tenant"] != tenant for entry in self._entries]] = -np.inf
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                self.misses += 1
+                return None
+            
+            self.hits += 1
+            entry = self._entries[best]
+            return {"answer": entry["answer"], "sources": entry["sources"]}
+    
+    def store(
+        self, embedding: List[float], answer: str, sources: List[Dict], corpus_version: int,
+        scope: Optional[str] = None, tenant: str = DEFAULT_TENANT_ID
+    ):
+        """Cache an answer for a question embedding searched within ``scope`` of ``tenant``'s corpus."""
+        if self.max_entries <= 0:
+            return
+        vector = self._normalize(embedding)
+        with self._lock:
+            self._check_version(tenant, corpus_version)
+            self._entries.append({
+                "answer": answer,
+                "sources": sources,
+                "scope": scope,
+                "tenant": tenant,
+                "created_at": time.monotonic()
+            })
+            if self._vectors is None or self._vectors.shape[1] != vector.shape[0]:
+                self._vectors = vector[np.newaxis, :]
+                self._entries = self._entries[-1:]
+            else:
+                self._vectors = np.vstack([self._vectors, vector])
+            
+            overflow = len(self._entries) - self.max_entries
+            if overflow > 0:
+                self._entries = self._entries[overflow:]
+                self._vectors = self._vectors[overflow:]
+    
+    def invalidate(self):
+        """Drop every cached answer."""
+        with self._lock:
+            self._clear()
+    
+    def stats(self) -> Dict:
+        """Hit/miss counters and occupancy."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "similarity_threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+    
+    def _check_version(self, tenant: str, corpus_version: int):
+        if corpus_version != self._corpus_versions.get(tenant):
+            # Only this tenant's answers are stale
+            keep = [entry["tenant"] != tenant for entry in self._entries]
+            if not all(keep):
+                self._entries = [entry for entry, kept in zip(self._entries, keep) if kept]
+                self._vectors = self._vectors[np.array(keep)] if self._entries else None
+                self.invalidations += 1
+            self._corpus_versions[tenant] = corpus_version
+    
+    def _expire(self):
+        # Entries are appended in time order, so expired ones form a prefix
+        cutoff = time.monotonic() - self.ttl
+        expired = 0
+        while expired < len(self._entries) and self._entries[expired]["created_at"] < cutoff:
+            expired += 1
+        if expired:
+            self._entries = self._entries[expired:]
+            self._vectors = self._vectors[expired:]
+    
+    def _clear(self):
+        self._entries = []
+        self._vectors = None
+        self.invalidations += 1
+    
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+
+# Global instance
+_answer_cache = None
+
+def get_answer_cache() -> SemanticAnswerCache:
+    """Get or create the global answer cache instance."""
+    global _answer_cache
+    if _answer_cache is None:
+        _answer_cache = SemanticAnswerCache()
+    return _answer_cache
@@ -0,0 +1,167 @@
+"""Batch question answering for offline evaluation and bulk QA."""
+import asyncio
+from collections import deque
+from typing import AsyncIterator, Dict, List, Optional
+from app.utils.config import CHAT_BATCH_CONCURRENCY, CHAT_BATCH_BLOCK_SIZE
+from app.utils.context_builder import build_context
+from app.services.vectorstore import get_vector_store
+from app.services.answer_cache import get_answer_cache
+from app.services.llm_clients import get_provider_clients
+from app.services.generator import (
+    get_response_generator, format_sources, NO_DOCUMENTS_ANSWER, NO_RESULTS_ANSWER
+)
+
+
+def _retrieve_block(vector_store, questions: List[str], search_options: Dict) -> List[Dict]:
+    """
+    Embed, check the answer cache and search for a block of questions.
+    
+    Blocking (run in a worker thread). All questions are embedded in one
+    ``embed_queries`` call and searched with one ``search_many`` call.
+    
+    Returns:
+        One item per question with ``error``, ``cached`` or ``docs`` set
+    """
+    items = [{"question": question} for question in questions]
+    valid = []
+    for item in items:
+        if item["question"] and item["question"].strip():
+            valid.append(item)
+        else:
+            item["error"] = "Question cannot be empty"
+    if not valid or vector_store.count() == 0:
+        return items
+    
+    embeddings = vector_store.embedding_service.embed_queries([item["question"] for item in valid])
+    answer_cache = get_answer_cache()
+    scope = _cache_scope(search_options)
+    to_search, positions = [], []
+    for position, (item, embedding) in enumerate(zip(valid, embeddings)):
+        item["embedding"] = embedding
+        cached = answer_cache.lookup(embedding, vector_store.version, scope, vector_store.tenant)
+        if cached is not None:
+            item["cached"] = cached
+        else:
+            to_search.append(item)
+            positions.append(position)
+    
+    if to_search:
+        results = vector_store.search_many(
+            [item["question"] for item in to_search],
+            query_embeddings=embeddings[positions],
+            **search_options
+        )
+        for item, docs in zip(to_search, results):
+            item["docs"] = docs
+    return items
+
+
+def _cache_scope(search_options: Dict) -> Optional[str]:
+    """Answer cache scope of a search: its filter key, None for the whole corpus."""
+    search_filter = search_options.get("filters")
+    return search_filter.key() if search_filter is not None else None
+
+
+async def answer_batch(
+    questions: List[str], concurrency: int = None, tenant: Optional[str] = None, **search_options
+) -> AsyncIterator[Dict]:
+    """
+    Answer many questions, yielding one result per question in input order.
+    
+    Questions are retrieved in blocks of ``CHAT_BATCH_BLOCK_SIZE`` (one
+    embedding call and one multi-query search per block; the next block is
+    retrieved while the current one is generating). At most ``concurrency``
+    generations run at once, and results are yielded as soon as every
+    earlier question has been answered.
+    
+    Args:
+        questions: Questions to answer
+        concurrency: Generations in flight (default from config)
+        tenant: Tenant whose index is searched (default tenant if None)
+        **search_options: ``nprobe``, ``ef_search``, ``filters``,
+            ``vector_weight`` and ``keyword_weight`` as in ``VectorStore.search``
+    
+    Yields:
+        Dicts with ``index``, ``question`` and either ``error`` or
+        ``answer``, ``sources``, ``cached`` and ``context`` (as ``/chat``)
+    """
+    concurrency = max(1, concurrency or CHAT_BATCH_CONCURRENCY)
+    vector_store = await asyncio.to_thread(get_vector_store, tenant)
+    generator = get_response_generator()
+    answer_cache = get_answer_cache()
+    semaphore = asyncio.Semaphore(concurrency)
+    scope = _cache_scope(search_options)
+    
+    async def answer(index: int, item: Dict) -> Dict:
+        result = {"index": index, "question": item["question"]}
+        if "error" in item:
+            return {**result, "error": item["error"]}
+        if "cached" in item:
+            return {**result, **item["cached"], "cached": True, "context": None}
+        if not item.get("docs"):
+            text = NO_DOCUMENTS_ANSWER if "embedding" not in item else NO_RESULTS_ANSWER
+            return {**result, "answer": text, "sources": [], "cached": False, "context": None}
+        
+        try:
+            context, context_stats = build_context(item["docs"])
+            async with semaphore:
+                text = await generator.agenerate_response(item["question"], item["docs"], context=context)
+        except Exception as e:
+            return {**result, "error": f"Error generating response: {str(e)}"}
+        sources = format_sources(item["docs"])
+        if not text.startswith("Error generating response"):
+            answer_cache.store(item["embedding"], text, sources, vector_store.version, scope, vector_store.tenant)
+        return {**result, "answer": text, "sources": sources, "cached": False, "context": context_stats}
+    
+    def retrieve(start: int):
+        block = questions[start:start + CHAT_BATCH_BLOCK_SIZE]
+        return asyncio.create_task(asyncio.to_thread(_retrieve_block, vector_store, block, search_options))
+    
+    # Keep enough generations queued that the semaphore never runs dry
+    window = 2 * concurrency
+    pending = deque()
+    retrieval = retrieve(0) if questions else None
+    try:
+        for start in range(0, len(questions), CHAT_BATCH_BLOCK_SIZE):
+            block = questions[start:start + CHAT_BATCH_BLOCK_SIZE]
+            try:
+                items = await retrieval
+            except Exception as e:
+                items = [{"question": question, "error": f"Error retrieving documents: {str(e)}"} for question in block]
+            next_start = start + CHAT_BATCH_BLOCK_SIZE
+            retrieval = retrieve(next_start) if next_start < len(questions) else None
+            
+            for offset, item in enumerate(items):
+                pending.append(asyncio.create_task(answer(start + offset, item)))
+                if len(pending) >= window:
+                    yield await pending.popleft()
+        while pending:
+            yield await pending.popleft()
+    finally:
+        # Consumer went away (e.g. client disconnected): stop outstanding work
+        for task in pending:
+            task.cancel()
+        if retrieval is not None:
+            retrieval.cancel()
+
+
+def run_batch(questions: List[str], concurrency: int = None, **search_options) -> List[Dict]:
+    """
+    Blocking entry point for scripts: answer all questions, in order.
+    
+    Args:
+        questions: Questions to answer
+        concurrency: Generations in flight (default from config)
+        **search_options: Passed to ``answer_batch``
+    
+    Returns:
+        One result dict per question (see ``answer_batch``)
+    """
+    async def collect():
+        try:
+            return [result async for result in answer_batch(questions, concurrency, **search_options)]
+        finally:
+            # Async clients are bound to this event loop; the sync one stays shared
+            await get_provider_clients().aclose(sync=False)
+    
+    return asyncio.run(collect())
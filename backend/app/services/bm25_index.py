@@ -0,0 +1,401 @@
+"""Persistent BM25 keyword index and rank fusion for hybrid retrieval."""
+import math
+import re
+import sqlite3
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+
+# Words plus identifiers joined by - _ . / : (part numbers, error codes, clause ids)
+_TOKEN_RE = re.compile(r"[^\W_]+(?:[-_./:][^\W_]+)*")
+_SEPARATOR_RE = re.compile(r"[-_./:]")
+
+# Stay under SQLite's bound-parameter limit
+_MAX_PARAMS = 500
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase word tokens for BM25.
+    
+    Compound identifiers such as ``ERR-4021`` or ``3.2.1`` are kept whole so
+    exact matches score highly, and their parts are emitted as well.
+    """
+    tokens = []
+    for match in _TOKEN_RE.finditer(text.lower()):
+        token = match.group()
+        tokens.append(token)
+        if _SEPARATOR_RE.search(token):
+            tokens.extend(part for part in _SEPARATOR_RE.split(token) if part)
+    return tokens
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[str]],
+    weights: Sequence[float],
+    k: int = 60
+) -> List[Tuple[str, float]]:
+    """
+    Weighted reciprocal rank fusion.
+    
+    Args:
+        rankings: One list of ids per retriever, best first
+        weights: Weight of each retriever (0 ignores it)
+        k: Damping constant; larger values flatten the rank curve
+    
+    Returns:
+        (id, fused score) pairs, best first
+    """
+    scores: Dict[str, float] = {}
+    for ranking, weight in zip(rankings, weights):
+        if weight <= 0:
+            continue
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] = scores.get(doc_id, 0.0) + weight / (k + rank + 1)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class BM25Index:
+    """
+    Inverted index with Okapi BM25 scoring, stored in SQLite.
+    
+    Each ``add`` appends one posting block per term: packed arrays of
+    document numbers, term frequencies and document lengths. A query reads
+    only the blocks of its own terms and scores them with vectorized numpy
+    arithmetic. Blocks of a term are merged once there are more than
+    ``max_blocks`` of them, so frequent small uploads do not fragment the
+    posting lists. Corpus statistics are updated in the same transaction.
+    
+    Deleted documents are skipped by searches until their postings are
+    dropped; once more than ``max_deleted_ratio`` of the documents are
+    deleted, every posting list holding any is rewritten and the deleted
+    set is cleared.
+    """
+    
+    def __init__(
+        self,
+        db_path: Path,
+        k1: float = 1.2,
+        b: float = 0.75,
+        max_blocks: int = 16,
+        max_deleted_ratio: float = 0.2
+    ):
+        self.db_path = Path(db_path)
+        self.k1 = k1
+        self.b = b
+        self.max_blocks = max_blocks
+        self.max_deleted_ratio = max_deleted_ratio
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS docs ("
+                "doc_num INTEGER PRIMARY KEY, doc_id TEXT NOT NULL UNIQUE, "
+                "filename TEXT, length INTEGER NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_docs_filename ON docs (filename)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS terms ("
+                "term TEXT PRIMARY KEY, df INTEGER NOT NULL, blocks INTEGER NOT NULL) WITHOUT ROWID"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS postings ("
+                "term TEXT NOT NULL, block INTEGER NOT NULL, "
+                "doc_nums BLOB NOT NULL, tfs BLOB NOT NULL, lengths BLOB NOT NULL, "
+                "PRIMARY KEY (term, block)) WITHOUT ROWID"
+            )
+            self._conn.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER)")
+            # Document numbers of deleted chunks still present in posting blocks
+            self._conn.execute("CREATE TABLE IF NOT EXISTS deleted (doc_num INTEGER PRIMARY KEY)")
+        
+        stats = dict(self._conn.execute("SELECT name, value FROM stats").fetchall())
+        self._doc_count = stats.get("doc_count", 0)
+        self._total_length = stats.get("total_length", 0)
+        self._deleted = np.array(
+            [row[0] for row in self._conn.execute("SELECT doc_num FROM deleted ORDER BY doc_num")], dtype=np.int64
+        )
+        # Numbers of purged documents are not reused (stats keep the next one)
+        self._next_doc_num = max(stats.get("next_doc_num", 0), self._conn.execute(
+            "SELECT MAX(COALESCE((SELECT MAX(doc_num) FROM docs), -1), "
+            "COALESCE((SELECT MAX(doc_num) FROM deleted), -1)) + 1"
+        ).fetchone()[0])
+    
+    def count(self) -> int:
+        """Number of indexed documents."""
+        return self._doc_count
+    
+    def add(self, doc_ids: Sequence[str], texts: Sequence[str], filenames: Optional[Sequence[str]] = None):
+        """
+        Index new documents; ids that are already indexed are skipped.
+        
+        Args:
+            doc_ids: Unique chunk ids
+            texts: Chunk texts (same order)
+            filenames: Optional source filename per chunk, used for filtering
+        """
+        if filenames is None:
+            filenames = [None] * len(doc_ids)
+        
+        with self._lock:
+            existing = self._existing(doc_ids)
+            docs = []
+            postings: Dict[str, List[Tuple[int, int, int]]] = {}
+            added_length = 0
+            doc_num = self._next_doc_num
+            for doc_id, text, filename in zip(doc_ids, texts, filenames):
+                if doc_id in existing:
+                    continue
+                existing.add(doc_id)
+                counts = Counter(tokenize(text))
+                length = sum(counts.values())
+                docs.append((doc_num, doc_id, filename, length))
+                for term, tf in counts.items():
+                    postings.setdefault(term, []).append((doc_num, tf, length))
+                added_length += length
+                doc_num += 1
+            if not docs:
+                return
+            
+            block = self._next_doc_num
+            rows = []
+            for term, entries in postings.items():
+                columns = np.array(entries, dtype=np.int64).T
+                rows.append((
+                    term, block,
+                    columns[0].tobytes(),
+                    columns[1].astype(np.int32).tobytes(),
+                    columns[2].astype(np.int32).tobytes()
+                ))
+            
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT INTO docs (doc_num, doc_id, filename, length) VALUES (?, ?, ?, ?)", docs
+                )
+                self._conn.executemany(
+                    "INSERT INTO postings (term, block, doc_nums, tfs, lengths) VALUES (?, ?, ?, ?, ?)", rows
+                )
+                self._conn.executemany(
+                    "INSERT INTO terms (term, df, blocks) VALUES (?, ?, 1) "
+                    "ON CONFLICT (term) DO UPDATE SET df = df + excluded.df, blocks = blocks + 1",
+                    [(term, len(entries)) for term, entries in postings.items()]
+                )
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO stats (name, value) VALUES (?, ?)",
+                    [("doc_count", self._doc_count + len(docs)),
+                     ("total_length", self._total_length + added_length)]
+                )
+                self._merge_fragmented(list(postings))
+            self._doc_count += len(docs)
+            self._total_length += added_length
+            self._next_doc_num = doc_num
+    
+    def delete(self, doc_ids: Sequence[str]) -> int:
+        """
+        Remove documents from the index; unknown ids are ignored.
+        
+        Their postings stay in place as tombstones that searches skip, and
+        are dropped when the term's blocks are next merged, or by a purge
+        of all of them once more than ``max_deleted_ratio`` of the
+        documents are deleted. Document frequencies are corrected at that
+        point too, so IDF is slightly low for terms of deleted chunks
+        until then.
+        
+        Returns:
+            Number of documents removed
+        """
+        doc_ids = list(doc_ids)
+        with self._lock:
+            rows = []
+            for start in range(0, len(doc_ids), _MAX_PARAMS):
+                part = doc_ids[start:start + _MAX_PARAMS]
+                placeholders = ",".join("?" * len(part))
+                rows.extend(self._conn.execute(
+                    f"SELECT doc_num, length FROM docs WHERE doc_id IN ({placeholders})", part
+                ).fetchall())
+            if not rows:
+                return 0
+            removed_length = sum(length for _, length in rows)
+            with self._conn:
+                self._conn.executemany("DELETE FROM docs WHERE doc_num = ?", [(num,) for num, _ in rows])
+                self._conn.executemany("INSERT OR IGNORE INTO deleted (doc_num) VALUES (?)", [(num,) for num, _ in rows])
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO stats (name, value) VALUES (?, ?)",
+                    [("doc_count", self._doc_count - len(rows)),
+                     ("total_length", self._total_length - removed_length)]
+                )
+            self._doc_count -= len(rows)
+            self._total_length -= removed_length
+            self._deleted = np.union1d(self._deleted, np.array([num for num, _ in rows], dtype=np.int64))
+            if len(self._deleted) > self.max_deleted_ratio * (self._doc_count + len(self._deleted)):
+                with self._conn:
+                    self._purge_deleted()
+                self._deleted = np.zeros(0, dtype=np.int64)
+        return len(rows)
+    
+    def search(
+        self,
+        query: str,
+        top_k: int,
+        filenames: Optional[Sequence[str]] = None,
+        doc_ids: Optional[Sequence[str]] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        Rank documents against ``query``.
+        
+        Postings of documents outside the restriction are dropped before
+        scoring, so a filtered search still returns ``top_k`` results when
+        enough documents match.
+        
+        Args:
+            query: Free-text query
+            top_k: Number of results
+            filenames: Only score chunks of these documents
+            doc_ids: Only score these chunks
+        
+        Returns:
+            (doc id, BM25 score) pairs, best first
+        """
+        terms = list(set(tokenize(query)))
+        if not terms or top_k <= 0:
+            return []
+        
+        doc_nums, contributions = [], []
+        with self._lock:
+            doc_count = self._doc_count
+            if doc_count == 0:
+                return []
+            avg_length = self._total_length / doc_count
+            allowed = None
+            if filenames is not None:
+                allowed = self._doc_nums("filename", filenames)
+            if doc_ids is not None:
+                by_id = self._doc_nums("doc_id", doc_ids)
+                allowed = by_id if allowed is None else np.intersect1d(allowed, by_id)
+            if allowed is not None and len(allowed) == 0:
+                return []
+            
+            for term in terms:
+                row = self._conn.execute("SELECT df FROM terms WHERE term = ?", (term,)).fetchone()
+                if row is None:
+                    continue
+                # IDF stays corpus-wide so filtered scores match unfiltered ones
+                df = row[0]
+                idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+                nums, tfs, lengths = self._read_postings(term)
+                if allowed is not None:
+                    keep = np.isin(nums, allowed)
+                    nums, tfs, lengths = nums[keep], tfs[keep], lengths[keep]
+                tfs = tfs.astype(np.float64)
+                norm = tfs + self.k1 * (1 - self.b + self.b * lengths / avg_length)
+                doc_nums.append(nums)
+                contributions.append(idf * tfs * (self.k1 + 1) / norm)
+            
+            if not doc_nums:
+                return []
+            nums = np.concatenate(doc_nums)
+            if len(nums) == 0:
+                return []
+            scores = np.bincount(nums, weights=np.concatenate(contributions))
+            deleted = self._deleted[self._deleted < len(scores)]
+            scores[deleted] = 0
+            candidates = np.flatnonzero(scores)
+            if len(candidates) > top_k:
+                candidates = candidates[np.argpartition(-scores[candidates], top_k)[:top_k]]
+            candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+            
+            names = self._doc_ids([int(n) for n in candidates])
+        return [(names[int(n)], float(scores[n])) for n in candidates if int(n) in names]
+    
+    def _read_postings(self, term: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        rows = self._conn.execute(
+            "SELECT doc_nums, tfs, lengths FROM postings WHERE term = ? ORDER BY block", (term,)
+        ).fetchall()
+        return (
+            np.concatenate([np.frombuffer(row[0], dtype=np.int64) for row in rows]),
+            np.concatenate([np.frombuffer(row[1], dtype=np.int32) for row in rows]),
+            np.concatenate([np.frombuffer(row[2], dtype=np.int32) for row in rows]),
+        )
+    
+    def _merge_fragmented(self, terms: List[str]):
+        """Rewrite the posting list of any term with too many blocks as one block."""
+        fragmented = []
+        for start in range(0, len(terms), _MAX_PARAMS):
+            part = terms[start:start + _MAX_PARAMS]
+            placeholders = ",".join("?" * len(part))
+            fragmented.extend(row[0] for row in self._conn.execute(
+                f"SELECT term FROM terms WHERE blocks > ? AND term IN ({placeholders})",
+                [self.max_blocks, *part]
+            ))
+        for term in fragmented:
+            self._rewrite_postings(term)
+    
+    def _purge_deleted(self):
+        """Drop the postings of every deleted document and forget the deleted set (caller commits)."""
+        # Find the affected terms first: rewriting while the scan is open could revisit rows
+        affected = set()
+        for term, doc_nums in self._conn.execute("SELECT term, doc_nums FROM postings"):
+            if term not in affected and np.isin(np.frombuffer(doc_nums, dtype=np.int64), self._deleted).any():
+                affected.add(term)
+        for term in affected:
+            self._rewrite_postings(term)
+        self._conn.execute("DELETE FROM deleted")
+        self._conn.execute(
+            "INSERT OR REPLACE INTO stats (name, value) VALUES ('next_doc_num', ?)", (self._next_doc_num,)
+        )
+    
+    def _rewrite_postings(self, term: str):
+        """Rewrite the posting list of a term as one block without deleted documents."""
+        nums, tfs, lengths = self._read_postings(term)
+        if len(self._deleted):
+            live = ~np.isin(nums, self._deleted)
+            nums, tfs, lengths = nums[live], tfs[live], lengths[live]
+        first_block = self._conn.execute(
+            "SELECT MIN(block) FROM postings WHERE term = ?", (term,)
+        ).fetchone()[0]
+        self._conn.execute("DELETE FROM postings WHERE term = ?", (term,))
+        if not len(nums):
+            # Only deleted documents had it
+            self._conn.execute("DELETE FROM terms WHERE term = ?", (term,))
+            return
+        self._conn.execute(
+            "INSERT INTO postings (term, block, doc_nums, tfs, lengths) VALUES (?, ?, ?, ?, ?)",
+            (term, first_block, nums.tobytes(), tfs.tobytes(), lengths.tobytes())
+        )
+        self._conn.execute("UPDATE terms SET blocks = 1, df = ? WHERE term = ?", (len(nums), term))
+    
+    def _doc_nums(self, column: str, values: Sequence[str]) -> np.ndarray:
+        """Sorted numbers of the documents whose ``column`` is one of ``values``."""
+        values = list(values)
+        nums = []
+        for start in range(0, len(values), _MAX_PARAMS):
+            part = values[start:start + _MAX_PARAMS]
+            placeholders = ",".join("?" * len(part))
+            nums.extend(row[0] for row in self._conn.execute(
+                f"SELECT doc_num FROM docs WHERE {column} IN ({placeholders})", part
+            ))
+        return np.unique(np.array(nums, dtype=np.int64))
+    
+    def _doc_ids(self, doc_nums: List[int]) -> Dict[int, str]:
+        found = {}
+        for start in range(0, len(doc_nums), _MAX_PARAMS):
+            part = doc_nums[start:start + _MAX_PARAMS]
+            placeholders = ",".join("?" * len(part))
+            found.update(self._conn.execute(
+                f"SELECT doc_num, doc_id FROM docs WHERE doc_num IN ({placeholders})", part
+            ).fetchall())
+        return found
+    
+    def _existing(self, doc_ids: Iterable[str]) -> set:
+        doc_ids = list(doc_ids)
+        found = set()
+        for start in range(0, len(doc_ids), _MAX_PARAMS):
+            part = doc_ids[start:start + _MAX_PARAMS]
+            placeholders = ",".join("?" * len(part))
+            found.update(row[0] for row in self._conn.execute(
+                f"SELECT doc_id FROM docs WHERE doc_id IN ({placeholders})", part
+            ))
+        return found
@@ -0,0 +1,178 @@
+"""SQLite registry of ingested documents: content hash and chunk ids per file."""
+import hashlib
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, List, Optional, Tuple
+
+
+def content_hash(stream: BinaryIO, block_size: int = 1 << 20) -> str:
+    """SHA-256 of a binary stream from its current position, read block by block."""
+    digest = hashlib.sha256()
+    for block in iter(lambda: stream.read(block_size), b""):
+        digest.update(block)
+    return digest.hexdigest()
+
+
+def file_hash(path: Path) -> str:
+    """SHA-256 of a file's content."""
+    with open(path, "rb") as f:
+        return content_hash(f)
+
+
+def chunk_hash(text: str) -> str:
+    """SHA-256 of a chunk's text (exact, unlike the normalized embedding cache key)."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class DocumentRegistry:
+    """
+    Which documents are indexed, by filename, with their content hash and chunks.
+    
+    A re-upload whose content hash is already registered is skipped; a new
+    version of a file is diffed against its registered chunk hashes so
+    only changed chunks are embedded (see ``ingest_pdf``). The registry
+    does not depend on the vector store backend.
+    """
+    
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS documents (
+                    filename TEXT PRIMARY KEY,
+                    id TEXT NOT NULL UNIQUE,
+                    content_hash TEXT,
+                    chunks_count INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_documents_hash ON documents (content_hash)")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS document_chunks (
+                    filename TEXT NOT NULL,
+                    chunk_id TEXT NOT NULL,
+                    chunk_hash TEXT NOT NULL,
+                    PRIMARY KEY (filename, chunk_id)
+                ) WITHOUT ROWID"""
+            )
+    
+    def get(self, filename: str) -> Optional[Dict]:
+        """Registered document for a filename, or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM documents WHERE filename = ?", (filename,)).fetchone()
+        return dict(row) if row else None
+    
+    def get_by_id(self, document_id: str) -> Optional[Dict]:
+        """Registered document with this id, or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM documents WHERE id = ?", (document_id,)).fetchone()
+        return dict(row) if row else None
+    
+    def list(self, limit: int = 100, offset: int = 0) -> List[Dict]:
+        """Registered documents, most recently updated first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM documents ORDER BY updated_at DESC, filename LIMIT ? OFFSET ?", (limit, offset)
+            ).fetchall()
+        return [dict(row) for row in rows]
+    
+    def find_by_hash(self, content_hash: str) -> Optional[Dict]:
+        """A registered document with exactly this content, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM documents WHERE content_hash = ? LIMIT 1", (content_hash,)
+            ).fetchone()
+        return dict(row) if row else None
+    
+    def chunk_ids_by_hash(self, filename: str) -> Dict[str, List[str]]:
+        """Chunk ids of a registered file grouped by chunk hash (a text may repeat)."""
+        chunks: Dict[str, List[str]] = {}
+        with self._lock:
+            for chunk_id, digest in self._conn.execute(
+                "SELECT chunk_id, chunk_hash FROM document_chunks WHERE filename = ?", (filename,)
+            ):
+                chunks.setdefault(digest, []).append(chunk_id)
+        return chunks
+    
+    def chunk_ids(self, filename: str) -> List[str]:
+        """Ids of every chunk registered for a file."""
+        with self._lock:
+            return [row[0] for row in self._conn.execute(
+                "SELECT chunk_id FROM document_chunks WHERE filename = ?", (filename,)
+            )]
+    
+    def register(self, filename: str, content_hash: Optional[str], chunks: List[Tuple[str, str]]) -> Dict:
+        """
+        Record a file's current version, replacing its previous chunk list in one transaction.
+        
+        Args:
+            filename: Document filename
+            content_hash: SHA-256 of the file (None if unknown)
+            chunks: (chunk id, chunk hash) of every chunk now indexed for the file
+        
+        Returns:
+            The document record
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM document_chunks WHERE filename = ?", (filename,))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO document_chunks (filename, chunk_id, chunk_hash) VALUES (?, ?, ?)",
+                [(filename, chunk_id, digest) for chunk_id, digest in chunks]
+            )
+            # The id and creation time survive updates of the same file
+            self._conn.execute(
+                "INSERT INTO documents (filename, id, content_hash, chunks_count, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (filename) DO UPDATE SET content_hash = excluded.content_hash, "
+                "chunks_count = excluded.chunks_count, updated_at = excluded.updated_at",
+                (filename, uuid.uuid4().hex, content_hash, len(chunks), now, now)
+            )
+            row = self._conn.execute("SELECT * FROM documents WHERE filename = ?", (filename,)).fetchone()
+        return dict(row)
+    
+    def remove(self, filename: str) -> bool:
+        """Forget a file and its chunks; False if it was not registered."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM document_chunks WHERE filename = ?", (filename,))
+            return self._conn.execute("DELETE FROM documents WHERE filename = ?", (filename,)).rowcount > 0
+    
+    def backfill(self, batches: Iterable[List[Tuple[str, str, str]]]):
+        """
+        Register chunks indexed before the registry existed, without content hashes.
+        
+        Their first re-upload is then diffed chunk by chunk like any update.
+        
+        Args:
+            batches: Lists of (chunk id, filename, text)
+        """
+        now = time.time()
+        counts: Dict[str, int] = {}
+        with self._lock, self._conn:
+            for batch in batches:
+                rows = [(filename, chunk_id, chunk_hash(text or "")) for chunk_id, filename, text in batch if filename]
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO document_chunks (filename, chunk_id, chunk_hash) VALUES (?, ?, ?)", rows
+                )
+                for filename, _, _ in rows:
+                    counts[filename] = counts.get(filename, 0) + 1
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO documents (filename, id, content_hash, chunks_count, created_at, updated_at) "
+                "VALUES (?, ?, NULL, ?, ?, ?)",
+                [(filename, uuid.uuid4().hex, count, now, now) for filename, count in counts.items()]
+            )
+    
+    def count(self) -> int:
+        """Number of registered documents."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
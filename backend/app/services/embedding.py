@@ -1,7 +1,46 @@
 """Embedding service for generating vector embeddings."""
-from typing import List
+from typing import Callable, List, Optional
+from collections import OrderedDict
+import asyncio
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-from app.utils.config import EMBEDDING_MODEL, USE_OPENAI, USE_GEMINI, OPENAI_API_KEY, GEMINI_API_KEY
+from app.utils.config import (
+    EMBEDDING_MODEL, USE_OPENAI, USE_GEMINI, OPENAI_API_KEY, GEMINI_API_KEY,
+    EMBED_BATCH_SIZE, EMBED_MAX_CONCURRENCY, EMBED_MAX_RETRIES, EMBED_RETRY_BASE_DELAY,
+    EMBED_CACHE_ENABLED, EMBED_CACHE_MAX_ENTRIES, EMBED_CACHE_DTYPE, VECTOR_DB_DIR,
+    QUERY_EMBED_CACHE_SIZE
+)
+from app.services.embedding_cache import EmbeddingCache
+from app.services.llm_clients import get_provider_clients
+from app.utils.chunker import estimate_token_counts
+from app.utils.metrics import timed
+
+GEMINI_EMBEDDING_MODEL = "models/text-embedding-004"
+OPENAI_EMBEDDING_MODEL = "text-embedding-3-small"
+GEMINI_EMBEDDING_MAX_TOKENS = 2048
+OPENAI_EMBEDDING_MAX_TOKENS = 8191
+
+# Rate-limit, overload, timeout and connection errors of google.api_core, httpx and
+# openai, matched by class name since those packages are optional
+_TRANSIENT_ERRORS = {
+    "ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "InternalServerError",
+    "BadGateway", "GatewayTimeout", "DeadlineExceeded", "RetryError", "Aborted",
+    "TransportError", "RateLimitError", "APIConnectionError", "APITimeoutError",
+}
+
+
+def _is_transient(error: Exception) -> bool:
+    """Whether retrying ``error`` may succeed (429, 5xx, timeout or connection failure)."""
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    if any(cls.__name__ in _TRANSIENT_ERRORS for cls in type(error).__mro__):
+        return True
+    # google.api_core errors carry the HTTP status
+    code = getattr(error, "code", None)
+    return isinstance(code, int) and (code == 429 or code >= 500)
 
 
 class EmbeddingService:
@@ -10,7 +49,31 @@ class EmbeddingService:
     def __init__(self):
         self.model = None
         self.use_openai = False
+        # Remote batching settings (see configure_batching)
+        self.batch_size = EMBED_BATCH_SIZE
+        self.max_concurrency = EMBED_MAX_CONCURRENCY
+        self.max_retries = EMBED_MAX_RETRIES
+        self.retry_base_delay = EMBED_RETRY_BASE_DELAY
+        self._executor = None
+        self._executor_lock = threading.Lock()
         self._load_model()
+        self._load_tokenizer()
+        
+        # Persistent cache so re-uploaded chunks are not embedded again
+        self.cache = None
+        if EMBED_CACHE_ENABLED:
+            self.cache = EmbeddingCache(
+                VECTOR_DB_DIR / "embedding_cache",
+                self.model_name,
+                max_entries=EMBED_CACHE_MAX_ENTRIES,
+                dtype=EMBED_CACHE_DTYPE
+            )
+        
+        # Exact-match LRU for question embeddings
+        self._query_cache = OrderedDict()
+        self._query_cache_lock = threading.Lock()
+        self.query_cache_hits = 0
+        self.query_cache_misses = 0
     
     def _load_model(self):
         """Load the embedding model."""
@@ -18,6 +81,7 @@ class EmbeddingService:
             # Use Gemini embeddings
             self.use_openai = False
             self.use_gemini = True
+            self.model_name = GEMINI_EMBEDDING_MODEL
             try:
                 import google.generativeai as genai
                 genai.configure(api_key=GEMINI_API_KEY)
@@ -31,10 +95,12 @@ class EmbeddingService:
             # Use OpenAI embeddings
             self.use_openai = True
             self.use_gemini = False
+            self.model_name = OPENAI_EMBEDDING_MODEL
         else:
             # Use sentence-transformers as fallback (local, free)
             self.use_openai = False
             self.use_gemini = False
+            self.model_name = EMBEDDING_MODEL
             try:
                 from sentence_transformers import SentenceTransformer
                 self.model = SentenceTransformer(EMBEDDING_MODEL)
@@ -47,88 +113,374 @@ class EmbeddingService:
             except Exception as e:
                 raise RuntimeError(f"Failed to load embedding model: {str(e)}")
     
-    def embed_text(self, text: str) -> List[float]:
+    def _load_tokenizer(self):
+        """Set the model's input limit and, when available locally, its tokenizer for ``count_tokens``."""
+        self._tokenizer = None
+        if self.use_gemini:
+            # No local tokenizer for Gemini; the estimate errs high
+            self.max_input_tokens = GEMINI_EMBEDDING_MAX_TOKENS
+        elif self.use_openai:
+            self.max_input_tokens = OPENAI_EMBEDDING_MAX_TOKENS
+            try:
+                import tiktoken
+                encoding = tiktoken.encoding_for_model(OPENAI_EMBEDDING_MODEL)
+                self._tokenizer = lambda texts: [len(ids) for ids in encoding.encode_ordinary_batch(texts)]
+            except Exception:
+                pass  # tiktoken not installed or encoding not downloadable
+        else:
+            # max_seq_length includes the [CLS] and [SEP] tokens added to every input
+            self.max_input_tokens = max(1, (getattr(self.model, "max_seq_length", None) or 512) - 2)
+            tokenizer = getattr(self.model, "tokenizer", None)
+            if tokenizer is not None:
+                self._tokenizer = lambda texts: [
+                    len(ids) for ids in tokenizer(
+                        texts, add_special_tokens=False, return_attention_mask=False,
+                        return_token_type_ids=False, verbose=False
+                    )["input_ids"]
+                ]
+    
+    def count_tokens(self, texts: List[str]) -> List[int]:
+        """
+        Count the tokens of each text as the embedding model sees them.
+        
+        Uses the model's own tokenizer when it is available locally
+        (sentence-transformers, or tiktoken for OpenAI) and
+        ``estimate_tokens`` otherwise. Special tokens are not counted;
+        ``max_input_tokens`` already leaves room for them.
+        
+        Args:
+            texts: Input texts
+        
+        Returns:
+            Token count per text
+        """
+        if not texts:
+            return []
+        if self._tokenizer is not None:
+            return self._tokenizer(texts)
+        return estimate_token_counts(texts)
+    
+    def embed_text(self, text: str) -> np.ndarray:
         """
         Generate embedding for a single text.
         
         Args:
             text: Input text
-            
+        
+        Returns:
+            Embedding vector (float32)
+        """
+        if self.cache is not None:
+            cached = self.cache.get_many([text])[0]
+            if cached is not None:
+                return cached
+        
+        embedding = self._compute_text(text)
+        if self.cache is not None:
+            self.cache.put_many([text], [embedding])
+        return embedding
+    
+    @timed("embed")
+    def embed_query(self, text: str) -> np.ndarray:
+        """
+        Generate embedding for a search query, memoized in an in-memory LRU.
+        
+        Args:
+            text: Query text
+        
+        Returns:
+            Embedding vector (float32, read-only: it is shared with the LRU)
+        """
+        embedding = self._query_cache_get(text)
+        if embedding is None:
+            embedding = self.embed_text(text)
+            self._query_cache_put(text, embedding)
+        return embedding
+    
+    @timed("embed")
+    def embed_queries(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed many search queries, computing the LRU misses in one ``embed_documents`` call.
+        
+        Args:
+            texts: Query texts
+        
+        Returns:
+            Contiguous float32 matrix with one embedding per row
+        """
+        embeddings = [self._query_cache_get(text) for text in texts]
+        missing = list(dict.fromkeys(text for text, embedding in zip(texts, embeddings) if embedding is None))
+        computed = {}
+        if missing:
+            vectors = self.embed_documents(missing)
+            computed = dict(zip(missing, vectors))
+            for text, vector in computed.items():
+                self._query_cache_put(text, vector.copy())
+        return np.asarray(
+            [computed[text] if embedding is None else embedding for text, embedding in zip(texts, embeddings)],
+            dtype=np.float32
+        )
+    
+    @timed("embed")
+    async def aembed_query(self, text: str) -> np.ndarray:
+        """
+        Async variant of ``embed_query`` for request handlers.
+        
+        Remote providers are awaited on the shared async clients; the local
+        model and the on-disk cache run in a worker thread, so the event
+        loop is never blocked.
+        
+        Args:
+            text: Query text
+        
         Returns:
-            Embedding vector as list of floats
+            Embedding vector (float32, read-only: it is shared with the LRU)
         """
+        embedding = self._query_cache_get(text)
+        if embedding is not None:
+            return embedding
+        
+        if not (self.use_gemini or self.use_openai):
+            embedding = await asyncio.to_thread(self.embed_text, text)
+        else:
+            cached = None
+            if self.cache is not None:
+                cached = (await asyncio.to_thread(self.cache.get_many, [text]))[0]
+            if cached is not None:
+                embedding = cached
+            else:
+                embedding = await self._acompute_text(text)
+                if self.cache is not None:
+                    await asyncio.to_thread(self.cache.put_many, [text], [embedding])
+        
+        self._query_cache_put(text, embedding)
+        return embedding
+    
+    def _query_cache_get(self, text: str) -> Optional[np.ndarray]:
+        with self._query_cache_lock:
+            embedding = self._query_cache.get(text)
+            if embedding is not None:
+                self._query_cache.move_to_end(text)
+                self.query_cache_hits += 1
+                return embedding
+            self.query_cache_misses += 1
+        return None
+    
+    def _query_cache_put(self, text: str, embedding: np.ndarray):
+        # float32 arrays: a Python list of floats would take ~7x the memory
+        embedding.flags.writeable = False
+        if QUERY_EMBED_CACHE_SIZE > 0:
+            with self._query_cache_lock:
+                self._query_cache[text] = embedding
+                self._query_cache.move_to_end(text)
+                while len(self._query_cache) > QUERY_EMBED_CACHE_SIZE:
+                    self._query_cache.popitem(last=False)
+    
+    async def _acompute_text(self, text: str) -> np.ndarray:
+        """Embed a single text with the provider's async API (no caching)."""
+        clients = get_provider_clients()
         if self.use_gemini:
-            # Use Gemini embeddings
-            try:
-                result = self.genai.embed_content(
-                    model="models/text-embedding-004",
-                    content=text
+            if not hasattr(self.genai, "embed_content_async"):
+                # Older SDKs have no async API
+                embedding = (await asyncio.to_thread(self._embed_gemini_batch, [text]))[0]
+            else:
+                async with clients.limit("gemini"):
+                    result = await asyncio.wait_for(
+                        self.genai.embed_content_async(model=GEMINI_EMBEDDING_MODEL, content=text),
+                        timeout=clients.timeout
+                    )
+                embedding = result['embedding']
+        else:
+            async with clients.limit("openai"):
+                response = await clients.async_openai().embeddings.create(
+                    model=OPENAI_EMBEDDING_MODEL,
+                    input=text
                 )
-                return result['embedding']
-            except Exception as e:
-                raise RuntimeError(f"Error generating Gemini embedding: {str(e)}")
+            embedding = response.data[0].embedding
+        return np.asarray(embedding, dtype=np.float32)
+    
+    def _compute_text(self, text: str) -> np.ndarray:
+        """Embed a single text with the configured provider (no caching)."""
+        if self.use_gemini:
+            # Use Gemini embeddings
+            embedding = self._embed_gemini_batch([text])[0]
         elif self.use_openai:
-            # Use OpenAI embeddings
-            from openai import OpenAI
-            client = OpenAI(api_key=OPENAI_API_KEY)
-            response = client.embeddings.create(
-                model="text-embedding-3-small",
+            # Use OpenAI embeddings (shared pooled client)
+            response = get_provider_clients().openai().embeddings.create(
+                model=OPENAI_EMBEDDING_MODEL,
                 input=text
             )
-            return response.data[0].embedding
+            embedding = response.data[0].embedding
         else:
             # Use sentence-transformers (local, free)
             embedding = self.model.encode(text, convert_to_numpy=True)
-            return embedding.tolist()
+        return np.asarray(embedding, dtype=np.float32)
     
-    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+    def embed_documents(self, texts: List[str]) -> np.ndarray:
         """
         Generate embeddings for multiple texts.
         
         Args:
             texts: List of input texts
-            
+        
         Returns:
-            List of embedding vectors
+            Contiguous float32 matrix with one embedding per row
         """
         if not texts:
-            return []
+            return np.zeros((0, 0), dtype=np.float32)
         
+        if self.cache is None:
+            return self._compute_documents(texts)
+        
+        cached = self.cache.get_many(texts)
+        # Embed each distinct missing text once
+        missing = list(dict.fromkeys(
+            text for text, embedding in zip(texts, cached) if embedding is None
+        ))
+        computed = {}
+        if missing:
+            vectors = self._compute_documents(missing)
+            self.cache.put_many(missing, vectors)
+            computed = dict(zip(missing, vectors))
+        
+        dimension = len(computed[missing[0]]) if missing else len(cached[0])
+        embeddings = np.empty((len(texts), dimension), dtype=np.float32)
+        for i, (text, embedding) in enumerate(zip(texts, cached)):
+            embeddings[i] = computed[text] if embedding is None else embedding
+        return embeddings
+    
+    def _compute_documents(self, texts: List[str]) -> np.ndarray:
+        """Embed multiple texts with the configured provider (no caching)."""
         if self.use_gemini:
-            # Use Gemini embeddings (batch)
-            embeddings = []
-            for text in texts:
-                try:
-                    result = self.genai.embed_content(
-                        model="models/text-embedding-004",
-                        content=text
-                    )
-                    embeddings.append(result['embedding'])
-                except Exception as e:
-                    raise RuntimeError(f"Error generating Gemini embedding: {str(e)}")
-            return embeddings
+            # Use Gemini embeddings (batched requests, several in flight)
+            return np.asarray(self._embed_batched(texts, self._embed_gemini_batch), dtype=np.float32)
         elif self.use_openai:
-            # Use OpenAI embeddings
-            from openai import OpenAI
-            client = OpenAI(api_key=OPENAI_API_KEY)
-            response = client.embeddings.create(
-                model="text-embedding-3-small",
+            # Use OpenAI embeddings (shared pooled client)
+            response = get_provider_clients().openai().embeddings.create(
+                model=OPENAI_EMBEDDING_MODEL,
                 input=texts
             )
-            return [item.embedding for item in response.data]
+            return np.asarray([item.embedding for item in response.data], dtype=np.float32)
         else:
             # Use sentence-transformers (batch processing, local, free)
             embeddings = self.model.encode(texts, convert_to_numpy=True)
-            return embeddings.tolist()
+            return np.ascontiguousarray(embeddings, dtype=np.float32)
+    
+    def _embed_gemini_batch(self, texts: List[str]) -> List[List[float]]:
+        """Embed one batch with a single Gemini request, retrying transient errors."""
+        def call():
+            result = self.genai.embed_content(
+                model=GEMINI_EMBEDDING_MODEL,
+                content=texts
+            )
+            return result['embedding']
+        
+        try:
+            embeddings = self._with_retry(call)
+        except Exception as e:
+            raise RuntimeError(f"Error generating Gemini embedding: {str(e)}")
+        
+        if len(embeddings) != len(texts):
+            raise RuntimeError(
+                f"Error generating Gemini embedding: expected {len(texts)} vectors, got {len(embeddings)}"
+            )
+        return embeddings
+    
+    def _embed_batched(self, texts: List[str], embed_batch: Callable) -> List[List[float]]:
+        """
+        Split texts into batches and embed them with bounded concurrency.
+        
+        Args:
+            texts: Input texts
+            embed_batch: Callable embedding one batch and returning its vectors
+        
+        Returns:
+            Embedding vectors in the same order as ``texts``
+        """
+        batch_size = max(1, self.batch_size)
+        batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+        if len(batches) == 1 or self.max_concurrency <= 1:
+            results = [embed_batch(batch) for batch in batches]
+        else:
+            # map() yields in submission order, so chunk order is preserved
+            results = list(self._get_executor().map(embed_batch, batches))
+        
+        embeddings = []
+        for batch_embeddings in results:
+            embeddings.extend(batch_embeddings)
+        return embeddings
+    
+    def _with_retry(self, func: Callable):
+        """
+        Call ``func``, retrying transient failures with exponential backoff and jitter.
+        
+        Other errors (invalid request, bad API key, unknown model) are raised
+        at once: retrying them would only delay the failure.
+        """
+        attempt = 0
+        while True:
+            try:
+                return func()
+            except Exception as e:
+                attempt += 1
+                if attempt > self.max_retries or not _is_transient(e):
+                    raise
+                delay = self.retry_base_delay * (2 ** (attempt - 1))
+                time.sleep(delay + random.uniform(0, delay))
+    
+    def cache_stats(self) -> dict:
+        """Hit/miss counters of the persistent and query embedding caches."""
+        lookups = self.query_cache_hits + self.query_cache_misses
+        return {
+            "persistent": {"enabled": True, **self.cache.stats()} if self.cache else {"enabled": False},
+            "query": {
+                "entries": len(self._query_cache),
+                "max_entries": QUERY_EMBED_CACHE_SIZE,
+                "hits": self.query_cache_hits,
+                "misses": self.query_cache_misses,
+                "hit_rate": self.query_cache_hits / lookups if lookups else 0.0,
+            },
+        }
+    
+    def configure_batching(self, batch_size: int = None, max_concurrency: int = None):
+        """
+        Override the remote batching settings loaded from config.
+        
+        Args:
+            batch_size: Texts per API request
+            max_concurrency: Requests in flight at once (shared by all callers)
+        """
+        with self._executor_lock:
+            if batch_size is not None:
+                self.batch_size = batch_size
+            if max_concurrency is not None and max_concurrency != self.max_concurrency:
+                self.max_concurrency = max_concurrency
+                if self._executor is not None:
+                    self._executor.shutdown(wait=False)
+                    self._executor = None
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Shared pool bounding how many embedding requests are in flight."""
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_concurrency,
+                        thread_name_prefix="embed"
+                    )
+        return self._executor
 
 
 # Global instance
 _embedding_service = None
+_embedding_service_lock = threading.Lock()
 
 def get_embedding_service() -> EmbeddingService:
     """Get or create the global embedding service instance."""
     global _embedding_service
     if _embedding_service is None:
-        _embedding_service = EmbeddingService()
+        with _embedding_service_lock:
+            if _embedding_service is None:
+                _embedding_service = EmbeddingService()
     return _embedding_service
 
@@ -0,0 +1,278 @@
+"""Persistent, content-addressed cache of text embeddings."""
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+
+# Rows added to the vector file each time it has to grow
+_GROWTH_ROWS = 4096
+
+# Cache hits recorded in memory before their last-use times are written
+_TOUCH_BATCH = 1024
+
+# Rows reserved by a writer that died before filling them are reusable after this
+_STALE_RESERVATION_SECONDS = 3600
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text so trivially different copies share a cache entry."""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+
+def text_key(model_name: str, text: str) -> str:
+    """Cache key for ``text`` embedded by ``model_name``."""
+    digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+    return f"{model_name}:{digest}"
+
+
+class EmbeddingCache:
+    """
+    On-disk embedding cache keyed by (model name, hash of normalized text).
+    
+    Vectors live in a memory-mapped ``float16``/``float32`` matrix, one row
+    per entry; a small SQLite table maps keys to rows and tracks last use.
+    When ``max_entries`` is reached the least recently used rows are reused.
+    
+    Several processes (the server, batch scripts, benchmarks) may share a
+    cache directory. Rows are allocated and the file grown inside a
+    ``BEGIN IMMEDIATE`` transaction that re-reads the allocation state from
+    the ``meta`` table, and a row is only overwritten after the key it held
+    has been deleted, so a lookup that raced with the rewrite notices its
+    key is gone and reports a miss. Last-use times are only approximate:
+    hits are recorded in memory and written in batches.
+    """
+    
+    def __init__(self, directory: Path, model_name: str, max_entries: int, dtype: str = "float16"):
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.dtype = np.dtype(dtype)
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+        self.directory = Path(directory) / safe_name
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.vectors_file = self.directory / f"vectors.{self.dtype.name}"
+        
+        self._lock = threading.Lock()
+        # Transactions are managed explicitly (BEGIN IMMEDIATE) rather than by the sqlite3 module
+        self._conn = sqlite3.connect(
+            str(self.directory / "index.sqlite3"), check_same_thread=False, isolation_level=None, timeout=30
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._transaction():
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, slot INTEGER NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_lru ON entries (last_used)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER)")
+            meta = self._read_meta()
+        self.dimension = meta.get("dimension")
+        self._next_slot = meta["next_slot"]
+        self._vectors = None
+        if self.dimension and meta.get("capacity") and self.vectors_file.exists():
+            self._map(meta["capacity"])
+        self._touched: Dict[str, float] = {}  # Hits not yet written to last_used
+        
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get_many(self, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """
+        Look up cached embeddings.
+        
+        Args:
+            texts: Input texts
+        
+        Returns:
+            One float32 vector per text, or None where the text is not cached
+        """
+        keys = [text_key(self.model_name, text) for text in texts]
+        results: List[Optional[np.ndarray]] = [None] * len(texts)
+        with self._lock:
+            if self.dimension is None:
+                # Possibly filled by another process since
+                self.dimension = self._read_meta().get("dimension")
+            if self.dimension is None:
+                self.misses += len(texts)
+                return results
+            
+            slots = self._lookup_slots(set(keys))
+            if slots and (self._vectors is None or max(slots.values()) >= len(self._vectors)):
+                # Another process grew the file
+                self._map(self._read_meta().get("capacity", 0))
+            vectors = {key: np.array(self._vectors[slot], dtype=np.float32) for key, slot in slots.items()}
+            if slots:
+                # A row rewritten meanwhile lost its old key first: drop hits whose key moved
+                current = self._lookup_slots(set(slots))
+                vectors = {key: vector for key, vector in vectors.items() if current.get(key) == slots[key]}
+            for i, key in enumerate(keys):
+                results[i] = vectors.get(key)
+            
+            hit_count = sum(1 for r in results if r is not None)
+            self.hits += hit_count
+            self.misses += len(texts) - hit_count
+            now = time.time()
+            self._touched.update((key, now) for key in vectors)
+            if len(self._touched) >= _TOUCH_BATCH:
+                with self._transaction():
+                    self._flush_touched()
+        return results
+    
+    def put_many(self, texts: Sequence[str], vectors: Sequence[Sequence[float]]):
+        """
+        Store embeddings, evicting least recently used entries when full.
+        
+        Texts that are already cached keep their stored vector (the key is
+        the model and the text, so it is the same embedding).
+        
+        Args:
+            texts: Input texts
+            vectors: Their embeddings (same order)
+        """
+        if not len(texts):
+            return
+        vectors = np.asarray(vectors, dtype=np.float32)
+        entries: Dict[str, np.ndarray] = {}
+        for text, vector in zip(texts, vectors):
+            entries[text_key(self.model_name, text)] = vector
+        if len(entries) > self.max_entries:
+            entries = dict(list(entries.items())[-self.max_entries:])
+        
+        with self._lock:
+            now = time.time()
+            # 1. Reserve rows: placeholders take the slots, evicted keys are deleted
+            with self._transaction():
+                self._flush_touched()
+                meta = self._read_meta()
+                if meta.get("dimension") is None:
+                    meta["dimension"] = int(vectors.shape[1])
+                    self._write_meta("dimension", meta["dimension"])
+                self.dimension = meta["dimension"]
+                
+                existing = self._lookup_slots(set(entries))
+                self._conn.executemany(
+                    "UPDATE entries SET last_used = ? WHERE key = ?", [(now, key) for key in existing]
+                )
+                new_keys = [key for key in entries if key not in existing]
+                next_slot = meta["next_slot"]
+                fresh = min(len(new_keys), max(0, self.max_entries - next_slot))
+                slots = list(range(next_slot, next_slot + fresh))
+                next_slot += fresh
+                if len(new_keys) > fresh:
+                    # Full: reuse the least recently used rows (not ones another writer is filling)
+                    victims = self._conn.execute(
+                        "SELECT key, slot FROM entries WHERE key NOT LIKE 'reserved:%' OR last_used < ? "
+                        "ORDER BY last_used LIMIT ?",
+                        (now - _STALE_RESERVATION_SECONDS, len(new_keys) - fresh)
+                    ).fetchall()
+                    self._conn.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key, _ in victims])
+                    slots.extend(slot for _, slot in victims)
+                    self.evictions += len(victims)
+                new_keys = new_keys[:len(slots)]
+                self._conn.executemany(
+                    "INSERT INTO entries (key, slot, last_used) VALUES (?, ?, ?)",
+                    [(f"reserved:{slot}", slot, now) for slot in slots]
+                )
+                capacity = meta.get("capacity", 0)
+                if next_slot > capacity:
+                    capacity = min(self.max_entries, max(capacity * 2, _GROWTH_ROWS, next_slot))
+                    self._grow(capacity)
+                    self._write_meta("capacity", capacity)
+                self._write_meta("next_slot", next_slot)
+                self._next_slot = next_slot
+            if not slots:
+                return
+            
+            # 2. Fill the rows, then 3. publish the keys
+            if self._vectors is None or len(self._vectors) < capacity:
+                self._map(capacity)
+            for key, slot in zip(new_keys, slots):
+                self._vectors[slot] = entries[key]
+            self._vectors.flush()
+            with self._transaction():
+                # OR IGNORE: a key stored by another process meanwhile keeps its row; the placeholder ages out
+                self._conn.executemany(
+                    "UPDATE OR IGNORE entries SET key = ? WHERE key = ?",
+                    [(key, f"reserved:{slot}") for key, slot in zip(new_keys, slots)]
+                )
+    
+    def stats(self) -> Dict:
+        """Hit/miss counters and occupancy."""
+        lookups = self.hits + self.misses
+        capacity = len(self._vectors) if self._vectors is not None else 0
+        return {
+            "model": self.model_name,
+            "entries": min(self._next_slot, self.max_entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "bytes": capacity * (self.dimension or 0) * self.dtype.itemsize,
+        }
+    
+    @contextmanager
+    def _transaction(self):
+        # IMMEDIATE takes the write lock up front, so the state read inside stays valid until commit
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+    
+    def _read_meta(self) -> Dict:
+        meta = dict(self._conn.execute("SELECT name, value FROM meta").fetchall())
+        if "next_slot" not in meta:
+            # Caches written before next_slot was stored: every row below the highest is in use
+            meta["next_slot"] = self._conn.execute("SELECT COALESCE(MAX(slot) + 1, 0) FROM entries").fetchone()[0]
+        return meta
+    
+    def _write_meta(self, name: str, value: int):
+        self._conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)", (name, value))
+    
+    def _flush_touched(self):
+        # Caller holds a transaction
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE entries SET last_used = MAX(last_used, ?) WHERE key = ?",
+                [(used, key) for key, used in self._touched.items()]
+            )
+            self._touched.clear()
+    
+    def _lookup_slots(self, keys: set) -> Dict[str, int]:
+        found = {}
+        key_list = list(keys)
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(key_list), 500):
+            part = key_list[start:start + 500]
+            placeholders = ",".join("?" * len(part))
+            found.update(self._conn.execute(
+                f"SELECT key, slot FROM entries WHERE key IN ({placeholders})", part
+            ).fetchall())
+        return found
+    
+    def _grow(self, capacity: int):
+        """Extend the vector file to ``capacity`` rows (caller holds the write transaction)."""
+        size = capacity * self.dimension * self.dtype.itemsize
+        with open(self.vectors_file, "ab") as f:
+            # Never shrink: the size is only ever raised under the write lock
+            if f.seek(0, 2) < size:
+                f.truncate(size)
+    
+    def _map(self, capacity: int):
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+        if capacity:
+            self._vectors = np.memmap(
+                self.vectors_file, dtype=self.dtype, mode="r+",
+                shape=(capacity, self.dimension)
+            )
@@ -0,0 +1,700 @@
+"""Append-only, segmented FAISS index with crash-safe persistence."""
+import json
+import os
+import pickle
+import threading
+import weakref
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from app.services.metadata_store import ChunkMetadataStore
+
+MANIFEST_NAME = "MANIFEST.json"
+METADATA_DB_NAME = "metadata.sqlite3"
+
+# Supported values of ``index_type``
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+
+# Supported values of ``quantization`` (how segments encode vectors)
+QUANTIZATIONS = ("none", "fp16", "int8", "pq")
+
+# Scalar quantizer of untrained segments per quantization; PQ codebooks
+# need many vectors to train, so small segments use int8 until merged
+_FRESH_ENCODINGS = {"fp16": "SQfp16", "int8": "SQ8", "pq": "SQ8"}
+
+# Upper bound on vectors used to train IVF/PQ quantizers (random sample beyond)
+_MAX_TRAIN_VECTORS = 100000
+
+# Open stores by directory (see open_segment_store)
+_open_stores = weakref.WeakValueDictionary()
+_opening: Dict[str, threading.Lock] = {}
+_opening_lock = threading.Lock()
+
+
+def _fsync_file(path: Path):
+    with open(path, "rb") as f:
+        os.fsync(f.fileno())
+
+
+def _fsync_dir(path: Path):
+    # Persist renames; not supported on every platform (e.g. Windows)
+    try:
+        fd = os.open(str(path), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class Segment:
+    """
+    One immutable FAISS index file (metadata lives in the shared SQLite store).
+    
+    ``vectors_path`` is the segment's exact float32 copy, kept by trained and
+    quantized segments; ``lossy`` segments rescore candidates against it.
+    """
+    
+    def __init__(self, name: str, index, faiss, vectors_path: Path = None, nbytes: int = 0):
+        self.name = name
+        self.index = index
+        self.faiss = faiss
+        self.vectors_path = vectors_path
+        self.nbytes = nbytes  # Size of the index file (mapped or loaded)
+        self._sorted_ids = None  # Built on the first subset search or re-rank
+        self._order = None  # None while ids are stored in ascending order
+        self._vectors = None
+        inner = faiss.downcast_index(index.index)
+        storage = inner
+        if isinstance(inner, faiss.IndexIVF):
+            self.kind = "ivf"
+        elif isinstance(inner, faiss.IndexHNSW):
+            self.kind = "hnsw"
+            storage = faiss.downcast_index(inner.storage)
+        elif isinstance(inner, faiss.IndexPQ):
+            self.kind = "pq"
+        else:
+            # Exact or scalar-quantized, untrained: merged into a trained segment when configured
+            self.kind = "flat"
+        self.lossy = not isinstance(storage, (faiss.IndexFlat, faiss.IndexIVFFlat))
+    
+    @property
+    def ntotal(self) -> int:
+        return self.index.ntotal
+    
+    def memory_bytes(self) -> int:
+        """Estimated resident size: the index plus the id lookup of subset searches, once built."""
+        lookup = 0
+        if self._sorted_ids is not None:
+            lookup = self._sorted_ids.nbytes + (0 if self._order is None else self._order.nbytes)
+        return self.nbytes + lookup
+    
+    def vectors(self) -> np.ndarray:
+        """Original float32 vectors of the segment, in id-map order."""
+        if self.vectors_path is not None:
+            # Trained or quantized indexes keep a raw copy next to them
+            return self._mapped_vectors()
+        return self.index.index.reconstruct_n(0, self.ntotal)
+    
+    def _mapped_vectors(self) -> np.ndarray:
+        # Memory-mapped once: only the rows that are read become resident
+        if self._vectors is None:
+            self._vectors = np.load(self.vectors_path, mmap_mode="r")
+        return self._vectors
+    
+    def locate(self, row_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find row ids in this segment.
+        
+        Args:
+            row_ids: Sorted, unique row ids
+        
+        Returns:
+            Tuple (the row ids present here, their positions in id-map order)
+        """
+        if self._sorted_ids is None:
+            ids = self.faiss.vector_to_array(self.index.id_map)
+            if np.all(ids[1:] > ids[:-1]):
+                # Segments are written in id order: positions are the search slots themselves
+                self._sorted_ids = ids
+            else:
+                order = np.argsort(ids, kind="stable")
+                self._order, self._sorted_ids = order, ids[order]
+        if len(self._sorted_ids) == 0:
+            return row_ids[:0], row_ids[:0]
+        slots = np.minimum(np.searchsorted(self._sorted_ids, row_ids), len(self._sorted_ids) - 1)
+        found = self._sorted_ids[slots] == row_ids
+        positions = slots[found]
+        return row_ids[found], positions if self._order is None else self._order[positions]
+    
+    def vectors_at(self, positions: np.ndarray) -> np.ndarray:
+        """Original float32 vectors at the given id-map positions."""
+        if self.vectors_path is not None:
+            return np.asarray(self._mapped_vectors()[positions], dtype=np.float32)
+        return self.index.index.reconstruct_batch(positions)
+
+
+class FaissSegmentStore:
+    """
+    FAISS vectors stored as a list of immutable, append-only segments.
+    
+    Every ``append`` writes a new segment index to a temporary file, renames
+    it into place and then atomically replaces ``MANIFEST.json``, which is
+    the single commit point: a crash at any moment leaves either the old or
+    the new manifest, never a half-written index. Segments are opened
+    memory-mapped and searched together. A background compaction merges
+    segments once there are more than ``max_segments`` of them.
+    
+    Chunk metadata and text are kept in ``metadata.sqlite3`` keyed by row
+    id, so they are neither loaded at startup nor rewritten by compaction;
+    searches read them for the final top-k hits only.
+    
+    New segments are exact (flat). When ``index_type`` is an ANN type, flat
+    segments are merged into a trained IVF-Flat, IVF-PQ or HNSW segment as
+    soon as they hold ``min_train_vectors`` vectors between them; this also
+    migrates an existing flat index after the setting is changed.
+    
+    Deleting a chunk leaves its vector in place and records a tombstone
+    (its row id) that searches exclude with an ID selector, so deletes
+    never rewrite or re-embed anything. Compaction drops tombstoned
+    vectors; once more than ``max_deleted_ratio`` of all vectors are
+    tombstoned, every segment is compacted to reclaim the space.
+    
+    A search restricted to at most ``subset_search_max`` row ids scores
+    exactly those vectors instead of searching the segments with an ID
+    selector: that is cheaper for selective filters, and an IVF or HNSW
+    search could miss matches outside the lists or graph region it visits.
+    
+    ``quantization`` compresses the vectors held by the indexes: "fp16"
+    (2 bytes per dimension), "int8" (1 byte) or "pq" (``pq_m`` bytes per
+    vector once trained; untrained segments use int8 meanwhile). Each such
+    segment keeps its exact float32 vectors in a memory-mapped file on
+    disk, and searches fetch ``rerank_factor`` times more candidates from
+    lossy segments and rescore them against those vectors, so only the
+    candidates' rows are read. It applies to segments written after it is
+    set, including the ones a compaction merges.
+    """
+    
+    def __init__(
+        self,
+        directory: Path,
+        dimension: int,
+        faiss,
+        max_segments: int = 8,
+        index_type: str = "flat",
+        min_train_vectors: int = 10000,
+        nlist: int = 0,
+        pq_m: int = 16,
+        hnsw_m: int = 32,
+        nprobe: int = 16,
+        ef_search: int = 64,
+        max_deleted_ratio: float = 0.2,
+        subset_search_max: int = 10000,
+        quantization: str = "none",
+        rerank_factor: int = 4
+    ):
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown FAISS index type {index_type!r}; expected one of {INDEX_TYPES}")
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unknown FAISS quantization {quantization!r}; expected one of {QUANTIZATIONS}")
+        if index_type == "hnsw" and quantization == "pq":
+            # FAISS builds HNSW-PQ for L2 only; scores here are inner products
+            raise ValueError("FAISS quantization 'pq' is not supported with the 'hnsw' index type")
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.dimension = dimension
+        self.faiss = faiss
+        self.max_segments = max_segments
+        self.index_type = index_type
+        self.min_train_vectors = min_train_vectors
+        self.nlist = nlist
+        self.pq_m = pq_m
+        self.hnsw_m = hnsw_m
+        self.max_deleted_ratio = max_deleted_ratio
+        self.subset_search_max = subset_search_max
+        self.quantization = quantization
+        self.rerank_factor = rerank_factor
+        # Whether flat segments are merged into trained ones (ANN index or PQ codebooks)
+        self.trains = index_type != "flat" or quantization == "pq"
+        # Default search-time knobs; overridable per search call
+        self.nprobe = nprobe
+        self.ef_search = ef_search
+        
+        # Serializes writers (append, compaction commit)
+        self._write_lock = threading.Lock()
+        # Guards the segment list swap; readers take a snapshot under it
+        self._lock = threading.Lock()
+        self._compaction_lock = threading.Lock()
+        self._compacting = False
+        self._compaction_thread = None
+        
+        self.metadata = ChunkMetadataStore(self.directory / METADATA_DB_NAME)
+        self._load()
+    
+    @property
+    def ntotal(self) -> int:
+        """Total number of vectors across all segments, including tombstoned ones."""
+        return sum(segment.ntotal for segment in self.segments)
+    
+    @property
+    def deleted_count(self) -> int:
+        """Tombstoned vectors not yet removed by a compaction."""
+        return len(self.tombstones)
+    
+    def memory_bytes(self) -> int:
+        """Estimated memory held by the open segments and tombstones (metadata stays in SQLite)."""
+        with self._lock:
+            segments = self.segments
+            tombstones = self.tombstones
+        return sum(segment.memory_bytes() for segment in segments) + tombstones.nbytes
+    
+    def _load(self):
+        manifest_path = self.directory / MANIFEST_NAME
+        if manifest_path.exists():
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+        else:
+            manifest = {"next_id": 0, "next_segment": 0, "segments": []}
+        
+        self.next_id = manifest["next_id"]
+        self.next_segment = manifest["next_segment"]
+        self.segments: List[Segment] = [self._open_segment(name) for name in manifest["segments"]]
+        self._migrate_pickled_metadata()
+        # Rows of an append that never reached the manifest
+        self.metadata.delete_from(self.next_id)
+        self.tombstones = self.metadata.tombstones()
+        self._remove_orphans()
+        # Train/migrate right away if flat data already warrants an ANN index
+        self._maybe_compact()
+    
+    def _open_segment(self, name: str) -> Segment:
+        index_path = self.directory / f"{name}.index"
+        flags = getattr(self.faiss, "IO_FLAG_MMAP_IFC", self.faiss.IO_FLAG_MMAP)
+        try:
+            index = self.faiss.read_index(str(index_path), flags | self.faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError:
+            # Index type without mmap support: load it into memory
+            index = self.faiss.read_index(str(index_path))
+        vectors_path = self.directory / f"{name}.vectors.npy"
+        return Segment(
+            name, index, self.faiss, vectors_path if vectors_path.exists() else None, index_path.stat().st_size
+        )
+    
+    def _migrate_pickled_metadata(self):
+        """Move metadata of segments written with per-segment pickles into SQLite."""
+        for segment in self.segments:
+            meta_path = self.directory / f"{segment.name}.meta.pkl"
+            if not meta_path.exists():
+                continue
+            with open(meta_path, "rb") as f:
+                metadata = pickle.load(f)
+            self.metadata.add(metadata.keys(), metadata.values())
+            meta_path.unlink()
+    
+    def _remove_orphans(self):
+        """Delete files left behind by a crash before the manifest was committed."""
+        live = {segment.name for segment in self.segments}
+        for path in self.directory.iterdir():
+            name = path.name.split(".", 1)[0]
+            if path.name == MANIFEST_NAME or name in live:
+                continue
+            if name.startswith("seg_") or path.name.endswith(".tmp"):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+    
+    def _write_manifest(self, segment_names: List[str]):
+        manifest = {
+            "next_id": self.next_id,
+            "next_segment": self.next_segment,
+            "segments": segment_names,
+        }
+        tmp_path = self.directory / f"{MANIFEST_NAME}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.directory / MANIFEST_NAME)
+        _fsync_dir(self.directory)
+    
+    def _index_description(self, n: int) -> str:
+        """FAISS ``index_factory`` string for a trained segment of ``n`` vectors."""
+        # PQ needs the sub-quantizer count to divide the dimension
+        m = max(d for d in range(1, min(self.pq_m, self.dimension) + 1) if self.dimension % d == 0)
+        if self.index_type == "flat":
+            return f"PQ{m}"
+        if self.index_type == "hnsw":
+            encoding = _FRESH_ENCODINGS.get(self.quantization)
+            return f"HNSW{self.hnsw_m}" + (f"_{encoding}" if encoding else "")
+        # ~4*sqrt(n) lists, with at least 39 training points per centroid
+        nlist = self.nlist or int(4 * np.sqrt(n))
+        nlist = max(1, min(nlist, n // 39))
+        if self.index_type == "ivf_pq" or self.quantization == "pq":
+            return f"IVF{nlist},PQ{m}"
+        return f"IVF{nlist}," + _FRESH_ENCODINGS.get(self.quantization, "Flat")
+    
+    def _build_index(self, vectors: np.ndarray, ids: np.ndarray, trained: bool):
+        if trained:
+            sub_index = self.faiss.index_factory(
+                self.dimension, self._index_description(len(vectors)), self.faiss.METRIC_INNER_PRODUCT
+            )
+            if isinstance(sub_index, self.faiss.IndexHNSW):
+                sub_index.hnsw.efConstruction = max(40, 2 * self.hnsw_m)
+            if isinstance(sub_index, (self.faiss.IndexIVFPQ, self.faiss.IndexPQ)):
+                # Polysemous codes are never used for search; skip their slow training
+                sub_index.do_polysemous_training = False
+            train = vectors
+            if len(vectors) > _MAX_TRAIN_VECTORS:
+                sample = np.random.default_rng(0).choice(len(vectors), _MAX_TRAIN_VECTORS, replace=False)
+                train = vectors[np.sort(sample)]
+            sub_index.train(train)
+        elif self.quantization != "none":
+            sub_index = self.faiss.index_factory(
+                self.dimension, _FRESH_ENCODINGS[self.quantization], self.faiss.METRIC_INNER_PRODUCT
+            )
+            if not sub_index.is_trained:
+                # Scalar quantizer ranges of this segment's own vectors
+                sub_index.train(vectors)
+        else:
+            sub_index = self.faiss.IndexFlatIP(self.dimension)
+        # No reverse id map (IndexIDMap2): lookups by id go through Segment.locate
+        index = self.faiss.IndexIDMap(sub_index)
+        index.add_with_ids(vectors, ids)
+        return index
+    
+    def _write_segment(self, vectors: np.ndarray, ids: np.ndarray, trained: bool = False) -> str:
+        """Write a new segment's files (not yet referenced by the manifest)."""
+        name = f"seg_{self.next_segment:08d}"
+        self.next_segment += 1
+        
+        index = self._build_index(vectors, ids, trained)
+        
+        index_path = self.directory / f"{name}.index"
+        self.faiss.write_index(index, str(index_path) + ".tmp")
+        _fsync_file(Path(str(index_path) + ".tmp"))
+        if trained or self.quantization != "none":
+            # Keep exact vectors for re-ranking and so later merges can retrain without loss
+            with open(self.directory / f"{name}.vectors.npy.tmp", "wb") as f:
+                np.save(f, vectors)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(self.directory / f"{name}.vectors.npy.tmp", self.directory / f"{name}.vectors.npy")
+        os.replace(str(index_path) + ".tmp", index_path)
+        return name
+    
+    def append(self, vectors: np.ndarray, metadatas: List[Dict]) -> List[int]:
+        """
+        Persist vectors and their metadata as a new segment.
+        
+        Args:
+            vectors: (n, dimension) float32 matrix, already normalized
+            metadatas: One metadata dict per vector
+        
+        Returns:
+            Integer row ids assigned to the vectors
+        """
+        with self._write_lock:
+            ids = np.arange(self.next_id, self.next_id + len(vectors), dtype=np.int64)
+            # Metadata goes in first; rows past the manifest's next_id are dropped on load
+            self.metadata.add(ids.tolist(), metadatas)
+            try:
+                name = self._write_segment(vectors, ids)
+                self.next_id += len(vectors)
+                segment_names = [segment.name for segment in self.segments] + [name]
+                self._write_manifest(segment_names)
+            except Exception:
+                self.metadata.delete_from(int(ids[0]))
+                raise
+            segment = self._open_segment(name)
+            with self._lock:
+                self.segments = self.segments + [segment]
+        
+        self._maybe_compact()
+        return [int(i) for i in ids]
+    
+    def delete(self, chunk_ids: List[str]) -> int:
+        """
+        Delete chunks by uuid, leaving their vectors to the next compaction.
+        
+        Args:
+            chunk_ids: Chunk uuids; unknown ids are ignored
+        
+        Returns:
+            Number of chunks deleted
+        """
+        row_ids = self.metadata.delete_chunk_ids(chunk_ids)
+        if row_ids:
+            with self._lock:
+                self.tombstones = np.union1d(self.tombstones, np.array(row_ids, dtype=np.int64))
+            self._maybe_compact()
+        return len(row_ids)
+    
+    def import_legacy(self, index, metadata: List[Dict]):
+        """Convert a pre-segment ``IndexFlatIP`` + metadata list into a segment."""
+        if index.ntotal == 0:
+            return
+        vectors = index.reconstruct_n(0, index.ntotal)
+        self.append(np.ascontiguousarray(vectors, dtype=np.float32), metadata)
+    
+    def _segments_to_compact(self) -> List[Segment]:
+        """Pick the segments a compaction should merge right now (may be empty)."""
+        segments = self.segments
+        if len(segments) > self.max_segments:
+            return list(segments)
+        if segments and len(self.tombstones) > self.max_deleted_ratio * self.ntotal:
+            return list(segments)
+        if self.trains:
+            flat = [s for s in segments if s.kind == "flat"]
+            if sum(s.ntotal for s in flat) >= self.min_train_vectors:
+                return flat
+        return []
+    
+    def _maybe_compact(self):
+        with self._lock:
+            if self._compacting or not self._segments_to_compact():
+                return
+            self._compacting = True
+        self._compaction_thread = threading.Thread(
+            target=self._compact_in_background, name="faiss-compaction", daemon=True
+        )
+        self._compaction_thread.start()
+    
+    def _compact_in_background(self):
+        # Appends and deletes made meanwhile skip _maybe_compact while the flag
+        # is set, so keep going until nothing is due; the flag is cleared under
+        # the same lock as that check, or a write could slip in between
+        try:
+            while True:
+                with self._compaction_lock:
+                    with self._lock:
+                        victims = self._segments_to_compact()
+                        if not victims:
+                            self._compacting = False
+                            return
+                    self._compact(victims)
+        except BaseException:
+            with self._lock:
+                self._compacting = False
+            raise
+    
+    def compact(self):
+        """Merge all current segments into one (trained if large enough) and drop the old files."""
+        with self._compaction_lock:
+            with self._lock:
+                victims = list(self.segments)
+            needs_training = (
+                self.trains
+                and any(s.kind == "flat" for s in victims)
+                and sum(s.ntotal for s in victims) >= self.min_train_vectors
+            )
+            if len(victims) > 1 or needs_training or len(self.tombstones):
+                self._compact(victims)
+    
+    def _compact(self, victims: List[Segment]):
+        with self._lock:
+            dead = self.tombstones
+            everything = len(victims) == len(self.segments)
+        
+        # Gather vectors outside the write lock so uploads are not blocked
+        vectors, ids = [], []
+        for segment in victims:
+            vectors.append(segment.vectors())
+            ids.append(self.faiss.vector_to_array(segment.index.id_map))
+        vectors = np.ascontiguousarray(np.vstack(vectors), dtype=np.float32)
+        ids = np.concatenate(ids).astype(np.int64)
+        purged = np.zeros(0, dtype=np.int64)
+        if len(dead):
+            # Drop deleted vectors; when every segment is merged, tombstones of ids found nowhere go too
+            live = ~np.isin(ids, dead)
+            purged = dead if everything else ids[~live]
+            vectors, ids = np.ascontiguousarray(vectors[live]), ids[live]
+        if np.any(ids[1:] <= ids[:-1]):
+            # Write segments in id order (Segment.locate then needs no permutation)
+            order = np.argsort(ids, kind="stable")
+            vectors, ids = vectors[order], ids[order]
+        trained = self.trains and len(vectors) >= self.min_train_vectors
+        
+        with self._write_lock:
+            name = self._write_segment(vectors, ids, trained=trained) if len(ids) else None
+            victim_names = {segment.name for segment in victims}
+            # Keep segments appended while we were merging
+            remaining = [s for s in self.segments if s.name not in victim_names]
+            merged = [] if name is None else [name]
+            self._write_manifest(merged + [s.name for s in remaining])
+            merged = [self._open_segment(name) for name in merged]
+            with self._lock:
+                self.segments = merged + remaining
+                self.tombstones = np.setdiff1d(self.tombstones, purged)
+        if len(purged):
+            self.metadata.clear_tombstones(purged.tolist())
+        
+        for victim in victim_names:
+            for suffix in (".index", ".meta.pkl", ".vectors.npy"):
+                try:
+                    (self.directory / f"{victim}{suffix}").unlink(missing_ok=True)
+                except OSError:
+                    # Still mapped (Windows); removed as an orphan on next start
+                    pass
+    
+    def wait_for_compaction(self):
+        """Block until a running background compaction finishes."""
+        thread = self._compaction_thread
+        if thread is not None:
+            thread.join()
+    
+    def _search_params(self, segment: Segment, top_k: int, nprobe: Optional[int], ef_search: Optional[int], selector=None):
+        if segment.kind == "ivf":
+            return self.faiss.SearchParametersIVF(nprobe=nprobe or self.nprobe, sel=selector)
+        if segment.kind == "hnsw":
+            return self.faiss.SearchParametersHNSW(efSearch=max(ef_search or self.ef_search, top_k), sel=selector)
+        if selector is not None:
+            return self.faiss.SearchParameters(sel=selector)
+        return None
+    
+    def search(
+        self,
+        queries: np.ndarray,
+        top_k: int,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        id_filter: Optional[np.ndarray] = None
+    ) -> List[List[Tuple[float, int, Dict]]]:
+        """
+        Search every segment and merge the per-segment top-k lists.
+        
+        Lossy segments return ``rerank_factor * top_k`` candidates, rescored
+        exactly before the merge.
+        
+        Args:
+            queries: (q, dimension) float32 matrix, already normalized
+            top_k: Number of results per query
+            nprobe: IVF lists to visit (default from the store)
+            ef_search: HNSW candidate list size (default from the store)
+            id_filter: Optional row ids to restrict the search to
+        
+        Returns:
+            For each query, a list of (score, row id, metadata) best first
+        """
+        with self._lock:
+            segments = self.segments
+            tombstones = self.tombstones
+        
+        results = [[] for _ in range(len(queries))]
+        if id_filter is not None and len(tombstones):
+            id_filter = np.setdiff1d(id_filter, tombstones)
+        if id_filter is not None and len(id_filter) == 0:
+            return results
+        if id_filter is not None and len(id_filter) <= self.subset_search_max:
+            id_filter = np.asarray(id_filter, dtype=np.int64)
+            if np.any(id_filter[1:] <= id_filter[:-1]):
+                id_filter = np.unique(id_filter)
+            results = self._search_subset(queries, top_k, id_filter, segments)
+            return self._with_metadata(results)
+        selector = None
+        if id_filter is not None:
+            selector = self.faiss.IDSelectorBatch(np.ascontiguousarray(id_filter, dtype=np.int64))
+        elif len(tombstones):
+            # Keep a reference to the inner selector: the wrapper does not own it
+            excluded = self.faiss.IDSelectorBatch(tombstones)
+            selector = self.faiss.IDSelectorNot(excluded)
+        
+        for segment in segments:
+            if segment.ntotal == 0:
+                continue
+            rerank = segment.lossy and segment.vectors_path is not None and self.rerank_factor > 1
+            depth = top_k * self.rerank_factor if rerank else top_k
+            params = self._search_params(segment, depth, nprobe, ef_search, selector)
+            scores, ids = segment.index.search(queries, min(depth, segment.ntotal), params=params)
+            if rerank:
+                scores = self._rerank(segment, queries, ids)
+            for q in range(len(queries)):
+                for score, row_id in zip(scores[q], ids[q]):
+                    if row_id >= 0:
+                        results[q].append((float(score), int(row_id)))
+        
+        for q in range(len(queries)):
+            results[q].sort(key=lambda hit: hit[0], reverse=True)
+            results[q] = results[q][:top_k]
+        return self._with_metadata(results)
+    
+    def _rerank(self, segment: Segment, queries: np.ndarray, ids: np.ndarray) -> np.ndarray:
+        """Exact float32 scores of each query's candidate row ids (-1 = no candidate)."""
+        valid = ids >= 0
+        candidates = np.unique(ids[valid])
+        _, positions = segment.locate(candidates)
+        # One read of every distinct candidate row, shared by all queries
+        vectors = segment.vectors_at(positions)
+        rows = np.searchsorted(candidates, ids)
+        scores = np.full(ids.shape, -np.inf, dtype=np.float32)
+        for q in range(len(queries)):
+            scores[q, valid[q]] = vectors[rows[q, valid[q]]] @ queries[q]
+        return scores
+    
+    def _search_subset(
+        self, queries: np.ndarray, top_k: int, row_ids: np.ndarray, segments: List[Segment]
+    ) -> List[List[Tuple[float, int]]]:
+        """Exact inner-product search over the vectors of the given row ids only."""
+        found, scores = [], []
+        for segment in segments:
+            ids, positions = segment.locate(row_ids)
+            if len(ids):
+                found.append(ids)
+                scores.append(queries @ segment.vectors_at(positions).T)
+        if not found:
+            return [[] for _ in range(len(queries))]
+        ids = np.concatenate(found)
+        scores = np.hstack(scores)
+        k = min(top_k, len(ids))
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for q in range(len(queries)):
+            best = top[q][np.argsort(-scores[q, top[q]], kind="stable")]
+            results.append([(float(scores[q, i]), int(ids[i])) for i in best])
+        return results
+    
+    def _with_metadata(self, results: List[List[Tuple[float, int]]]) -> List[List[Tuple[float, int, Dict]]]:
+        # Text and metadata are only read for the hits that are returned
+        metadata = self.metadata.get_many([row_id for hits in results for _, row_id in hits])
+        return [
+            [(score, row_id, metadata[row_id]) for score, row_id in hits if row_id in metadata]
+            for hits in results
+        ]
+    
+    def get_metadata(self, row_id: int) -> Optional[Dict]:
+        """Return the metadata stored for a row id."""
+        return self.metadata.get_many([row_id]).get(row_id)
+
+
+def open_segment_store(directory: Path, dimension: int, faiss, **options) -> FaissSegmentStore:
+    """
+    Open the segment store of a directory, reusing the instance already open there.
+    
+    Two instances on one directory would both write ``seg_*`` files and
+    delete each other's uncommitted files as orphans. An instance stays
+    open while anything references it, including its own background
+    compaction, so a store reopened while an earlier owner's compaction is
+    still running gets that same instance back.
+    
+    Args:
+        directory: Segment directory
+        dimension: Vector dimension
+        faiss: The faiss module
+        **options: Other ``FaissSegmentStore`` arguments (ignored when reusing)
+    
+    Returns:
+        The open FaissSegmentStore
+    """
+    key = str(Path(directory).resolve())
+    with _opening_lock:
+        lock = _opening.setdefault(key, threading.Lock())
+    # Per directory, so a slow load does not hold up other tenants
+    with lock:
+        store = _open_stores.get(key)
+        if store is None:
+            store = FaissSegmentStore(directory, dimension, faiss, **options)
+            _open_stores[key] = store
+        return store
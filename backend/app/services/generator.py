@@ -1,6 +1,182 @@
 """Response generator service using LLM."""
-from typing import List, Dict
-from app.utils.config import USE_OPENAI, USE_GEMINI, OPENAI_API_KEY, GEMINI_API_KEY, LLM_MODEL, GEMINI_MODEL
+import asyncio
+import inspect
+import threading
+import time
+from typing import AsyncIterator, List, Dict, Optional
+from app.utils.config import (
+    USE_OPENAI, USE_GEMINI, OPENAI_API_KEY, GEMINI_API_KEY, LLM_MODEL, GEMINI_MODEL,
+    GEMINI_FALLBACK_MODELS, GEMINI_PROBE_COOLDOWN
+)
+from app.services.llm_clients import get_provider_clients
+from app.utils.context_builder import build_context
+from app.utils.metrics import timed
+
+NO_CONTEXT_ANSWER = "I don't have any relevant information to answer your question. Please upload a PDF document first."
+NO_DOCUMENTS_ANSWER = "No documents have been uploaded yet. Please upload a PDF document first."
+NO_RESULTS_ANSWER = "I couldn't find relevant information to answer your question. Please try rephrasing your question or upload more documents."
+
+
+def format_sources(relevant_docs: List[Dict]) -> List[Dict]:
+    """Source excerpts returned with an answer (text shortened to 200 characters)."""
+    return [
+        {
+            "text": doc['text'][:200] + "..." if len(doc['text']) > 200 else doc['text'],
+            "score": doc['score'],
+            "metadata": doc.get('metadata', {})
+        }
+        for doc in relevant_docs
+    ]
+
+
+class GeminiModelResolver:
+    """
+    Resolves the Gemini model once and caches the model object.
+    
+    Candidates (the configured model, then ``GEMINI_FALLBACK_MODELS``) are
+    probed in order with a metadata lookup rather than a generation call;
+    the first that supports ``generateContent`` is cached for all requests.
+    If every candidate fails, the circuit opens: requests fail fast without
+    any remote call until ``cooldown`` seconds have passed, and the next
+    request after that probes again. A cached model that stops existing
+    (HTTP 404) is evicted, so the following request re-resolves.
+    """
+    
+    def __init__(self, genai, model_names: List[str], cooldown: float = None):
+        self.genai = genai
+        self.model_names = list(dict.fromkeys(model_names))
+        self.cooldown = cooldown if cooldown is not None else GEMINI_PROBE_COOLDOWN
+        self._lock = threading.Lock()
+        self._model = None
+        self._open_until = 0.0
+        self.active_model = None
+        self.resolved_at = None
+        self.last_error = None
+        self.resolutions = 0
+        self.fallbacks = 0
+        self.evictions = 0
+        self.circuit_opens = 0
+        self.rejected = 0
+        self.probe_failures: Dict[str, int] = {}
+    
+    def get(self):
+        """
+        Return the cached ``GenerativeModel``, probing candidates if there is none.
+        
+        Raises:
+            RuntimeError: If no candidate works, or the circuit is still open
+        """
+        model = self._model
+        if model is not None:
+            return model
+        
+        with self._lock:
+            if self._model is not None:
+                return self._model
+            remaining = self._open_until - time.monotonic()
+            if remaining > 0:
+                self.rejected += 1
+                raise RuntimeError(
+                    f"No working Gemini model (retrying in {remaining:.0f}s). Last error: {self.last_error}"
+                )
+            return self._probe()
+    
+    async def aget(self):
+        """Async ``get``; probing (blocking SDK calls) runs in a worker thread."""
+        model = self._model
+        if model is not None:
+            return model
+        return await asyncio.to_thread(self.get)
+    
+    def resolve_in_background(self):
+        """Start resolving now so the first request doesn't pay for probing."""
+        def resolve():
+            try:
+                self.get()
+            except RuntimeError:
+                pass  # Recorded in last_error; requests retry after the cooldown
+        threading.Thread(target=resolve, name="gemini-model-resolver", daemon=True).start()
+    
+    def evict_if_missing(self, model, error: Exception):
+        """Drop ``model`` from the cache if ``error`` says it no longer exists."""
+        if getattr(error, "code", None) != 404 and type(error).__name__ != "NotFound":
+            return
+        with self._lock:
+            if self._model is model:
+                self.last_error = f"{self.active_model}: {error}"
+                self._model = None
+                self.active_model = None
+                self.evictions += 1
+    
+    def _probe(self):
+        for position, name in enumerate(self.model_names):
+            try:
+                info = self.genai.get_model(name if "/" in name else f"models/{name}")
+                methods = getattr(info, "supported_generation_methods", None)
+                if methods is not None and "generateContent" not in methods:
+                    raise ValueError("model does not support generateContent")
+            except Exception as e:
+                self.probe_failures[name] = self.probe_failures.get(name, 0) + 1
+                self.last_error = f"{name}: {e}"
+                continue
+            
+            self._model = self.genai.GenerativeModel(name)
+            self._open_until = 0.0
+            self.active_model = name
+            self.resolved_at = time.time()
+            self.resolutions += 1
+            if position > 0:
+                self.fallbacks += 1
+            return self._model
+        
+        self._open_until = time.monotonic() + self.cooldown
+        self.circuit_opens += 1
+        raise RuntimeError(
+            f"Could not find a working Gemini model. Check your API key and available models. "
+            f"Last error: {self.last_error}"
+        )
+    
+    def stats(self) -> dict:
+        """Active model, circuit state and fallback counters."""
+        remaining = max(self._open_until - time.monotonic(), 0.0)
+        return {
+            "active_model": self.active_model,
+            "candidates": self.model_names,
+            "resolved_at": self.resolved_at,
+            "resolutions": self.resolutions,
+            "fallbacks": self.fallbacks,
+            "evictions": self.evictions,
+            "probe_failures": dict(self.probe_failures),
+            "circuit_open": remaining > 0,
+            "circuit_opens": self.circuit_opens,
+            "retry_in_seconds": round(remaining, 1),
+            "rejected_requests": self.rejected,
+            "last_error": self.last_error
+        }
+
+
+def _gemini_chunk_text(chunk) -> str:
+    """Text of a streamed Gemini chunk; empty for chunks without parts (safety-blocked or finish-only)."""
+    try:
+        parts = chunk.parts
+    except (ValueError, AttributeError, IndexError):
+        # ``parts`` (like ``text``) raises unless there is exactly one candidate
+        return ""
+    return "".join(getattr(part, "text", "") or "" for part in parts)
+
+
+async def _close_gemini_stream(response, chunks):
+    """Stop a Gemini stream early so the provider stops generating."""
+    # The SDK has no close(): cancel the call it wraps (gRPC), then close our iterator
+    call = getattr(response, "_iterator", None)
+    cancel = getattr(call, "cancel", None)
+    if callable(cancel):
+        cancelled = cancel()
+        if inspect.isawaitable(cancelled):
+            await cancelled
+    aclose = getattr(chunks, "aclose", None)
+    if aclose is not None:
+        await aclose()
 
 
 class ResponseGenerator:
@@ -16,91 +192,79 @@ class ResponseGenerator:
                 genai.configure(api_key=GEMINI_API_KEY)
                 self.genai = genai
                 self.model = GEMINI_MODEL
+                self.gemini_models = GeminiModelResolver(genai, [GEMINI_MODEL, *GEMINI_FALLBACK_MODELS])
             except ImportError:
                 raise RuntimeError(
                     "Google Generative AI library not installed. "
                     "Install it with: pip install google-generativeai"
                 )
         elif self.use_openai:
-            from openai import OpenAI
-            self.client = OpenAI(api_key=OPENAI_API_KEY)
+            # Shared pooled clients are fetched per call: they are recreated after being closed
             self.model = LLM_MODEL
         else:
             # Fallback to local model
-            self.client = None
             self.genai = None
             self.model = None
     
-    def generate_response(self, query: str, context_docs: List[Dict]) -> str:
+    def warm_up(self):
+        """Resolve the Gemini model in the background (called at startup)."""
+        if self.use_gemini:
+            self.gemini_models.resolve_in_background()
+    
+    def model_stats(self) -> dict:
+        """
+        Report the provider and model in use.
+        
+        Returns:
+            Dict with provider, configured/active model and, for Gemini,
+            circuit breaker state and fallback counters
+        """
+        if self.use_gemini:
+            return {"provider": "gemini", "configured_model": self.model, **self.gemini_models.stats()}
+        if self.use_openai:
+            return {"provider": "openai", "configured_model": self.model, "active_model": self.model}
+        return {"provider": "template", "configured_model": None, "active_model": None}
+    
+    @timed("generate")
+    def generate_response(self, query: str, context_docs: List[Dict], context: Optional[str] = None) -> str:
         """
         Generate a response based on query and retrieved context.
         
         Args:
             query: User's question
             context_docs: Retrieved relevant documents
-            
+            context: Prompt context from ``build_context``; built from
+                ``context_docs`` when omitted
+        
         Returns:
             Generated response
         """
         if not context_docs:
-            return "I don't have any relevant information to answer your question. Please upload a PDF document first."
+            return NO_CONTEXT_ANSWER
         
-        # Prepare context
-        context = "\n\n".join([
-            f"Document {i+1}:\n{doc['text']}"
-            for i, doc in enumerate(context_docs)
-        ])
+        if context is None:
+            context, _ = build_context(context_docs)
         
         if self.use_gemini:
             # Use Gemini API
             try:
-                prompt = f"""You are a helpful assistant that answers questions based on the provided context from uploaded documents.
-If the answer cannot be found in the context, say so. Be concise and accurate.
-
-Context from documents:
-{context}
-
-Question: {query}
-
-Please provide a clear and accurate answer based on the context above:"""
-                
-                # Try different model name formats
-                model = None
-                model_names_to_try = [
-                    self.model,  # Try the configured model first
-                    "models/gemini-pro",  # Try with models/ prefix
-                    "gemini-pro",  # Try without prefix
-                    "models/gemini-1.5-flash",  # Try newer model with prefix
-                    "gemini-1.5-flash",  # Try newer model without prefix
-                ]
-                
-                for model_name in model_names_to_try:
-                    try:
-                        model = self.genai.GenerativeModel(model_name)
-                        response = model.generate_content(prompt)
-                        return response.text.strip()  # Success - return response
-                    except:
-                        continue
-                
-                # If all models failed
-                raise Exception("Could not find a working Gemini model. Check your API key and available models.")
+                prompt = self._gemini_prompt(query, context)
+                model = self.gemini_models.get()
+                try:
+                    response = model.generate_content(prompt)
+                except Exception as e:
+                    self.gemini_models.evict_if_missing(model, e)
+                    raise
+                return response.text.strip()
             except Exception as e:
                 return f"Error generating response with Gemini: {str(e)}"
         
         elif self.use_openai:
             # Use OpenAI API
-            system_prompt = """You are a helpful assistant that answers questions based on the provided context from uploaded documents. 
-            If the answer cannot be found in the context, say so. Be concise and accurate."""
-            
-            messages = [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Context:\n{context}\n\nQuestion: {query}\n\nAnswer:"}
-            ]
-            
             try:
-                response = self.client.chat.completions.create(
+                response = get_provider_clients().openai().chat.completions.create(
                     model=self.model,
-                    messages=messages,
+                    messages=self._openai_messages(query, context),
                     temperature=0.7,
                     max_tokens=500
                 )
@@ -111,6 +275,161 @@ Please provide a clear and accurate answer based on the context above:"""
             # Fallback: Simple template-based response
             return self._generate_template_response(query, context)
     
+    @timed("generate")
+    async def agenerate_response(
+        self, query: str, context_docs: List[Dict], context: Optional[str] = None
+    ) -> str:
+        """
+        Async variant of ``generate_response`` for request handlers.
+        
+        Uses the shared async provider clients, bounded by the per-provider
+        concurrency limit and request timeout, so the event loop stays free
+        while the LLM is generating.
+        
+        Args:
+            query: User's question
+            context_docs: Retrieved relevant documents
+            context: Prompt context from ``build_context``; built from
+                ``context_docs`` when omitted
+        
+        Returns:
+            Generated response
+        """
+        if not context_docs:
+            return NO_CONTEXT_ANSWER
+        
+        if context is None:
+            context, _ = build_context(context_docs)
+        clients = get_provider_clients()
+        
+        if self.use_gemini:
+            try:
+                prompt = self._gemini_prompt(query, context)
+                model = await self.gemini_models.aget()
+                async with clients.limit("gemini"):
+                    try:
+                        response = await asyncio.wait_for(
+                            model.generate_content_async(prompt), timeout=clients.timeout
+                        )
+                    except Exception as e:
+                        self.gemini_models.evict_if_missing(model, e)
+                        raise
+                return response.text.strip()
+            except asyncio.TimeoutError:
+                return f"Error generating response with Gemini: no response within {clients.timeout:.0f}s"
+            except Exception as e:
+                return f"Error generating response with Gemini: {str(e)}"
+        
+        elif self.use_openai:
+            try:
+                async with clients.limit("openai"):
+                    response = await clients.async_openai().chat.completions.create(
+                        model=self.model,
+                        messages=self._openai_messages(query, context),
+                        temperature=0.7,
+                        max_tokens=500
+                    )
+                return response.choices[0].message.content.strip()
+            except Exception as e:
+                return f"Error generating response: {str(e)}"
+        else:
+            return self._generate_template_response(query, context)
+    
+    async def stream_response(
+        self, query: str, context_docs: List[Dict], context: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        Generate a response incrementally, yielding text as the LLM produces it.
+        
+        Closing the generator (``aclose``) closes the upstream stream, so the
+        provider stops generating when the client goes away.
+        
+        Args:
+            query: User's question
+            context_docs: Retrieved relevant documents
+            context: Prompt context from ``build_context``; built from
+                ``context_docs`` when omitted
+        
+        Yields:
+            Pieces of the answer text
+        
+        Raises:
+            RuntimeError: If no Gemini model is available
+        """
+        if not context_docs:
+            yield NO_CONTEXT_ANSWER
+            return
+        
+        if context is None:
+            context, _ = build_context(context_docs)
+        clients = get_provider_clients()
+        
+        if self.use_gemini:
+            async with clients.limit("gemini"):
+                async for piece in self._stream_gemini(self._gemini_prompt(query, context), clients.timeout):
+                    yield piece
+        elif self.use_openai:
+            async with clients.limit("openai"):
+                stream = await clients.async_openai().chat.completions.create(
+                    model=self.model,
+                    messages=self._openai_messages(query, context),
+                    temperature=0.7,
+                    max_tokens=500,
+                    stream=True
+                )
+                try:
+                    async for chunk in stream:
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            yield chunk.choices[0].delta.content
+                finally:
+                    # Drops the HTTP connection so the provider stops generating
+                    await stream.close()
+        else:
+            yield self._generate_template_response(query, context)
+    
+    async def _stream_gemini(self, prompt: str, timeout: float) -> AsyncIterator[str]:
+        model = await self.gemini_models.aget()
+        try:
+            response = await asyncio.wait_for(
+                model.generate_content_async(prompt, stream=True), timeout=timeout
+            )
+        except Exception as e:
+            self.gemini_models.evict_if_missing(model, e)
+            raise
+        chunks = response.__aiter__()
+        try:
+            while True:
+                # The timeout applies per chunk, so a stalled stream fails too
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), timeout=timeout)
+                except StopAsyncIteration:
+                    return
+                text = _gemini_chunk_text(chunk)
+                if text:
+                    yield text
+        finally:
+            await _close_gemini_stream(response, chunks)
+    
+    def _gemini_prompt(self, query: str, context: str) -> str:
+        return f"""You are a helpful assistant that answers questions based on the provided context from uploaded documents.
+If the answer cannot be found in the context, say so. Be concise and accurate.
+
+Context from documents:
+{context}
+
+Question: {query}
+
+Please provide a clear and accurate answer based on the context above:"""
+    
+    def _openai_messages(self, query: str, context: str) -> List[Dict]:
+        system_prompt = """You are a helpful assistant that answers questions based on the provided context from uploaded documents. 
+            If the answer cannot be found in the context, say so. Be concise and accurate."""
+        
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": f"Context:\n{context}\n\nQuestion: {query}\n\nAnswer:"}
+        ]
+    
     def _generate_template_response(self, query: str, context: str) -> str:
         """Generate a simple template-based response when LLM is not available."""
         return f"""Based on the documents provided:
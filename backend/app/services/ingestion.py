@@ -0,0 +1,371 @@
+"""Ingestion service that runs the upload pipeline off the event loop."""
+import os
+import threading
+import time
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from app.utils.config import INGEST_MAX_WORKERS, INGEST_MAX_PENDING, INGEST_INDEX_BATCH_SIZE, CHUNK_TOKENS, RAW_DATA_DIR
+from app.utils.pdf_loader import iter_pages, pdf_page_count
+from app.utils.chunker import iter_chunks
+from app.services.document_registry import chunk_hash, file_hash
+from app.services.jobs import JobStore, get_job_store
+from app.services.search_filter import parse_tags
+from app.services.tenancy import DEFAULT_TENANT_ID, tenant_directory, validate_tenant
+from app.utils.metrics import span, CHUNKS_INGESTED, DOCUMENTS_INGESTED
+
+
+class IngestionQueueFull(Exception):
+    """Raised when the ingestion queue cannot accept more work."""
+
+
+class IngestionError(Exception):
+    """Raised when a document cannot be ingested (bad input, no text, ...)."""
+
+
+class IngestionPool:
+    """
+    Bounded pool of worker threads that drain the persistent job queue.
+    
+    At most ``max_workers`` ingestions run at the same time, which keeps
+    CPU-heavy embedding from starving chat requests. At most ``max_pending``
+    jobs may wait in the queue; beyond that uploads are rejected so callers
+    can apply backpressure.
+    """
+    
+    def __init__(self, job_store: JobStore = None, max_workers: int = None, max_pending: int = None):
+        self.job_store = job_store or get_job_store()
+        self.max_workers = max_workers or INGEST_MAX_WORKERS
+        self.max_pending = max_pending or INGEST_MAX_PENDING
+        self._wakeup = threading.Condition()
+        self._stopping = False
+        self._threads = []
+    
+    def start(self):
+        """Requeue interrupted jobs and start the worker threads."""
+        if self._threads:
+            return
+        self._stopping = False
+        self.job_store.requeue_running()
+        for i in range(self.max_workers):
+            thread = threading.Thread(target=self._worker, name=f"ingest-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+    
+    def submit(
+        self, filename: str, file_path: Path, tags: Optional[List[str]] = None, tenant: str = DEFAULT_TENANT_ID
+    ) -> str:
+        """
+        Enqueue a saved PDF for ingestion and return the job id.
+        
+        Args:
+            filename: Original filename
+            file_path: Path of the saved PDF
+            tags: Optional tags stored on every chunk of the document
+            tenant: Tenant whose index the document goes into
+        
+        Raises:
+            IngestionQueueFull: If ``max_pending`` jobs are already waiting
+        """
+        if self.job_store.count_queued() >= self.max_pending:
+            raise IngestionQueueFull(
+                f"Ingestion queue is full ({self.max_pending} pending). Try again later."
+            )
+        job_id = self.job_store.create(filename, file_path, ",".join(parse_tags(tags)) or None, tenant)
+        with self._wakeup:
+            self._wakeup.notify()
+        return job_id
+    
+    def shutdown(self, wait: bool = True):
+        """Stop the workers; running jobs finish, queued jobs stay persisted."""
+        with self._wakeup:
+            self._stopping = True
+            self._wakeup.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+        self._threads = []
+    
+    def _worker(self):
+        while True:
+            with self._wakeup:
+                if self._stopping:
+                    return
+            job = self.job_store.claim_next()
+            if job is None:
+                with self._wakeup:
+                    if not self._stopping:
+                        # Timeout so jobs queued by another process are picked up too
+                        self._wakeup.wait(timeout=1.0)
+                continue
+            self._run_job(job)
+    
+    def _run_job(self, job: Dict):
+        job_id = job["id"]
+        
+        def progress(stage: str, done: int = 0, total: int = 0):
+            self.job_store.update_progress(job_id, stage, done, total)
+        
+        file_path = Path(job["file_path"])
+        tenant = job.get("tenant") or DEFAULT_TENANT_ID
+        try:
+            result = ingest_pdf(
+                file_path, job["filename"], progress=progress,
+                tags=parse_tags(job.get("tags")), uploaded_at=job["created_at"],
+                tenant=tenant, keep_file=True
+            )
+            self.job_store.complete(job_id, result["chunks_count"])
+            DOCUMENTS_INGESTED.inc(status="skipped" if result["skipped"] else "completed")
+            CHUNKS_INGESTED.inc(result["chunks_embedded"])
+        except Exception as e:
+            self.job_store.fail(job_id, str(e))
+            DOCUMENTS_INGESTED.inc(status="failed")
+        finally:
+            # An indexed upload has been moved to its filename; skipped or failed ones go
+            if file_path.parent == incoming_dir(tenant):
+                file_path.unlink(missing_ok=True)
+
+
+# One ingestion per filename (of a tenant) at a time: versions of a file are diffed against each other
+_filename_locks: Dict[Tuple[str, str], threading.Lock] = {}
+_filename_locks_guard = threading.Lock()
+
+def _filename_lock(tenant: str, filename: str) -> threading.Lock:
+    with _filename_locks_guard:
+        return _filename_locks.setdefault((tenant, filename), threading.Lock())
+
+
+# One ingestion per content hash (of a tenant) at a time: the same file under two names is indexed once
+_content_locks: Dict[Tuple[str, str], threading.Lock] = {}
+
+def _content_lock(tenant: str, digest: str) -> threading.Lock:
+    with _filename_locks_guard:
+        return _content_locks.setdefault((tenant, digest), threading.Lock())
+
+
+def raw_data_dir(tenant: str = DEFAULT_TENANT_ID) -> Path:
+    """Directory of a tenant's uploaded PDFs (created if missing)."""
+    directory = tenant_directory(RAW_DATA_DIR, tenant)
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory
+
+
+def incoming_dir(tenant: str = DEFAULT_TENANT_ID) -> Path:
+    """
+    Directory where uploads wait for their ingestion job (created if missing).
+    
+    Each upload is saved here under a unique name, so a queued job never
+    reads a file that a later upload of the same filename replaced.
+    """
+    directory = raw_data_dir(tenant) / "incoming"
+    directory.mkdir(exist_ok=True)
+    return directory
+
+
+def ingest_pdf(
+    file_path: Path,
+    filename: str,
+    progress: Optional[Callable] = None,
+    tags: Optional[List[str]] = None,
+    uploaded_at: Optional[float] = None,
+    tenant: str = DEFAULT_TENANT_ID,
+    keep_file: bool = False
+) -> Dict:
+    """
+    Run the full ingestion pipeline for one saved PDF (blocking).
+    
+    Uploads are keyed by content hash: a file whose exact content is
+    already indexed (under any filename) is skipped without being read.
+    Ingestions of the same filename or the same content run one at a time,
+    so concurrent uploads of one file are indexed once.
+    A new version of an indexed filename is diffed chunk by chunk: chunks
+    whose text is unchanged keep their vectors and only get their
+    metadata (position, pages) updated, new chunks are embedded, and
+    chunks that no longer occur are deleted once the new version is
+    fully indexed.
+    
+    The stages are streamed: pages are extracted one by one, chunked as
+    they arrive, and every ``INGEST_INDEX_BATCH_SIZE`` chunks are embedded
+    and indexed before more pages are read. Peak memory is about one batch
+    plus a page, however large the PDF. Progress counts are pages read
+    out of the page count, except in the "chunk" stage, which reports the
+    chunks produced so far (total 0: it is not known until the last page).
+    
+    Chunks are measured with the embedding model's tokenizer and kept
+    within its input limit, so no chunk text is truncated when embedded.
+    Every chunk of the new version, kept ones included, records the upload
+    time and tags so searches can filter on them.
+    
+    If a batch or the registration of the new version fails, the chunks
+    added so far are deleted again, kept chunks get their old metadata
+    back, and the previous version of the file stays indexed as it was.
+    
+    Args:
+        file_path: Path of the PDF on disk
+        filename: Original filename
+        progress: Optional callback ``progress(stage, done, total)``
+        tags: Optional document tags
+        uploaded_at: Upload time as Unix time (default: now)
+        tenant: Tenant whose index the document goes into
+        keep_file: Move ``file_path`` to ``filename`` in the tenant's raw
+            directory once the new version is registered (uploads)
+    
+    Returns:
+        Dict with filename, chunks_count, chunks_embedded (new chunks) and
+        skipped (True if the content was already indexed; filename is then
+        the indexed document's)
+    """
+    from app.services.vectorstore import get_vector_store
+    
+    progress = progress or (lambda stage, done=0, total=0: None)
+    file_path = Path(file_path)
+    tags = ",".join(parse_tags(tags))
+    uploaded_at = uploaded_at if uploaded_at is not None else time.time()
+    tenant = validate_tenant(tenant)
+    vector_store = get_vector_store(tenant)
+    documents = vector_store.documents
+    
+    content_digest = file_hash(file_path)
+    with _filename_lock(tenant, filename), _content_lock(tenant, content_digest):
+        existing = documents.find_by_hash(content_digest)
+        if existing is not None:
+            return {
+                "filename": existing["filename"], "chunks_count": existing["chunks_count"],
+                "chunks_embedded": 0, "skipped": True
+            }
+        
+        progress("extract")
+        page_count = pdf_page_count(file_path)
+        pages_read = 0
+        
+        def pages() -> Iterator:
+            nonlocal pages_read
+            extracted = iter_pages(file_path)
+            while True:
+                with span("ingest_extract"):
+                    page = next(extracted, None)
+                if page is None:
+                    return
+                pages_read = page[0]
+                progress("extract", pages_read, page_count)
+                yield page
+        
+        def batch_progress(stage: str, done: int = 0, total: int = 0):
+            progress(stage, pages_read, page_count)
+        
+        embedding_service = vector_store.embedding_service
+        # Chunks longer than the model's input would be silently truncated when embedded
+        chunks = iter_chunks(
+            pages(),
+            chunk_tokens=min(CHUNK_TOKENS, embedding_service.max_input_tokens),
+            count_tokens=embedding_service.count_tokens
+        )
+        previous = documents.chunk_ids_by_hash(filename)  # Chunks of the indexed version
+        registered = []  # (chunk id, chunk hash) of the new version
+        kept_ids, kept_metadatas = [], []
+        added_ids = []
+        restore = None  # Old metadata of the kept chunks, once it has been replaced
+        try:
+            while True:
+                batch = list(islice(chunks, INGEST_INDEX_BATCH_SIZE))
+                if not batch:
+                    break
+                new_texts, new_metadatas, new_hashes = [], [], []
+                for chunk in batch:
+                    metadata = {
+                        "filename": filename, "chunk_index": len(registered) + len(new_texts),
+                        "page": chunk["page"], "page_end": chunk["page_end"],
+                        "char_start": chunk["char_start"], "char_end": chunk["char_end"],
+                        "uploaded_at": uploaded_at
+                    }
+                    if tags:
+                        metadata["tags"] = tags
+                    digest = chunk_hash(chunk["text"])
+                    if previous.get(digest):
+                        chunk_id = previous[digest].pop()
+                        kept_ids.append(chunk_id)
+                        kept_metadatas.append(metadata)
+                        registered.append((chunk_id, digest))
+                    else:
+                        new_texts.append(chunk["text"])
+                        new_metadatas.append(metadata)
+                        new_hashes.append(digest)
+                progress("chunk", len(registered) + len(new_texts), 0)
+                if new_texts:
+                    ids = vector_store.add_documents(new_texts, new_metadatas, progress=batch_progress)
+                    added_ids.extend(ids)
+                    registered.extend(zip(ids, new_hashes))
+            
+            if not registered:
+                raise IngestionError("Could not extract text from PDF")
+            
+            # Swap versions: unchanged chunks move to their new positions, then the registry
+            # switches to the new version (the commit point)
+            old_chunks = vector_store.get_chunks(kept_ids)
+            restore = ([chunk_id for chunk_id in kept_ids if chunk_id in old_chunks],
+                       [old_chunks[chunk_id]["metadata"] for chunk_id in kept_ids if chunk_id in old_chunks])
+            vector_store.update_metadata(kept_ids, kept_metadatas)
+            documents.register(filename, content_digest, registered)
+        except BaseException:
+            if restore is not None:
+                vector_store.update_metadata(*restore)
+            vector_store.delete(added_ids)
+            raise
+        
+        # The rest of the old version goes once the new one is registered
+        vector_store.delete([chunk_id for ids in previous.values() for chunk_id in ids])
+        if keep_file:
+            target = raw_data_dir(tenant) / filename
+            if file_path.resolve() != target.resolve():
+                os.replace(file_path, target)
+    
+    return {
+        "filename": filename, "chunks_count": len(registered),
+        "chunks_embedded": len(added_ids), "skipped": False
+    }
+
+
+def delete_document(document_id: str, tenant: str = DEFAULT_TENANT_ID) -> Optional[Dict]:
+    """
+    Remove a document: its chunks from every index, its registry entry and its saved PDF.
+    
+    Nothing is re-embedded. With FAISS the chunks' vectors are tombstoned
+    and reclaimed by a later compaction.
+    
+    Args:
+        document_id: Registry id of the document
+        tenant: Tenant owning the document
+    
+    Returns:
+        The removed document record, or None if the id is unknown
+    """
+    from app.services.vectorstore import get_vector_store
+    
+    tenant = validate_tenant(tenant)
+    vector_store = get_vector_store(tenant)
+    documents = vector_store.documents
+    document = documents.get_by_id(document_id)
+    if document is None:
+        return None
+    
+    filename = document["filename"]
+    with _filename_lock(tenant, filename):
+        # Re-read under the lock: an ingestion may have replaced the version meanwhile
+        document = documents.get_by_id(document_id)
+        if document is None:
+            return None
+        vector_store.delete(documents.chunk_ids(filename))
+        documents.remove(filename)
+        (raw_data_dir(tenant) / filename).unlink(missing_ok=True)
+    return document
+
+
+# Global instance
+_ingestion_pool = None
+
+def get_ingestion_pool() -> IngestionPool:
+    """Get or create the global ingestion pool instance."""
+    global _ingestion_pool
+    if _ingestion_pool is None:
+        _ingestion_pool = IngestionPool()
+    return _ingestion_pool
@@ -0,0 +1,148 @@
+"""Persistent ingestion job store backed by SQLite."""
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Optional
+from app.utils.config import JOBS_DB_PATH
+
+# Job lifecycle
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
+
+# Pipeline stages reported while a job is running
+STAGES = ("queued", "extract", "chunk", "embed", "index", "done")
+
+
+class JobStore:
+    """SQLite-backed queue of ingestion jobs that survives restarts."""
+    
+    def __init__(self, db_path: Path = None):
+        self.db_path = Path(db_path or JOBS_DB_PATH)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    filename TEXT NOT NULL,
+                    file_path TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    stage TEXT NOT NULL,
+                    progress_done INTEGER NOT NULL DEFAULT 0,
+                    progress_total INTEGER NOT NULL DEFAULT 0,
+                    chunks_count INTEGER,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )"""
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)"
+            )
+            # Added after the first release
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            if "tags" not in columns:
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN tags TEXT")
+            if "tenant" not in columns:
+                # NULL for jobs created before tenants existed (the default tenant)
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN tenant TEXT")
+    
+    def create(self, filename: str, file_path: Path, tags: Optional[str] = None, tenant: Optional[str] = None) -> str:
+        """Enqueue a new job (``tags``: comma-separated document tags) for ``tenant`` and return its id."""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, filename, file_path, status, stage, tags, tenant, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, filename, str(file_path), STATUS_QUEUED, "queued", tags, tenant, now, now)
+            )
+        return job_id
+    
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Return a job as a dict, or None if it does not exist."""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+    
+    def count_queued(self) -> int:
+        """Number of jobs waiting for a worker."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = ?", (STATUS_QUEUED,)
+            ).fetchone()
+        return row[0]
+    
+    def claim_next(self) -> Optional[Dict]:
+        """Atomically move the oldest queued job to running and return it."""
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1",
+                (STATUS_QUEUED,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ?",
+                (STATUS_RUNNING, time.time(), row["id"])
+            )
+        job = dict(row)
+        job["status"] = STATUS_RUNNING
+        return job
+    
+    def update_progress(self, job_id: str, stage: str, done: int = 0, total: int = 0):
+        """Record the current stage and its progress counts."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET stage = ?, progress_done = ?, progress_total = ?, updated_at = ? "
+                "WHERE id = ?",
+                (stage, done, total, time.time(), job_id)
+            )
+    
+    def complete(self, job_id: str, chunks_count: int):
+        """Mark a job as successfully finished."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, stage = 'done', chunks_count = ?, updated_at = ? "
+                "WHERE id = ?",
+                (STATUS_COMPLETED, chunks_count, time.time(), job_id)
+            )
+    
+    def fail(self, job_id: str, error: str):
+        """Mark a job as failed with an error message."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                (STATUS_FAILED, error, time.time(), job_id)
+            )
+    
+    def requeue_running(self) -> int:
+        """Put jobs interrupted by a restart back in the queue."""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, stage = 'queued', progress_done = 0, "
+                "progress_total = 0, updated_at = ? WHERE status = ?",
+                (STATUS_QUEUED, time.time(), STATUS_RUNNING)
+            )
+        return cursor.rowcount
+
+
+# Global instance
+_job_store = None
+_job_store_lock = threading.Lock()
+
+def get_job_store() -> JobStore:
+    """Get or create the global job store instance."""
+    global _job_store
+    if _job_store is None:
+        with _job_store_lock:
+            if _job_store is None:
+                _job_store = JobStore()
+    return _job_store
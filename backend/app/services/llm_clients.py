@@ -0,0 +1,115 @@
+"""Shared, pooled provider clients with per-provider concurrency limits."""
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+from typing import Dict
+from app.utils.config import (
+    OPENAI_API_KEY, OPENAI_BASE_URL, LLM_TIMEOUT_SECONDS, LLM_MAX_CONCURRENCY,
+    HTTP_MAX_CONNECTIONS, HTTP_MAX_KEEPALIVE, HTTP_KEEPALIVE_EXPIRY
+)
+
+
+class ProviderClients:
+    """
+    One long-lived client per provider, shared by embeddings and generation.
+    
+    OpenAI clients (sync and async) sit on pooled ``httpx`` clients with
+    keep-alive, so requests reuse TLS connections instead of opening a new
+    one per call. Async calls take a per-provider semaphore, which caps how
+    many requests a single worker sends to a provider at once; callers
+    beyond the limit wait instead of piling onto the provider's rate limit.
+    """
+    
+    def __init__(
+        self,
+        max_concurrency: int = None,
+        timeout: float = None,
+        max_connections: int = None,
+        max_keepalive: int = None
+    ):
+        self.max_concurrency = max_concurrency or LLM_MAX_CONCURRENCY
+        self.timeout = timeout or LLM_TIMEOUT_SECONDS
+        self.max_connections = max_connections or HTTP_MAX_CONNECTIONS
+        self.max_keepalive = max_keepalive or HTTP_MAX_KEEPALIVE
+        self._lock = threading.Lock()
+        self._openai = None
+        self._async_openai = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+    
+    def _limits(self):
+        import httpx
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+        )
+    
+    def openai(self):
+        """Shared synchronous OpenAI client (used from worker threads)."""
+        if self._openai is None:
+            with self._lock:
+                if self._openai is None:
+                    import httpx
+                    from openai import OpenAI
+                    self._openai = OpenAI(
+                        api_key=OPENAI_API_KEY,
+                        base_url=OPENAI_BASE_URL or None,
+                        timeout=self.timeout,
+                        http_client=httpx.Client(limits=self._limits(), timeout=self.timeout)
+                    )
+        return self._openai
+    
+    def async_openai(self):
+        """Shared asyncio OpenAI client (used from route handlers)."""
+        if self._async_openai is None:
+            with self._lock:
+                if self._async_openai is None:
+                    import httpx
+                    from openai import AsyncOpenAI
+                    self._async_openai = AsyncOpenAI(
+                        api_key=OPENAI_API_KEY,
+                        base_url=OPENAI_BASE_URL or None,
+                        timeout=self.timeout,
+                        http_client=httpx.AsyncClient(limits=self._limits(), timeout=self.timeout)
+                    )
+        return self._async_openai
+    
+    @asynccontextmanager
+    async def limit(self, provider: str):
+        """Hold one of ``max_concurrency`` request slots for ``provider``."""
+        semaphore = self._semaphores.get(provider)
+        if semaphore is None:
+            semaphore = self._semaphores.setdefault(provider, asyncio.Semaphore(self.max_concurrency))
+        async with semaphore:
+            yield
+    
+    async def aclose(self, sync: bool = True):
+        """
+        Close pooled connections (application shutdown or end of an event loop).
+        
+        Args:
+            sync: Also close the synchronous client; pass False when only an
+                event loop ends, as worker threads may still be using it
+        """
+        # Semaphores and async connections belong to the loop that used them
+        self._semaphores.clear()
+        if self._async_openai is not None:
+            await self._async_openai.close()
+            self._async_openai = None
+        if sync and self._openai is not None:
+            self._openai.close()
+            self._openai = None
+
+
+# Global instance
+_provider_clients = None
+_provider_clients_lock = threading.Lock()
+
+def get_provider_clients() -> ProviderClients:
+    """Get or create the global provider clients instance."""
+    global _provider_clients
+    if _provider_clients is None:
+        with _provider_clients_lock:
+            if _provider_clients is None:
+                _provider_clients = ProviderClients()
+    return _provider_clients
@@ -0,0 +1,292 @@
+"""SQLite-backed chunk metadata store keyed by FAISS row id."""
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+from app.services.search_filter import SearchFilter, parse_tags
+
+# Metadata keys stored in their own columns; everything else goes to ``extra``
+_COLUMNS = ("id", "text", "filename", "chunk_index", "page", "page_end", "uploaded_at")
+
+# Filterable columns added after the first release, migrated from ``extra``
+_FILTER_COLUMNS = (("page", "INTEGER"), ("page_end", "INTEGER"), ("uploaded_at", "REAL"))
+
+# Stay under SQLite's bound-parameter limit
+_MAX_PARAMS = 500
+
+
+class ChunkMetadataStore:
+    """
+    Chunk metadata (including text) stored in SQLite, one row per FAISS id.
+    
+    Only the rows that are asked for are read, so memory does not grow with
+    the corpus and lookups are primary-key seeks. Filterable attributes
+    (filename, pages, upload time, tags) are indexed so ``matching`` can
+    resolve a ``SearchFilter`` without reading chunk text.
+    """
+    
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS chunks (
+                    row_id INTEGER PRIMARY KEY,
+                    chunk_id TEXT,
+                    filename TEXT,
+                    chunk_index INTEGER,
+                    text TEXT,
+                    extra TEXT
+                )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_filename ON chunks (filename)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_chunk_id ON chunks (chunk_id)")
+            # Row ids of deleted chunks whose vectors are still in a segment
+            self._conn.execute("CREATE TABLE IF NOT EXISTS tombstones (row_id INTEGER PRIMARY KEY)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS chunk_tags ("
+                "tag TEXT NOT NULL, row_id INTEGER NOT NULL, PRIMARY KEY (tag, row_id)) WITHOUT ROWID"
+            )
+            self._migrate_filter_columns()
+            # Cover filter queries, which then never read the (wide) table rows
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_chunks_filter_filename "
+                "ON chunks (filename, uploaded_at, page, page_end, chunk_id)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_chunks_filter_uploaded "
+                "ON chunks (uploaded_at, page, page_end, chunk_id)"
+            )
+    
+    def _migrate_filter_columns(self):
+        """Add the filter columns to a store created without them, filled from ``extra``."""
+        existing = {row[1] for row in self._conn.execute("PRAGMA table_info(chunks)")}
+        for name, column_type in _FILTER_COLUMNS:
+            if name not in existing:
+                self._conn.execute(f"ALTER TABLE chunks ADD COLUMN {name} {column_type}")
+                self._conn.execute(
+                    f"UPDATE chunks SET {name} = json_extract(extra, '$.{name}') WHERE extra IS NOT NULL"
+                )
+        if "page" not in existing:
+            rows = self._conn.execute(
+                "SELECT row_id, json_extract(extra, '$.tags') FROM chunks WHERE json_extract(extra, '$.tags') IS NOT NULL"
+            ).fetchall()
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO chunk_tags (tag, row_id) VALUES (?, ?)",
+                [(tag, row_id) for row_id, tags in rows for tag in parse_tags(tags)]
+            )
+    
+    def add(self, row_ids: Iterable[int], metadatas: Iterable[Dict]):
+        """Insert metadata for new rows in a single transaction."""
+        rows, tags = [], []
+        for row_id, metadata in zip(row_ids, metadatas):
+            extra = {k: v for k, v in metadata.items() if k not in _COLUMNS}
+            rows.append((
+                int(row_id),
+                metadata.get("id"),
+                metadata.get("filename"),
+                metadata.get("chunk_index"),
+                metadata.get("text"),
+                json.dumps(extra) if extra else None,
+                metadata.get("page"),
+                metadata.get("page_end"),
+                metadata.get("uploaded_at")
+            ))
+            tags.extend((tag, int(row_id)) for tag in parse_tags(metadata.get("tags")))
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks "
+                "(row_id, chunk_id, filename, chunk_index, text, extra, page, page_end, uploaded_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.executemany("INSERT OR IGNORE INTO chunk_tags (tag, row_id) VALUES (?, ?)", tags)
+    
+    def update_by_chunk_ids(self, chunk_ids: List[str], metadatas: List[Dict]):
+        """Replace the metadata of existing chunks, keeping their text and row ids."""
+        rows = []
+        for chunk_id, metadata in zip(chunk_ids, metadatas):
+            extra = {k: v for k, v in metadata.items() if k not in _COLUMNS}
+            rows.append((
+                metadata.get("filename"),
+                metadata.get("chunk_index"),
+                json.dumps(extra) if extra else None,
+                metadata.get("page"),
+                metadata.get("page_end"),
+                metadata.get("uploaded_at"),
+                chunk_id
+            ))
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE chunks SET filename = ?, chunk_index = ?, extra = ?, page = ?, page_end = ?, "
+                "uploaded_at = ? WHERE chunk_id = ?",
+                rows
+            )
+            # Tags are replaced along with the rest of the metadata
+            for chunk_id, metadata in zip(chunk_ids, metadatas):
+                row = self._conn.execute("SELECT row_id FROM chunks WHERE chunk_id = ?", (chunk_id,)).fetchone()
+                if row is None:
+                    continue
+                self._conn.execute("DELETE FROM chunk_tags WHERE row_id = ?", (row[0],))
+                self._conn.executemany(
+                    "INSERT INTO chunk_tags (tag, row_id) VALUES (?, ?)",
+                    [(tag, row[0]) for tag in parse_tags(metadata.get("tags"))]
+                )
+    
+    def delete_chunk_ids(self, chunk_ids: List[str]) -> List[int]:
+        """
+        Drop chunks by uuid, leaving a tombstone for each row in the same transaction.
+        
+        Returns:
+            Row ids of the deleted chunks
+        """
+        deleted = []
+        with self._lock, self._conn:
+            for start in range(0, len(chunk_ids), _MAX_PARAMS):
+                part = list(chunk_ids[start:start + _MAX_PARAMS])
+                placeholders = ",".join("?" * len(part))
+                deleted.extend(row[0] for row in self._conn.execute(
+                    f"SELECT row_id FROM chunks WHERE chunk_id IN ({placeholders})", part
+                ))
+                self._conn.execute(f"DELETE FROM chunks WHERE chunk_id IN ({placeholders})", part)
+            self._conn.executemany("DELETE FROM chunk_tags WHERE row_id = ?", [(i,) for i in deleted])
+            self._conn.executemany("INSERT OR IGNORE INTO tombstones (row_id) VALUES (?)", [(i,) for i in deleted])
+        return deleted
+    
+    def tombstones(self) -> np.ndarray:
+        """Sorted row ids of deleted chunks whose vectors have not been compacted away."""
+        with self._lock:
+            rows = self._conn.execute("SELECT row_id FROM tombstones ORDER BY row_id").fetchall()
+        return np.array([row[0] for row in rows], dtype=np.int64)
+    
+    def clear_tombstones(self, row_ids: Iterable[int]):
+        """Forget tombstones of rows whose vectors were removed by a compaction."""
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM tombstones WHERE row_id = ?", [(int(i),) for i in row_ids])
+    
+    def get_many(self, row_ids: List[int]) -> Dict[int, Dict]:
+        """
+        Fetch metadata (with text) for the given rows only.
+        
+        Returns:
+            Dict mapping row id to its metadata dict; missing ids are omitted
+        """
+        found = {}
+        with self._lock:
+            for start in range(0, len(row_ids), _MAX_PARAMS):
+                part = [int(i) for i in row_ids[start:start + _MAX_PARAMS]]
+                placeholders = ",".join("?" * len(part))
+                for row in self._conn.execute(
+                    "SELECT row_id, chunk_id, filename, chunk_index, text, extra, page, page_end, uploaded_at "
+                    f"FROM chunks WHERE row_id IN ({placeholders})",
+                    part
+                ):
+                    found[row[0]] = self._to_metadata(row)
+        return found
+    
+    def get_by_chunk_ids(self, chunk_ids: List[str]) -> Dict[str, Dict]:
+        """
+        Fetch metadata (with text) by chunk uuid.
+        
+        Returns:
+            Dict mapping chunk id to its metadata dict; missing ids are omitted
+        """
+        found = {}
+        with self._lock:
+            for start in range(0, len(chunk_ids), _MAX_PARAMS):
+                part = list(chunk_ids[start:start + _MAX_PARAMS])
+                placeholders = ",".join("?" * len(part))
+                for row in self._conn.execute(
+                    "SELECT row_id, chunk_id, filename, chunk_index, text, extra, page, page_end, uploaded_at "
+                    f"FROM chunks WHERE chunk_id IN ({placeholders})",
+                    part
+                ):
+                    found[row[1]] = self._to_metadata(row)
+        return found
+    
+    def iter_texts(self, batch_size: int = 1000) -> Iterator[List[Tuple[str, str, str]]]:
+        """Yield (chunk id, filename, text) batches in row id order."""
+        last_row_id = -1
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT row_id, chunk_id, filename, text FROM chunks "
+                    "WHERE row_id > ? ORDER BY row_id LIMIT ?",
+                    (last_row_id, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            last_row_id = rows[-1][0]
+            yield [(chunk_id, filename, text) for _, chunk_id, filename, text in rows]
+    
+    def matching(self, search_filter: SearchFilter, chunk_ids: bool = False) -> Tuple[np.ndarray, Optional[List[str]]]:
+        """
+        Chunks that satisfy a filter, resolved on the indexed columns.
+        
+        Args:
+            search_filter: Filter to resolve
+            chunk_ids: Also return the chunks' uuids
+        
+        Returns:
+            Tuple (sorted row ids, chunk ids in the same order or None)
+        """
+        clauses, params = [], []
+        if search_filter.filenames:
+            clauses.append(f"filename IN ({','.join('?' * len(search_filter.filenames))})")
+            params.extend(search_filter.filenames)
+        if search_filter.uploaded_after is not None:
+            clauses.append("uploaded_at >= ?")
+            params.append(search_filter.uploaded_after)
+        if search_filter.uploaded_before is not None:
+            clauses.append("uploaded_at <= ?")
+            params.append(search_filter.uploaded_before)
+        if search_filter.page_from is not None:
+            clauses.append("COALESCE(page_end, page) >= ?")
+            params.append(search_filter.page_from)
+        if search_filter.page_to is not None:
+            clauses.append("page <= ?")
+            params.append(search_filter.page_to)
+        # With other predicates, check tags per candidate row instead of listing every tagged row
+        tag_clause = (
+            "EXISTS (SELECT 1 FROM chunk_tags WHERE tag = ? AND chunk_tags.row_id = chunks.row_id)"
+            if clauses else "row_id IN (SELECT row_id FROM chunk_tags WHERE tag = ?)"
+        )
+        for tag in search_filter.tags:
+            clauses.append(tag_clause)
+            params.append(tag)
+        where = " AND ".join(clauses) or "1"
+        columns = "row_id, chunk_id" if chunk_ids else "row_id"
+        with self._lock:
+            rows = self._conn.execute(f"SELECT {columns} FROM chunks WHERE {where}", params).fetchall()
+        row_ids = np.array([row[0] for row in rows], dtype=np.int64)
+        # Sorting here is cheaper than an ORDER BY that cannot use the covering indexes
+        order = np.argsort(row_ids, kind="stable")
+        return row_ids[order], [rows[i][1] for i in order] if chunk_ids else None
+    
+    def delete_from(self, first_row_id: int) -> int:
+        """Drop rows with id >= ``first_row_id`` (left by an uncommitted append)."""
+        with self._lock, self._conn:
+            cursor = self._conn.execute("DELETE FROM chunks WHERE row_id >= ?", (first_row_id,))
+            self._conn.execute("DELETE FROM chunk_tags WHERE row_id >= ?", (first_row_id,))
+            self._conn.execute("DELETE FROM tombstones WHERE row_id >= ?", (first_row_id,))
+        return cursor.rowcount
+    
+    def count(self) -> int:
+        """Number of rows stored."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+    
+    @staticmethod
+    def _to_metadata(row) -> Dict:
+        _, chunk_id, filename, chunk_index, text, extra, page, page_end, uploaded_at = row
+        metadata = json.loads(extra) if extra else {}
+        metadata.update({"filename": filename, "chunk_index": chunk_index, "id": chunk_id, "text": text})
+        for key, value in (("page", page), ("page_end", page_end), ("uploaded_at", uploaded_at)):
+            if value is not None:
+                metadata[key] = value
+        return metadata
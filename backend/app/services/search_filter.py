@@ -0,0 +1,110 @@
+"""Metadata predicates that restrict a search to matching chunks."""
+import json
+from typing import Dict, Iterable, List, Optional, Union
+
+# Chroma metadata cannot hold lists: each tag is also stored as a boolean key
+TAG_KEY_PREFIX = "tag:"
+
+
+def parse_tags(tags: Union[str, Iterable[str], None]) -> List[str]:
+    """Normalize tags given as a comma-separated string or a list: trimmed, lowercase, unique, sorted."""
+    if tags is None:
+        return []
+    if isinstance(tags, str):
+        tags = tags.split(",")
+    return sorted({tag.strip().lower() for tag in tags if tag and tag.strip()})
+
+
+class SearchFilter:
+    """
+    Chunk predicates of a search; every predicate that is set must hold.
+    
+    The vector store applies them inside the index rather than by
+    over-fetching and discarding: Chroma gets a ``where`` clause, FAISS an
+    ID selector built from an indexed SQLite query (or an exact search of
+    just the matching vectors when they are few), and BM25 only scores
+    matching chunks.
+    
+    Args:
+        filenames: Chunks of any of these documents
+        uploaded_after: Chunks uploaded at or after this Unix time
+        uploaded_before: Chunks uploaded at or before this Unix time
+        page_from: Chunks ending on or after this page
+        page_to: Chunks starting on or before this page
+        tags: Chunks carrying every one of these tags
+    """
+    
+    def __init__(
+        self,
+        filenames: Optional[Iterable[str]] = None,
+        uploaded_after: Optional[float] = None,
+        uploaded_before: Optional[float] = None,
+        page_from: Optional[int] = None,
+        page_to: Optional[int] = None,
+        tags: Union[str, Iterable[str], None] = None
+    ):
+        self.filenames = sorted(set(filenames)) if filenames else []
+        self.uploaded_after = uploaded_after
+        self.uploaded_before = uploaded_before
+        self.page_from = page_from
+        self.page_to = page_to
+        self.tags = parse_tags(tags)
+    
+    @property
+    def is_empty(self) -> bool:
+        """True if no predicate is set (the whole corpus matches)."""
+        return not self.filenames and not self._has_attributes()
+    
+    @property
+    def only_filenames(self) -> bool:
+        """True if the filenames are the only predicate."""
+        return bool(self.filenames) and not self._has_attributes()
+    
+    def _has_attributes(self) -> bool:
+        return bool(self.tags) or any(
+            value is not None
+            for value in (self.uploaded_after, self.uploaded_before, self.page_from, self.page_to)
+        )
+    
+    def key(self) -> str:
+        """Canonical string form, equal for equal filters (e.g. for cache keys)."""
+        return json.dumps({
+            "filenames": self.filenames, "uploaded_after": self.uploaded_after,
+            "uploaded_before": self.uploaded_before, "page_from": self.page_from,
+            "page_to": self.page_to, "tags": self.tags
+        }, sort_keys=True)
+    
+    def chroma_where(self) -> Optional[Dict]:
+        """The filter as a Chroma ``where`` clause (None if empty)."""
+        clauses = []
+        if self.filenames:
+            clauses.append({"filename": {"$in": self.filenames}})
+        if self.uploaded_after is not None:
+            clauses.append({"uploaded_at": {"$gte": self.uploaded_after}})
+        if self.uploaded_before is not None:
+            clauses.append({"uploaded_at": {"$lte": self.uploaded_before}})
+        if self.page_from is not None:
+            clauses.append({"page_end": {"$gte": self.page_from}})
+        if self.page_to is not None:
+            clauses.append({"page": {"$lte": self.page_to}})
+        clauses.extend({TAG_KEY_PREFIX + tag: True} for tag in self.tags)
+        if not clauses:
+            return None
+        return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+    
+    def matches(self, metadata: Dict) -> bool:
+        """Whether a chunk's metadata satisfies the filter (for post-filtering)."""
+        if self.filenames and metadata.get("filename") not in self.filenames:
+            return False
+        uploaded_at = metadata.get("uploaded_at")
+        if self.uploaded_after is not None and (uploaded_at is None or uploaded_at < self.uploaded_after):
+            return False
+        if self.uploaded_before is not None and (uploaded_at is None or uploaded_at > self.uploaded_before):
+            return False
+        page = metadata.get("page")
+        page_end = metadata.get("page_end", page)
+        if self.page_from is not None and (page_end is None or page_end < self.page_from):
+            return False
+        if self.page_to is not None and (page is None or page > self.page_to):
+            return False
+        return set(self.tags) <= set(parse_tags(metadata.get("tags")))
@@ -0,0 +1,43 @@
+"""Tenant ids and the per-tenant data layout."""
+import re
+from pathlib import Path
+from app.utils.config import DEFAULT_TENANT
+
+# Used in directory and Chroma collection names: keep it short and path-safe
+_TENANT_PATTERN = re.compile(r"[a-z0-9](?:[a-z0-9_-]{0,46}[a-z0-9])?")
+
+
+def validate_tenant(tenant: str) -> str:
+    """
+    Normalize a tenant id (lowercase, so ids stay distinct on case-insensitive filesystems).
+    
+    Args:
+        tenant: Tenant id from a request or the configuration
+    
+    Returns:
+        The normalized id
+    
+    Raises:
+        ValueError: If the id is not 1-48 letters, digits, '-' or '_',
+            starting and ending with a letter or digit
+    """
+    normalized = tenant.lower() if isinstance(tenant, str) else ""
+    if not _TENANT_PATTERN.fullmatch(normalized):
+        raise ValueError(
+            "Invalid tenant id: use 1-48 letters, digits, '-' or '_', starting and ending with a letter or digit"
+        )
+    return normalized
+
+
+DEFAULT_TENANT_ID = validate_tenant(DEFAULT_TENANT)
+
+
+def tenant_directory(base: Path, tenant: str) -> Path:
+    """
+    Data directory of a tenant under ``base``.
+    
+    The default tenant uses ``base`` itself, so data written before tenants
+    existed stays where it is; other tenants get ``base/tenants/<tenant>``.
+    """
+    tenant = validate_tenant(tenant)
+    return base if tenant == DEFAULT_TENANT_ID else base / "tenants" / tenant
@@ -1,37 +1,80 @@
 """Vector store service for storing and retrieving embeddings."""
-from typing import List, Dict, Optional
+from collections import OrderedDict
+from typing import Callable, Iterator, List, Dict, Optional, Tuple
+import itertools
 import uuid
+import threading
+import weakref
 from pathlib import Path
-from app.utils.config import VECTOR_DB_DIR, VECTOR_STORE_TYPE, TOP_K_RESULTS
+import numpy as np
+from app.utils.config import (
+    VECTOR_DB_DIR, VECTOR_STORE_TYPE, TOP_K_RESULTS, INGEST_BATCH_SIZE, FAISS_MAX_SEGMENTS,
+    FAISS_INDEX_TYPE, FAISS_MIN_TRAIN_VECTORS, FAISS_NLIST, FAISS_PQ_M, FAISS_HNSW_M,
+    FAISS_NPROBE, FAISS_EF_SEARCH, FAISS_MAX_DELETED_RATIO, FAISS_SUBSET_SEARCH_MAX,
+    FAISS_QUANTIZATION, FAISS_RERANK_FACTOR,
+    HYBRID_SEARCH_ENABLED, HYBRID_VECTOR_WEIGHT, HYBRID_KEYWORD_WEIGHT, HYBRID_RRF_K, HYBRID_CANDIDATES,
+    BM25_K1, BM25_B, TENANT_MEMORY_BUDGET_MB
+)
 from app.services.embedding import get_embedding_service
+from app.services.faiss_store import open_segment_store
+from app.services.bm25_index import BM25Index, reciprocal_rank_fusion
+from app.services.document_registry import DocumentRegistry
+from app.services.search_filter import SearchFilter, TAG_KEY_PREFIX, parse_tags
+from app.services.tenancy import DEFAULT_TENANT_ID, tenant_directory, validate_tenant
+from app.utils.metrics import span, timed
+
+
+# Corpus versions are drawn from one process-wide sequence, so a tenant
+# store that is unloaded and reopened never repeats a version a cache saw
+_versions = itertools.count()
+
+# Estimated fixed memory of an open store: SQLite page caches (2 MB per
+# connection by default) of the metadata, BM25 and document databases
+_STORE_OVERHEAD_BYTES = 8 << 20
+
+_chroma_client = None
+_chroma_client_lock = threading.Lock()
 
 
 class VectorStore:
-    """Vector store for managing document embeddings."""
+    """
+    Vector store for managing document embeddings.
     
-    def __init__(self):
+    Args:
+        tenant: Tenant whose index this is; each tenant has its own FAISS
+            directory or Chroma collection, keyword index and document registry
+    """
+    
+    def __init__(self, tenant: str = DEFAULT_TENANT_ID):
+        self.tenant = validate_tenant(tenant)
+        self.directory = tenant_directory(VECTOR_DB_DIR, self.tenant)
+        self.directory.mkdir(parents=True, exist_ok=True)
         self.store_type = VECTOR_STORE_TYPE.lower()
         self.embedding_service = get_embedding_service()
+        # Changes whenever the corpus changes; answer caches key on it
+        self.version = next(_versions)
+        self._memory = (None, 0)  # (version, estimated bytes)
         
         if self.store_type == "chroma":
             self._init_chroma()
         else:
             self._init_faiss()
+        
+        self.keyword_index = None
+        if HYBRID_SEARCH_ENABLED:
+            self._init_keyword_index()
+        
+        self._init_documents()
     
     def _init_chroma(self):
         """Initialize Chroma vector store."""
         try:
-            import chromadb
-            from chromadb.config import Settings
+            self.client = _get_chroma_client()
             
-            self.client = chromadb.PersistentClient(
-                path=str(VECTOR_DB_DIR / "chroma"),
-                settings=Settings(anonymized_telemetry=False)
-            )
-            
-            # Get or create collection
+            # Get or create collection (one per tenant in the shared client)
+            name = "rag_chatbot" if self.tenant == DEFAULT_TENANT_ID else f"rag_chatbot-{self.tenant}"
             self.collection = self.client.get_or_create_collection(
-                name="rag_chatbot",
+                name=name,
                 metadata={"hnsw:space": "cosine"}
             )
             self.use_chroma = True
@@ -42,156 +85,610 @@ class VectorStore:
         """Initialize FAISS vector store."""
         try:
             import faiss
-            import numpy as np
             import pickle
             
             # Make faiss available to class
             self.faiss = faiss
             
-            self.index_file = VECTOR_DB_DIR / "faiss_index.bin"
-            self.metadata_file = VECTOR_DB_DIR / "faiss_metadata.pkl"
-            
             # Get embedding dimension
             test_embedding = self.embedding_service.embed_text("test")
             self.dimension = len(test_embedding)
             
-            # Load or create FAISS index
-            if self.index_file.exists():
-                self.index = faiss.read_index(str(self.index_file))
-                with open(self.metadata_file, "rb") as f:
-                    self.metadata = pickle.load(f)
-            else:
-                self.index = faiss.IndexFlatIP(self.dimension)  # Inner product for cosine similarity
-                self.metadata = []
+            # Load append-only segments (inner product on normalized vectors = cosine)
+            self.index = open_segment_store(
+                self.directory / "faiss_segments",
+                self.dimension,
+                faiss,
+                max_segments=FAISS_MAX_SEGMENTS,
+                index_type=FAISS_INDEX_TYPE,
+                min_train_vectors=FAISS_MIN_TRAIN_VECTORS,
+                nlist=FAISS_NLIST,
+                pq_m=FAISS_PQ_M,
+                hnsw_m=FAISS_HNSW_M,
+                nprobe=FAISS_NPROBE,
+                ef_search=FAISS_EF_SEARCH,
+                max_deleted_ratio=FAISS_MAX_DELETED_RATIO,
+                subset_search_max=FAISS_SUBSET_SEARCH_MAX,
+                quantization=FAISS_QUANTIZATION,
+                rerank_factor=FAISS_RERANK_FACTOR
+            )
+            
+            # Migrate a single-file index written by older versions
+            legacy_index_file = self.directory / "faiss_index.bin"
+            legacy_metadata_file = self.directory / "faiss_metadata.pkl"
+            if legacy_index_file.exists() and self.index.ntotal == 0:
+                with open(legacy_metadata_file, "rb") as f:
+                    legacy_metadata = pickle.load(f)
+                self.index.import_legacy(faiss.read_index(str(legacy_index_file)), legacy_metadata)
+                legacy_index_file.unlink()
+                legacy_metadata_file.unlink()
             
             self.use_chroma = False
         except ImportError:
             raise ImportError("FAISS not installed. Install with: pip install faiss-cpu")
     
-    def add_documents(self, texts: List[str], metadatas: Optional[List[Dict]] = None) -> List[str]:
+    def _init_keyword_index(self):
+        """Open the BM25 index, building it from stored chunks if it is missing."""
+        self.keyword_index = BM25Index(self.directory / "bm25.sqlite3", k1=BM25_K1, b=BM25_B)
+        if self.keyword_index.count() > 0 or self.count() == 0:
+            return
+        
+        # Corpus indexed before hybrid search existed: backfill once
+        for batch in self._iter_stored_chunks():
+            chunk_ids, filenames, texts = zip(*batch)
+            self.keyword_index.add(chunk_ids, texts, filenames)
+    
+    def _init_documents(self):
+        """Open the document registry, registering chunks indexed before it existed."""
+        self.documents = DocumentRegistry(self.directory / "documents.sqlite3")
+        if self.documents.count() == 0 and self.count() > 0:
+            self.documents.backfill(self._iter_stored_chunks())
+    
+    def _iter_stored_chunks(self) -> Iterator[List[Tuple[str, str, str]]]:
+        """Yield (chunk id, filename, text) batches of every stored chunk."""
+        if self.use_chroma:
+            offset = 0
+            while True:
+                batch = self.collection.get(limit=1000, offset=offset, include=["documents", "metadatas"])
+                if not batch["ids"]:
+                    return
+                yield [
+                    (chunk_id, (metadata or {}).get("filename"), text)
+                    for chunk_id, text, metadata in zip(batch["ids"], batch["documents"], batch["metadatas"])
+                ]
+                offset += len(batch["ids"])
+        else:
+            yield from self.index.metadata.iter_texts()
+    
+    def add_documents(
+        self,
+        texts: List[str],
+        metadatas: Optional[List[Dict]] = None,
+        progress: Optional[Callable] = None
+    ) -> List[str]:
         """
         Add documents to the vector store.
         
         Args:
             texts: List of text chunks to add
             metadatas: Optional list of metadata dicts
-            
+            progress: Optional callback ``progress(stage, done, total)`` called
+                during the "embed" and "index" stages
+        
         Returns:
             List of document IDs
         """
         if not texts:
             return []
         
-        # Generate embeddings
-        embeddings = self.embedding_service.embed_documents(texts)
+        # Generate embeddings straight into one contiguous float32 matrix,
+        # batch by batch so progress can be reported
+        with span("ingest_embed"):
+            embeddings = None
+            for start in range(0, len(texts), INGEST_BATCH_SIZE):
+                batch = self.embedding_service.embed_documents(texts[start:start + INGEST_BATCH_SIZE])
+                if embeddings is None:
+                    embeddings = np.empty((len(texts), batch.shape[1]), dtype=np.float32)
+                embeddings[start:start + len(batch)] = batch
+                if progress:
+                    progress("embed", start + len(batch), len(texts))
         
-        if self.use_chroma:
-            # Add to Chroma
-            ids = [str(uuid.uuid4()) for _ in texts]
-            if metadatas is None:
-                metadatas = [{}] * len(texts)
-            
-            self.collection.add(
-                embeddings=embeddings,
-                documents=texts,
-                metadatas=metadatas,
-                ids=ids
-            )
-            return ids
-        else:
-            # Add to FAISS
-            import numpy as np
-            import pickle
-            
-            ids = []
-            for i, (text, embedding, metadata) in enumerate(zip(texts, embeddings, metadatas or [{}] * len(texts))):
-                doc_id = str(uuid.uuid4())
-                ids.append(doc_id)
+        if progress:
+            progress("index", 0, len(texts))
+        
+        with span("ingest_index"):
+            if self.use_chroma:
+                # Add to Chroma
+                ids = [str(uuid.uuid4()) for _ in texts]
+                if metadatas is None:
+                    metadatas = [{}] * len(texts)
                 
-                # Add embedding to index
-                embedding_array = np.array([embedding], dtype=np.float32)
-                # Normalize for cosine similarity
-                import faiss
-                faiss.normalize_L2(embedding_array)
-                self.index.add(embedding_array)
+                self.collection.add(
+                    embeddings=embeddings.tolist(),
+                    documents=texts,
+                    metadatas=[self._chroma_metadata(metadata) for metadata in metadatas],
+                    ids=ids
+                )
+                self._index_keywords(ids, texts, metadatas)
+                self.version = next(_versions)
+                if progress:
+                    progress("index", len(texts), len(texts))
+                return ids
+            else:
+                # Add to FAISS
+                ids = []
+                metadatas = metadatas or [{} for _ in texts]
+                for text, metadata in zip(texts, metadatas):
+                    doc_id = str(uuid.uuid4())
+                    ids.append(doc_id)
+                    
+                    # Store metadata
+                    metadata['id'] = doc_id
+                    metadata['text'] = text
                 
-                # Store metadata
-                metadata['id'] = doc_id
-                metadata['text'] = text
-                self.metadata.append(metadata)
-            
-            # Save index and metadata
-            import faiss
-            import pickle
-            faiss.write_index(self.index, str(self.index_file))
-            with open(self.metadata_file, "wb") as f:
-                pickle.dump(self.metadata, f)
-            
-            return ids
+                # Normalize in place for cosine similarity, then add in one call.
+                # Existing segments are never rewritten.
+                self.faiss.normalize_L2(embeddings)
+                self.index.append(embeddings, metadatas)
+                self._index_keywords(ids, texts, metadatas)
+                
+                self.version = next(_versions)
+                if progress:
+                    progress("index", len(texts), len(texts))
+                return ids
+    
+    def update_metadata(self, ids: List[str], metadatas: List[Dict]):
+        """
+        Replace the metadata of stored chunks without re-embedding them.
+        
+        Args:
+            ids: Chunk ids
+            metadatas: New metadata per chunk (the text is kept)
+        """
+        if not ids:
+            return
+        if self.use_chroma:
+            # Updates merge keys: clear tag keys the new metadata no longer has
+            previous = self.collection.get(ids=ids, include=["metadatas"])
+            stale = {
+                doc_id: {key: False for key in (metadata or {}) if key.startswith(TAG_KEY_PREFIX)}
+                for doc_id, metadata in zip(previous["ids"], previous["metadatas"])
+            }
+            self.collection.update(ids=ids, metadatas=[
+                {**stale.get(doc_id, {}), **self._chroma_metadata(metadata)}
+                for doc_id, metadata in zip(ids, metadatas)
+            ])
+        else:
+            self.index.metadata.update_by_chunk_ids(ids, metadatas)
+        self.version = next(_versions)
+    
+    @staticmethod
+    def _chroma_metadata(metadata: Dict) -> Dict:
+        """Chroma metadata with one boolean ``tag:<name>`` key per tag (it cannot store lists)."""
+        return {**metadata, **{TAG_KEY_PREFIX + tag: True for tag in parse_tags(metadata.get("tags"))}}
+    
+    def delete(self, ids: List[str]):
+        """
+        Remove chunks from the dense and keyword indexes.
+        
+        With FAISS the chunk's metadata row is replaced by a tombstone and
+        searches skip its vector until a compaction removes it.
+        
+        Args:
+            ids: Chunk ids; unknown ids are ignored
+        """
+        if not ids:
+            return
+        if self.use_chroma:
+            self.collection.delete(ids=ids)
+        else:
+            self.index.delete(ids)
+        if self.keyword_index is not None:
+            self.keyword_index.delete(ids)
+        self.version = next(_versions)
+    
+    def _index_keywords(self, ids: List[str], texts: List[str], metadatas: List[Dict]):
+        if self.keyword_index is not None:
+            self.keyword_index.add(ids, texts, [metadata.get("filename") for metadata in metadatas])
+    
+    def count(self) -> int:
+        """Number of chunks currently stored."""
+        if self.use_chroma:
+            return self.collection.count()
+        return self.index.ntotal - self.index.deleted_count
     
-    def search(self, query: str, top_k: int = None) -> List[Dict]:
+    def memory_bytes(self) -> int:
+        """
+        Estimated memory held by this open store, for the tenant pool's budget.
+        
+        FAISS counts its segment indexes and tombstones. Chroma's vectors live
+        in the shared client's segment cache, which enforces the budget
+        itself, so only the fixed per-store overhead is counted.
+        """
+        version, size = self._memory
+        if version != self.version:
+            size = _STORE_OVERHEAD_BYTES + (0 if self.use_chroma else self.index.memory_bytes())
+            self._memory = (self.version, size)
+        return size
+    
+    def search(
+        self,
+        query: str,
+        top_k: int = None,
+        query_embedding: Optional[np.ndarray] = None,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        filters: Optional[SearchFilter] = None,
+        vector_weight: Optional[float] = None,
+        keyword_weight: Optional[float] = None
+    ) -> List[Dict]:
         """
         Search for similar documents.
         
+        Dense results are fused with BM25 keyword results by weighted
+        reciprocal rank fusion when hybrid search is enabled.
+        
         Args:
             query: Search query
             top_k: Number of results to return
-            
+            query_embedding: Precomputed embedding of ``query`` (computed if omitted)
+            nprobe: FAISS IVF lists to visit for this query (FAISS only)
+            ef_search: FAISS HNSW search breadth for this query (FAISS only)
+            filters: Only return chunks matching these metadata predicates
+            vector_weight: Fusion weight of dense results (default from config)
+            keyword_weight: Fusion weight of BM25 results (default from config, 0 = dense only)
+        
         Returns:
             List of similar documents with scores
         """
+        return self.search_many(
+            [query],
+            top_k=top_k,
+            query_embeddings=None if query_embedding is None else np.asarray([query_embedding], dtype=np.float32),
+            nprobe=nprobe,
+            ef_search=ef_search,
+            filters=filters,
+            vector_weight=vector_weight,
+            keyword_weight=keyword_weight
+        )[0]
+    
+    @timed("search")
+    def search_many(
+        self,
+        queries: List[str],
+        top_k: int = None,
+        query_embeddings: Optional[np.ndarray] = None,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        filters: Optional[SearchFilter] = None,
+        vector_weight: Optional[float] = None,
+        keyword_weight: Optional[float] = None
+    ) -> List[List[Dict]]:
+        """
+        Search for several queries at once.
+        
+        Runs one multi-query dense search (a single FAISS/Chroma call) and
+        one metadata lookup for all queries; BM25 is scored per query.
+        Filters are resolved once for all queries and applied inside each
+        index (see ``SearchFilter``).
+        
+        Args:
+            queries: Search queries
+            top_k: Number of results per query
+            query_embeddings: Precomputed (len(queries), dim) embeddings
+                (embedded in one batch if omitted)
+            nprobe, ef_search, filters, vector_weight, keyword_weight: As in ``search``
+        
+        Returns:
+            For each query, its list of similar documents with scores
+        """
+        if not queries:
+            return []
         if top_k is None:
             top_k = TOP_K_RESULTS
+        if vector_weight is None:
+            vector_weight = HYBRID_VECTOR_WEIGHT
+        if keyword_weight is None:
+            keyword_weight = HYBRID_KEYWORD_WEIGHT
+        
+        hybrid = self.keyword_index is not None and keyword_weight > 0
+        if filters is not None and filters.is_empty:
+            filters = None
+        row_ids = chunk_ids = None
+        if filters is not None:
+            with span("search_filter"):
+                row_ids, chunk_ids = self._matching(filters, chunk_ids=hybrid and not filters.only_filenames)
+            if row_ids is not None and len(row_ids) == 0:
+                return [[] for _ in queries]
+        
+        if not hybrid or vector_weight > 0:
+            if query_embeddings is None:
+                query_embeddings = self.embedding_service.embed_queries(queries)
+            # Fuse deeper candidate lists so either retriever can promote a chunk
+            depth = top_k * HYBRID_CANDIDATES if hybrid else top_k
+            with span("search_dense"):
+                dense = self._dense_search(query_embeddings, depth, nprobe, ef_search, filters, row_ids)
+        else:
+            dense = [[] for _ in queries]
+        if not hybrid:
+            return dense
+        
+        keyword_filenames = filters.filenames if filters is not None and filters.filenames else None
+        # Filename-only filters use the keyword index's own filename column
+        keyword_ids = None if filters is None or filters.only_filenames else chunk_ids
+        fused_results = []
+        for query, dense_docs in zip(queries, dense):
+            with span("search_keyword"):
+                keyword = self.keyword_index.search(
+                    query, top_k * HYBRID_CANDIDATES, filenames=keyword_filenames, doc_ids=keyword_ids
+                )
+            fused_results.append(reciprocal_rank_fusion(
+                [[doc['id'] for doc in dense_docs], [doc_id for doc_id, _ in keyword]],
+                [vector_weight, keyword_weight],
+                k=HYBRID_RRF_K
+            )[:top_k])
+        
+        docs_by_id = {doc['id']: doc for dense_docs in dense for doc in dense_docs}
+        missing = list(dict.fromkeys(
+            doc_id for fused in fused_results for doc_id, _ in fused if doc_id not in docs_by_id
+        ))
+        docs_by_id.update(self._fetch_chunks(missing))
+        
+        results = []
+        for fused in fused_results:
+            documents = []
+            for doc_id, score in fused:
+                doc = docs_by_id.get(doc_id)
+                if doc is not None:
+                    documents.append({**doc, 'score': score})
+            results.append(documents)
+        return results
+    
+    def _matching(self, filters: SearchFilter, chunk_ids: bool) -> Tuple[Optional[np.ndarray], Optional[List[str]]]:
+        """
+        Resolve a filter to the matching chunks.
         
-        # Generate query embedding
-        query_embedding = self.embedding_service.embed_text(query)
+        Args:
+            filters: Non-empty filter
+            chunk_ids: Whether the matching chunk ids are needed (for BM25)
         
+        Returns:
+            Tuple (FAISS row ids or None for Chroma, chunk ids or None)
+        """
+        if self.use_chroma:
+            if not chunk_ids:
+                return None, None
+            return None, self.collection.get(where=filters.chroma_where(), include=[])["ids"]
+        return self.index.metadata.matching(filters, chunk_ids=chunk_ids)
+    
+    def _dense_search(
+        self,
+        query_embeddings: np.ndarray,
+        top_k: int,
+        nprobe: Optional[int],
+        ef_search: Optional[int],
+        filters: Optional[SearchFilter],
+        row_ids: Optional[np.ndarray]
+    ) -> List[List[Dict]]:
         if self.use_chroma:
-            # Search Chroma
+            # Search Chroma (one multi-query call); the filter becomes a where clause
             results = self.collection.query(
-                query_embeddings=[query_embedding],
-                n_results=top_k
+                query_embeddings=np.asarray(query_embeddings, dtype=np.float32).tolist(),
+                n_results=top_k,
+                where=filters.chroma_where() if filters is not None else None
             )
             
-            documents = []
-            if results['ids'] and results['ids'][0]:
-                for i in range(len(results['ids'][0])):
-                    documents.append({
-                        'text': results['documents'][0][i],
-                        'metadata': results['metadatas'][0][i],
-                        'score': 1 - results['distances'][0][i]  # Convert distance to similarity
-                    })
-            return documents
+            all_documents = []
+            for q in range(len(query_embeddings)):
+                documents = []
+                if results['ids'] and results['ids'][q]:
+                    for i in range(len(results['ids'][q])):
+                        documents.append({
+                            'id': results['ids'][q][i],
+                            'text': results['documents'][q][i],
+                            'metadata': results['metadatas'][q][i],
+                            'score': 1 - results['distances'][q][i]  # Convert distance to similarity
+                        })
+                all_documents.append(documents)
+            return all_documents
         else:
-            # Search FAISS
-            import numpy as np
-            import faiss
+            # Search FAISS (copy: normalization is in place)
+            query_array = np.array(query_embeddings, dtype=np.float32)
+            self.faiss.normalize_L2(query_array)
             
-            query_array = np.array([query_embedding], dtype=np.float32)
-            faiss.normalize_L2(query_array)
-            
-            scores, indices = self.index.search(query_array, min(top_k, self.index.ntotal))
+            hits = self.index.search(
+                query_array, top_k, nprobe=nprobe, ef_search=ef_search, id_filter=row_ids
+            )
             
-            documents = []
-            for score, idx in zip(scores[0], indices[0]):
-                if idx < len(self.metadata):
-                    doc = {
-                        'text': self.metadata[idx]['text'],
-                        'metadata': self.metadata[idx],
-                        'score': float(score)
+            return [
+                [
+                    {
+                        'id': metadata['id'],
+                        'text': metadata['text'],
+                        'metadata': metadata,
+                        'score': score
                     }
-                    documents.append(doc)
-            
-            return documents
+                    for score, row_id, metadata in query_hits
+                ]
+                for query_hits in hits
+            ]
+    
+    def get_chunks(self, ids: List[str]) -> Dict[str, Dict]:
+        """
+        Text and metadata of stored chunks.
+        
+        Args:
+            ids: Chunk ids
+        
+        Returns:
+            Dict of chunk id to ``{'id', 'text', 'metadata'}``; unknown ids are left out
+        """
+        return self._fetch_chunks(ids)
+    
+    def _fetch_chunks(self, ids: List[str]) -> Dict[str, Dict]:
+        """Load text and metadata of chunks found only by keyword search."""
+        if not ids:
+            return {}
+        if self.use_chroma:
+            results = self.collection.get(ids=ids, include=["documents", "metadatas"])
+            return {
+                doc_id: {'id': doc_id, 'text': text, 'metadata': metadata}
+                for doc_id, text, metadata in zip(results['ids'], results['documents'], results['metadatas'])
+            }
+        return {
+            doc_id: {'id': doc_id, 'text': metadata['text'], 'metadata': metadata}
+            for doc_id, metadata in self.index.metadata.get_by_chunk_ids(ids).items()
+        }
+
+
+def _get_chroma_client():
+    """Chroma client shared by every tenant's collection."""
+    global _chroma_client
+    if _chroma_client is None:
+        import chromadb
+        from chromadb.config import Settings
+        
+        with _chroma_client_lock:
+            if _chroma_client is None:
+                options = {}
+                # Releases without a segment cache (e.g. the pinned 0.4.15) reject unknown
+                # settings; Chroma memory is then not limited by the budget
+                fields = getattr(Settings, "__fields__", None) or getattr(Settings, "model_fields", {})
+                if "chroma_segment_cache_policy" in fields and "chroma_memory_limit_bytes" in fields:
+                    # Unload the least recently used collections' HNSW segments beyond the budget
+                    options["chroma_segment_cache_policy"] = "LRU"
+                    options["chroma_memory_limit_bytes"] = TENANT_MEMORY_BUDGET_MB << 20
+                _chroma_client = chromadb.PersistentClient(
+                    path=str(VECTOR_DB_DIR / "chroma"),
+                    settings=Settings(anonymized_telemetry=False, **options)
+                )
+    return _chroma_client
+
+
+class VectorStorePool:
+    """
+    Per-tenant vector stores, opened on first use and unloaded least recently used first.
+    
+    A tenant's store is only opened when the first request for that tenant
+    arrives. Once the estimated memory of the open stores exceeds
+    ``memory_budget`` bytes, the least recently used ones are unloaded;
+    the most recently used store always stays, even if it alone exceeds
+    the budget.
+    
+    Unloading only drops the pool's reference: a search or ingestion still
+    using an unloaded store keeps it alive, and asking for that tenant
+    meanwhile returns the same instance. A FAISS index outlives its store
+    while a background compaction still runs, and reopening the tenant then
+    reuses that index (``open_segment_store``), so a tenant never has two
+    writers of the same files.
+    
+    Args:
+        memory_budget: Bytes of open stores kept before unloading
+        factory: Opens the store of a tenant
+    """
+    
+    def __init__(self, memory_budget: int, factory: Callable[[str], VectorStore] = VectorStore):
+        self.memory_budget = memory_budget
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._stores: "OrderedDict[str, VectorStore]" = OrderedDict()  # Least recently used first
+        self._unloaded = weakref.WeakValueDictionary()  # Evicted stores still referenced elsewhere
+        self._loading: Dict[str, threading.Lock] = {}
+        self.loads = 0
+        self.evictions = 0
+    
+    def get(self, tenant: str) -> VectorStore:
+        """
+        Return the tenant's store, opening it if it is not loaded.
+        
+        Args:
+            tenant: Tenant id (validated)
+        
+        Raises:
+            ValueError: If the tenant id is invalid
+        """
+        tenant = validate_tenant(tenant)
+        with self._lock:
+            store = self._use(tenant)
+            if store is None:
+                load_lock = self._loading.setdefault(tenant, threading.Lock())
+        if store is None:
+            # Open outside the pool lock: other tenants stay servable meanwhile
+            with load_lock:
+                with self._lock:
+                    store = self._use(tenant)
+                if store is None:
+                    store = self._factory(tenant)
+                    with self._lock:
+                        self._stores[tenant] = store
+                        self._loading.pop(tenant, None)
+                        self.loads += 1
+        self._evict()
+        return store
+    
+    def loaded(self) -> List[Tuple[str, VectorStore]]:
+        """(tenant, store) pairs of the loaded stores, least recently used first."""
+        with self._lock:
+            return list(self._stores.items())
+    
+    def stats(self) -> Dict:
+        """Loaded tenants, their estimated memory and load/eviction counters."""
+        with self._lock:
+            stores = list(self._stores.values())
+            unloaded_in_use = len(self._unloaded)
+        return {
+            "loaded": len(stores),
+            "unloaded_in_use": unloaded_in_use,
+            "memory_bytes": sum(store.memory_bytes() for store in stores),
+            "memory_budget_bytes": self.memory_budget,
+            "loads": self.loads,
+            "evictions": self.evictions,
+        }
+    
+    def _use(self, tenant: str) -> Optional[VectorStore]:
+        # Caller holds self._lock
+        store = self._stores.get(tenant)
+        if store is not None:
+            self._stores.move_to_end(tenant)
+            return store
+        store = self._unloaded.pop(tenant, None)
+        if store is not None:
+            self._stores[tenant] = store
+        return store
+    
+    def _evict(self):
+        with self._lock:
+            sizes = {tenant: store.memory_bytes() for tenant, store in self._stores.items()}
+            total = sum(sizes.values())
+            while total > self.memory_budget and len(self._stores) > 1:
+                tenant, store = self._stores.popitem(last=False)
+                self._unloaded[tenant] = store
+                total -= sizes[tenant]
+                self.evictions += 1
 
 
 # Global instance
-_vector_store = None
+_vector_store_pool = None
+_vector_store_pool_lock = threading.Lock()
 
-def get_vector_store() -> VectorStore:
-    """Get or create the global vector store instance."""
-    global _vector_store
-    if _vector_store is None:
-        _vector_store = VectorStore()
-    return _vector_store
+def get_vector_store_pool() -> VectorStorePool:
+    """Get or create the global pool of tenant vector stores."""
+    global _vector_store_pool
+    if _vector_store_pool is None:
+        with _vector_store_pool_lock:
+            if _vector_store_pool is None:
+                _vector_store_pool = VectorStorePool(TENANT_MEMORY_BUDGET_MB << 20)
+    return _vector_store_pool
 
+
+def get_vector_store(tenant: Optional[str] = None) -> VectorStore:
+    """
+    Get the vector store of a tenant, loading it on first use.
+    
+    Args:
+        tenant: Tenant id (default tenant if None)
+    
+    Raises:
+        ValueError: If the tenant id is invalid
+    """
+    return get_vector_store_pool().get(tenant or DEFAULT_TENANT_ID)
@@ -1,7 +1,18 @@
 """Text chunking utilities."""
-from typing import List
-from app.utils.config import CHUNK_SIZE, CHUNK_OVERLAP
+import re
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from app.utils.config import CHUNK_SIZE, CHUNK_OVERLAP, CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS
+from app.utils.context_builder import estimate_tokens
 
+# Counts the tokens of each text; e.g. ``EmbeddingService.count_tokens``
+TokenCounter = Callable[[List[str]], List[int]]
+
+# Boundary strengths: a chunk ends at the strongest boundary in its second half
+WORD, LINE, SENTENCE, PARAGRAPH = 0, 1, 2, 3
+
+# Whitespace ending a sentence (after . ! ? and closing quotes/brackets) or containing a line break
+_BOUNDARY = re.compile(r"(?<=[.!?])([\"')\]]*\s+)|\n\s*")
+_WORD = re.compile(r"\S+\s*")
 
 def chunk_text(text: str, chunk_size: int = None, chunk_overlap: int = None) -> List[str]:
     """
@@ -11,7 +22,7 @@ def chunk_text(text: str, chunk_size: int = None, chunk_overlap: int = None) ->
         text: Input text to chunk
         chunk_size: Size of each chunk (default from config)
         chunk_overlap: Overlap between chunks (default from config)
-        
+    
     Returns:
         List of text chunks
     """
@@ -57,3 +68,187 @@ def chunk_text(text: str, chunk_size: int = None, chunk_overlap: int = None) ->
     
     return chunks if chunks else [text]
 
+
+def estimate_token_counts(texts: List[str]) -> List[int]:
+    """Default ``TokenCounter``: ``estimate_tokens`` of each text."""
+    return [estimate_tokens(text) for text in texts]
+
+
+def iter_chunks(
+    pages: Iterable[Tuple[int, str]],
+    chunk_tokens: Optional[int] = None,
+    overlap_tokens: Optional[int] = None,
+    count_tokens: Optional[TokenCounter] = None
+) -> Iterator[Dict]:
+    """
+    Chunk a stream of pages by token count, holding only about a page plus a chunk in memory.
+    
+    Pages are joined with blank lines and cut into units at paragraph,
+    sentence and line boundaries; units longer than a chunk are split
+    recursively into words, and words into character runs. Units are
+    packed into chunks of at most ``chunk_tokens`` tokens, each cut at the
+    strongest boundary in its second half, and the next chunk repeats up
+    to ``overlap_tokens`` tokens of whole units. Every unit is tokenized
+    once (a page at a time) and scanned a constant number of times, so
+    the run time is linear in the input length.
+    
+    Token counts are the sums of the units' counts; a tokenizer that
+    merges tokens across whitespace can only make a chunk shorter.
+    
+    Args:
+        pages: (page number, text) pairs in page order, e.g. from ``iter_pages``
+        chunk_tokens: Maximum tokens per chunk (default from config)
+        overlap_tokens: Tokens repeated from the previous chunk (default from config)
+        count_tokens: Tokenizer of the embedding model (default ``estimate_token_counts``)
+    
+    Yields:
+        Dicts with ``text``, ``tokens``, ``page`` (first page), ``page_end``
+        (last page) and ``char_start``/``char_end``, the offsets of ``text``
+        in the joined text
+    """
+    if chunk_tokens is None:
+        chunk_tokens = CHUNK_TOKENS
+    if overlap_tokens is None:
+        overlap_tokens = CHUNK_OVERLAP_TOKENS
+    count_tokens = count_tokens or estimate_token_counts
+    chunk_tokens = max(1, chunk_tokens)
+    overlap_tokens = max(0, min(overlap_tokens, chunk_tokens // 2))
+    
+    buffer = ""  # The joined text from absolute offset ``base`` on
+    base = 0
+    # Units of the next chunk: [start, end, tokens, boundary strength after it, page]
+    window: List[List] = []
+    window_tokens = 0
+    repeated = 0  # Leading units of the window already emitted with the previous chunk
+    
+    def emit(room: int) -> Dict:
+        """Cut the next chunk off the window, keeping overlap that fits in ``room`` tokens."""
+        nonlocal window, window_tokens, repeated
+        # Best cut: strongest boundary once half the chunk is filled, latest on ties
+        cut, best, total = len(window) - 1, -1, 0
+        for i, unit in enumerate(window):
+            total += unit[2]
+            if i >= repeated and total * 2 >= chunk_tokens and unit[3] >= best:
+                cut, best = i, unit[3]
+        cut = max(cut, repeated)
+        
+        units = window[:cut + 1]
+        raw = buffer[units[0][0] - base:units[-1][1] - base]
+        text = raw.strip()
+        char_start = units[0][0] + len(raw) - len(raw.lstrip())
+        chunk = {
+            "text": text,
+            "tokens": sum(unit[2] for unit in units),
+            "page": units[0][4],
+            "page_end": units[-1][4],
+            "char_start": char_start,
+            "char_end": char_start + len(text),
+        }
+        
+        # Repeat whole trailing units, never the entire chunk
+        keep, kept_tokens = len(units), 0
+        limit = min(overlap_tokens, room)
+        while keep > 1 and kept_tokens + units[keep - 1][2] <= limit:
+            keep -= 1
+            kept_tokens += units[keep][2]
+        window = units[keep:] + window[cut + 1:]
+        window_tokens = sum(unit[2] for unit in window)
+        repeated = len(units) - keep
+        return chunk
+    
+    def add(unit: List) -> Iterator[Dict]:
+        nonlocal window_tokens, repeated
+        while window and window_tokens + unit[2] > chunk_tokens and len(window) > repeated:
+            chunk = emit(chunk_tokens - unit[2])
+            if chunk["text"]:
+                yield chunk
+        if window_tokens + unit[2] > chunk_tokens:
+            # Only repeated units left and they don't fit with this one
+            window.clear()
+            window_tokens = repeated = 0
+        window.append(unit)
+        window_tokens += unit[2]
+    
+    started = False
+    for number, page_text in pages:
+        if not page_text.strip():
+            continue
+        if started:
+            buffer += "\n\n"  # A page's last unit already ends at a paragraph boundary
+        started = True
+        offset = base + len(buffer)
+        buffer += page_text
+        for unit in _units(page_text, offset, number, chunk_tokens, count_tokens):
+            yield from add(unit)
+        
+        # Forget text before the window (amortized: only once half the buffer is consumed)
+        first = window[0][0] if window else base + len(buffer)
+        if first - base > len(buffer) // 2:
+            buffer = buffer[first - base:]
+            base = first
+    
+    while len(window) > repeated:
+        chunk = emit(0)
+        if chunk["text"]:
+            yield chunk
+
+
+def _units(text: str, offset: int, page: int, limit: int, count_tokens: TokenCounter) -> List[List]:
+    """
+    Cut one page into units at boundaries, split units above ``limit`` tokens.
+    
+    Returns:
+        ``[start, end, tokens, strength, page]`` lists with absolute offsets;
+        each unit's trailing whitespace belongs to it
+    """
+    spans = []
+    position = 0
+    length = len(text)
+    # Leading whitespace belongs to the first unit
+    for match in _BOUNDARY.finditer(text, length - len(text.lstrip())):
+        end = match.end()
+        if end == length:
+            break
+        if match.group().count("\n") > 1:
+            spans.append((position, end, PARAGRAPH))
+        else:
+            spans.append((position, end, SENTENCE if match.lastindex else LINE))
+        position = end
+    if position < length:
+        spans.append((position, length, PARAGRAPH))
+    
+    counts = count_tokens([text[start:end] for start, end, _ in spans]) if spans else []
+    units = []
+    for (start, end, strength), tokens in zip(spans, counts):
+        if tokens <= limit:
+            units.append([offset + start, offset + end, tokens, strength, page])
+            continue
+        pieces = _split_long(text, start, end, limit, count_tokens)
+        pieces[-1][3] = strength
+        units.extend([offset + s, offset + e, tokens, strength, page] for s, e, tokens, strength in pieces)
+    return units
+
+
+def _split_long(text: str, start: int, end: int, limit: int, count_tokens: TokenCounter) -> List[List]:
+    """Split ``text[start:end]`` into words, and words above ``limit`` tokens into halves, recursively."""
+    words = [(match.start(), match.end()) for match in _WORD.finditer(text, start, end)]
+    if words and words[0][0] > start:
+        words[0] = (start, words[0][1])  # Leading whitespace
+    pieces = []
+    counts = count_tokens([text[s:e] for s, e in words]) if len(words) > 1 else [None]
+    for (s, e), tokens in zip(words, counts):
+        if tokens is not None and tokens <= limit:
+            pieces.append([s, e, tokens, WORD])
+            continue
+        # A single word (or unit) over the limit: character halves until they fit
+        stack = [(s, e)]
+        while stack:
+            s, e = stack.pop()
+            tokens = count_tokens([text[s:e]])[0]
+            if tokens <= limit or e - s <= 1:
+                pieces.append([s, e, tokens, WORD])
+            else:
+                middle = (s + e) // 2
+                stack.append((middle, e))
+                stack.append((s, middle))
+    return pieces
@@ -28,6 +28,7 @@ PROCESSED_DATA_DIR.mkdir(parents=True, exist_ok=True)
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
 HUGGINGFACE_API_KEY = os.getenv("HUGGINGFACE_API_KEY", "")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "")  # OpenAI-compatible endpoint (e.g. a local server); empty = api.openai.com
 
 # Model Provider Selection (priority: GEMINI > OPENAI > LOCAL)
 LLM_PROVIDER = os.getenv("LLM_PROVIDER", "gemini").lower()  # "gemini", "openai", or "local"
@@ -38,16 +39,91 @@ USE_OPENAI = os.getenv("USE_OPENAI", "").lower() == "true" or (LLM_PROVIDER == "
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
 LLM_MODEL = os.getenv("LLM_MODEL", "gemini-pro")  # Default to Gemini if not specified
 GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")  # gemini-1.5-flash, gemini-1.5-pro, gemini-pro
+GEMINI_FALLBACK_MODELS = [
+    name.strip() for name in os.getenv("GEMINI_FALLBACK_MODELS", "gemini-1.5-flash,gemini-pro").split(",") if name.strip()
+]  # Tried in order when GEMINI_MODEL is unavailable
+GEMINI_PROBE_COOLDOWN = float(os.getenv("GEMINI_PROBE_COOLDOWN", "60"))  # Seconds before re-probing after every model failed
+
+# Remote embedding settings (Gemini/OpenAI)
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "100"))  # Texts per API call (Gemini max is 100)
+EMBED_MAX_CONCURRENCY = int(os.getenv("EMBED_MAX_CONCURRENCY", "4"))  # Batches in flight at once
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", "5"))
+EMBED_RETRY_BASE_DELAY = float(os.getenv("EMBED_RETRY_BASE_DELAY", "0.5"))  # Seconds, doubled per attempt
+
+# Provider client settings (shared pooled clients for Gemini/OpenAI)
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))  # Per request, generation and embeddings
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "64"))  # Async requests in flight per provider
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "64"))  # Idle connections kept for reuse; >= LLM_MAX_CONCURRENCY avoids reconnects
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))  # Seconds an idle connection is kept
+
+# Embedding cache settings (persisted under VECTOR_DB_DIR/embedding_cache)
+EMBED_CACHE_ENABLED = os.getenv("EMBED_CACHE_ENABLED", "true").lower() == "true"
+EMBED_CACHE_MAX_ENTRIES = int(os.getenv("EMBED_CACHE_MAX_ENTRIES", "200000"))
+EMBED_CACHE_DTYPE = os.getenv("EMBED_CACHE_DTYPE", "float16")  # "float16" or "float32"
+
+# Query-time caches
+QUERY_EMBED_CACHE_SIZE = int(os.getenv("QUERY_EMBED_CACHE_SIZE", "1024"))  # In-memory LRU of question embeddings
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))  # 0 disables the answer cache
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600"))
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95"))  # Cosine threshold for a hit
 
 # Chunking settings
-CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1000"))
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", "256"))  # Chunk size in embedding-model tokens (capped at the model's input limit)
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "32"))  # Tokens repeated from the previous chunk
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1000"))  # Characters per chunk of the legacy chunk_text
 CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "200"))
 
+# PDF extraction
+PDF_BACKEND = os.getenv("PDF_BACKEND", "auto").lower()  # "auto", "pymupdf", "pypdf" or "pypdf2"
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", "0"))  # Extraction processes; 0 = CPU count (max 8), 1 = in-process
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "32"))  # Pages per worker task
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "64"))  # Shorter PDFs are extracted in-process
+
 # Retrieval settings
 TOP_K_RESULTS = int(os.getenv("TOP_K_RESULTS", "3"))
+HYBRID_SEARCH_ENABLED = os.getenv("HYBRID_SEARCH_ENABLED", "true").lower() == "true"  # BM25 + vector fusion
+HYBRID_VECTOR_WEIGHT = float(os.getenv("HYBRID_VECTOR_WEIGHT", "1.0"))  # Default fusion weight of dense results
+HYBRID_KEYWORD_WEIGHT = float(os.getenv("HYBRID_KEYWORD_WEIGHT", "1.0"))  # Default fusion weight of BM25 results
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))  # Reciprocal rank fusion damping constant
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "4"))  # Candidates per retriever = top_k * this
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+CONTEXT_MAX_TOKENS = int(os.getenv("CONTEXT_MAX_TOKENS", "3000"))  # Prompt context budget (estimated tokens); 0 = unlimited
+CONTEXT_DEDUP_THRESHOLD = float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.8"))  # Share of a passage's 3-grams in a kept one that makes it a duplicate
+CHAT_BATCH_CONCURRENCY = int(os.getenv("CHAT_BATCH_CONCURRENCY", "16"))  # Generations in flight per /chat/batch request
+CHAT_BATCH_BLOCK_SIZE = int(os.getenv("CHAT_BATCH_BLOCK_SIZE", "256"))  # Questions embedded and searched per multi-query call
+CHAT_BATCH_MAX_QUESTIONS = int(os.getenv("CHAT_BATCH_MAX_QUESTIONS", "10000"))
 
 # Vector store settings
 VECTOR_STORE_TYPE = os.getenv("VECTOR_STORE_TYPE", "chroma")  # "chroma" or "faiss"
+FAISS_MAX_SEGMENTS = int(os.getenv("FAISS_MAX_SEGMENTS", "8"))  # Background compaction merges beyond this
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat").lower()  # "flat", "ivf_flat", "ivf_pq" or "hnsw"
+FAISS_MIN_TRAIN_VECTORS = int(os.getenv("FAISS_MIN_TRAIN_VECTORS", "10000"))  # Vectors needed before training an ANN index
+FAISS_NLIST = int(os.getenv("FAISS_NLIST", "0"))  # IVF lists; 0 = ~4*sqrt(n)
+FAISS_PQ_M = int(os.getenv("FAISS_PQ_M", "16"))  # PQ sub-quantizers (IVF-PQ)
+FAISS_HNSW_M = int(os.getenv("FAISS_HNSW_M", "32"))  # HNSW graph degree
+FAISS_NPROBE = int(os.getenv("FAISS_NPROBE", "16"))  # Default IVF lists visited per query
+FAISS_EF_SEARCH = int(os.getenv("FAISS_EF_SEARCH", "64"))  # Default HNSW search breadth
+FAISS_MAX_DELETED_RATIO = float(os.getenv("FAISS_MAX_DELETED_RATIO", "0.2"))  # Compact all segments once this share of vectors is deleted
+FAISS_SUBSET_SEARCH_MAX = int(os.getenv("FAISS_SUBSET_SEARCH_MAX", "10000"))  # Filters matching at most this many chunks are searched exactly
+FAISS_QUANTIZATION = os.getenv("FAISS_QUANTIZATION", "none").lower()  # "none", "fp16", "int8" or "pq" (FAISS_PQ_M bytes per vector)
+FAISS_RERANK_FACTOR = int(os.getenv("FAISS_RERANK_FACTOR", "4"))  # Quantized candidates rescored in float32 = top_k * this; 1 = off
+
+# Multi-tenancy (tenant picked per request with the X-Tenant-ID header)
+DEFAULT_TENANT = os.getenv("DEFAULT_TENANT", "default")  # Tenant of requests without the header; keeps the single-tenant data layout
+TENANT_MEMORY_BUDGET_MB = int(os.getenv("TENANT_MEMORY_BUDGET_MB", "2048"))  # Least recently used tenant indexes are unloaded beyond this
+
+# Ingestion settings
+INGEST_MAX_WORKERS = int(os.getenv("INGEST_MAX_WORKERS", "2"))  # Concurrent ingestions
+INGEST_MAX_PENDING = int(os.getenv("INGEST_MAX_PENDING", "32"))  # Queued jobs before uploads get 503
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "64"))  # Chunks embedded per progress step
+INGEST_INDEX_BATCH_SIZE = int(os.getenv("INGEST_INDEX_BATCH_SIZE", "512"))  # Chunks held in memory, embedded and indexed per write
+JOBS_DB_PATH = Path(os.getenv("JOBS_DB_PATH", str(DATA_DIR / "jobs.sqlite3")))
+
+# Observability
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"  # Prometheus /metrics endpoint
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "true").lower() == "true"  # Per-stage Server-Timing response header
 
 # Server settings
 HOST = os.getenv("HOST", "0.0.0.0")
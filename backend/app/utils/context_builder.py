@@ -0,0 +1,216 @@
+"""Prompt context assembly: merge overlapping chunks, drop near-duplicates, fit a token budget."""
+import re
+from typing import Dict, List, Tuple
+from app.utils.config import CONTEXT_MAX_TOKENS, CONTEXT_DEDUP_THRESHOLD, CHUNK_OVERLAP, CHUNK_OVERLAP_TOKENS
+from app.utils.metrics import timed
+
+# Roughly one BPE token per short word or word piece, digit group and symbol
+_TOKEN_PATTERN = re.compile(r"[A-Za-z]{1,7}|\d{1,3}|[^\sA-Za-z\d]")
+_WORD_PATTERN = re.compile(r"\w+")
+_SPACES = re.compile(r"[ \t\r\f\v]+")
+_BLANK_LINES = re.compile(r"\n\s*\n\s*")
+
+MIN_OVERLAP_CHARS = 8  # Shorter suffix/prefix matches are coincidence, not chunk overlap
+MIN_TRUNCATED_TOKENS = 32  # Don't add a passage cut down to fewer tokens than this
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the LLM token count of ``text`` without a tokenizer model.
+    
+    Counts short words, 7-letter word pieces, digit groups and symbols,
+    which tracks BPE tokenizers closely on English prose and errs high on
+    long words and non-ASCII text, so budgets are rarely overrun.
+    Whitespace is never counted, so estimates of whitespace-separated
+    pieces add up.
+    """
+    return len(_TOKEN_PATTERN.findall(text))
+
+
+@timed("context")
+def build_context(
+    docs: List[Dict],
+    max_tokens: int = None,
+    dedup_threshold: float = None
+) -> Tuple[str, Dict]:
+    """
+    Assemble the prompt context from retrieved chunks.
+    
+    Hits that are consecutive chunks of the same file (by ``chunk_index``)
+    are merged into one passage with their shared overlap removed.
+    Passages mostly contained in a more relevant passage are dropped, and
+    passages are added in relevance order until ``max_tokens`` is reached;
+    the passage that crosses the budget is cut at a sentence boundary.
+    
+    Args:
+        docs: Retrieved documents (``text`` and ``metadata``), most relevant first
+        max_tokens: Context budget in estimated tokens (default from config, 0 = unlimited)
+        dedup_threshold: Fraction of a passage's word 3-grams found in a kept
+            passage above which it counts as a near-duplicate (default from config)
+    
+    Returns:
+        Tuple (context, stats); stats has chunk/passage counts and the
+        estimated tokens before (verbatim concatenation) and after assembly
+    """
+    if max_tokens is None:
+        max_tokens = CONTEXT_MAX_TOKENS
+    if dedup_threshold is None:
+        dedup_threshold = CONTEXT_DEDUP_THRESHOLD
+    
+    header_tokens = estimate_tokens(_section(1, ""))
+    doc_tokens = [estimate_tokens(doc["text"]) for doc in docs]
+    # What joining every chunk verbatim would have cost
+    tokens_before = sum(header_tokens + tokens for tokens in doc_tokens)
+    passages = _merge_adjacent(docs, doc_tokens)
+    merged = len(docs) - len(passages)
+    passages, duplicates = _drop_near_duplicates(passages, dedup_threshold)
+    
+    sections = []
+    used = 0
+    truncated = dropped = 0
+    for passage in passages:
+        cost = header_tokens + passage["tokens"]
+        if max_tokens > 0 and used + cost > max_tokens:
+            room = max_tokens - used - header_tokens
+            if room >= MIN_TRUNCATED_TOKENS or not sections:
+                text = _truncate(passage["text"], passage["tokens"], max(room, 1))
+                sections.append(_section(len(sections) + 1, text))
+                used += header_tokens + estimate_tokens(text)
+                truncated += 1
+            dropped = len(passages) - len(sections)
+            break
+        sections.append(_section(len(sections) + 1, passage["text"]))
+        used += cost
+    
+    context = "\n\n".join(sections)
+    tokens_after = used
+    return context, {
+        "chunks": len(docs),
+        "passages": len(sections),
+        "merged": merged,
+        "duplicates": duplicates,
+        "truncated": truncated,
+        "dropped": dropped,
+        "tokens_before": tokens_before,
+        "tokens_after": tokens_after,
+        "tokens_saved": max(tokens_before - tokens_after, 0)
+    }
+
+
+def _section(number: int, text: str) -> str:
+    return f"Document {number}:\n{text}"
+
+
+def _normalize(text: str) -> str:
+    """Collapse runs of spaces and blank lines left over from PDF extraction."""
+    return _BLANK_LINES.sub("\n\n", _SPACES.sub(" ", text)).strip()
+
+
+def _merge_adjacent(docs: List[Dict], doc_tokens: List[int]) -> List[Dict]:
+    """
+    Group consecutive chunks of the same file into passages.
+    
+    Each passage keeps the rank of its best chunk, so the passage list is
+    still ordered by relevance.
+    """
+    runs: Dict[str, List] = {}
+    passages = []
+    seen = set()
+    for rank, (doc, tokens) in enumerate(zip(docs, doc_tokens)):
+        metadata = doc.get("metadata") or {}
+        filename, index = metadata.get("filename"), metadata.get("chunk_index")
+        if filename is None or index is None:
+            passages.append({"rank": rank, "text": _normalize(doc["text"]), "tokens": tokens})
+            continue
+        if (filename, index) in seen:
+            continue  # Same chunk returned twice
+        seen.add((filename, index))
+        runs.setdefault(filename, []).append((int(index), rank, doc["text"], tokens))
+    
+    max_overlap = max(4 * CHUNK_OVERLAP, 16 * CHUNK_OVERLAP_TOKENS, 256)
+    for chunks in runs.values():
+        chunks.sort(key=lambda chunk: chunk[0])
+        current = None
+        for index, rank, text, tokens in chunks:
+            text = _normalize(text)
+            if current is not None and index == current["last_index"] + 1:
+                overlap = _overlap(current["text"], text, max_overlap)
+                if overlap:
+                    current["text"] += text[overlap:]
+                    current["tokens"] += tokens - estimate_tokens(text[:overlap])
+                else:
+                    current["text"] += "\n" + text
+                    current["tokens"] += tokens
+                current["rank"] = min(current["rank"], rank)
+                current["last_index"] = index
+                continue
+            current = {"rank": rank, "text": text, "tokens": tokens, "last_index": index}
+            passages.append(current)
+    
+    passages.sort(key=lambda passage: passage["rank"])
+    return passages
+
+
+def _overlap(head: str, tail: str, max_overlap: int) -> int:
+    """Length of the longest prefix of ``tail`` that repeats the end of ``head`` (0 if none)."""
+    probe = tail[:MIN_OVERLAP_CHARS]
+    if len(probe) < MIN_OVERLAP_CHARS:
+        return 0
+    # Earliest match in the window = longest overlap
+    position = head.find(probe, max(len(head) - min(len(tail), max_overlap), 0))
+    while position != -1:
+        if tail.startswith(head[position:]):
+            return len(head) - position
+        position = head.find(probe, position + 1)
+    return 0
+
+
+def _shingles(text: str) -> set:
+    words = _WORD_PATTERN.findall(text.lower())
+    if len(words) < 3:
+        return {tuple(words)}
+    return set(zip(words, words[1:], words[2:]))
+
+
+def _drop_near_duplicates(passages: List[Dict], threshold: float) -> Tuple[List[Dict], int]:
+    """
+    Remove passages whose word 3-grams are mostly found in a more relevant one.
+    
+    A more relevant passage that is itself mostly contained in a later,
+    larger passage is replaced by it (keeping its position).
+    """
+    kept, kept_shingles = [], []
+    duplicates = 0
+    for passage in passages:
+        shingles = _shingles(passage["text"])
+        duplicate = False
+        for i, other in enumerate(kept_shingles):
+            common = len(shingles & other)
+            if common >= threshold * len(shingles):
+                duplicate = True
+                break
+            if common >= threshold * len(other):
+                kept[i] = {**passage, "rank": kept[i]["rank"]}
+                kept_shingles[i] = shingles
+                duplicate = True
+                break
+        if duplicate:
+            duplicates += 1
+        else:
+            kept.append(passage)
+            kept_shingles.append(shingles)
+    return kept, duplicates
+
+
+def _truncate(text: str, tokens: int, max_tokens: int) -> str:
+    """Cut ``text`` (``tokens`` long) to about ``max_tokens``, preferably at a sentence end."""
+    if tokens <= max_tokens:
+        return text
+    cut = int(len(text) * max_tokens / tokens)
+    while cut > 0 and estimate_tokens(text[:cut]) > max_tokens:
+        cut = int(cut * 0.9)
+    head = text[:cut]
+    sentence_end = max(head.rfind(". "), head.rfind(".\n"))
+    if sentence_end > cut * 0.5:
+        return head[:sentence_end + 1]
+    return head.rstrip() + " ..."
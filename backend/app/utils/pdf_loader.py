@@ -1,36 +1,334 @@
-"""PDF loading utilities using PyPDF2."""
+"""PDF loading utilities with pluggable, parallel, streamed page extraction."""
+import importlib.util
+import multiprocessing
+import os
+import shutil
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from collections import deque
 from pathlib import Path
-from typing import List
-import PyPDF2
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
 from io import BytesIO
+from app.utils.config import PDF_BACKEND, PDF_EXTRACT_WORKERS, PDF_PAGES_PER_TASK, PDF_PARALLEL_MIN_PAGES
 
+PdfSource = Union[bytes, str, Path]
 
-def extract_text_from_pdf(pdf_bytes: bytes) -> str:
+
+class PdfBackend:
     """
-    Extract text from PDF bytes.
+    Text extraction backend wrapping one PDF library.
+    
+    Subclasses set ``name`` and ``module`` (the import checked by
+    ``available``) and implement ``open``, ``page_count`` and
+    ``page_text``; ``release`` (drop parsed objects of pages already
+    read) and ``close`` are optional. Backends are used from worker
+    processes, so they must be registered at import time of this module
+    or of one it imports.
+    """
+    name = ""
+    module = ""
+    
+    def available(self) -> bool:
+        return importlib.util.find_spec(self.module) is not None
+    
+    def open(self, source: PdfSource):
+        raise NotImplementedError
+    
+    def page_count(self, document) -> int:
+        raise NotImplementedError
+    
+    def page_text(self, document, index: int) -> str:
+        raise NotImplementedError
+    
+    def release(self, document):
+        pass
+    
+    def close(self, document):
+        pass
+
+
+class PyPDF2Backend(PdfBackend):
+    """Pure-Python PyPDF2 (always installed)."""
+    name = "pypdf2"
+    module = "PyPDF2"
+    
+    def open(self, source: PdfSource):
+        import PyPDF2
+        return PyPDF2.PdfReader(self._stream(source))
+    
+    def page_count(self, document) -> int:
+        return len(document.pages)
+    
+    def page_text(self, document, index: int) -> str:
+        return document.pages[index].extract_text() or ""
+    
+    def release(self, document):
+        # Parsed objects (content streams, fonts) are cached for the reader's lifetime
+        document.resolved_objects.clear()
+    
+    def close(self, document):
+        document.stream.close()
+    
+    @staticmethod
+    def _stream(source: PdfSource):
+        # Given a path, the reader would load the whole file into memory; a file handle is read on demand
+        return BytesIO(source) if isinstance(source, bytes) else open(source, "rb")
+
+
+class PypdfBackend(PyPDF2Backend):
+    """pypdf, the maintained successor of PyPDF2 (faster text extraction)."""
+    name = "pypdf"
+    module = "pypdf"
+    
+    def open(self, source: PdfSource):
+        import pypdf
+        return pypdf.PdfReader(self._stream(source))
+
+
+class PyMuPDFBackend(PdfBackend):
+    """PyMuPDF (MuPDF bindings, C parser; much faster)."""
+    name = "pymupdf"
+    module = "fitz"
+    
+    def open(self, source: PdfSource):
+        import fitz
+        if isinstance(source, bytes):
+            return fitz.open(stream=source, filetype="pdf")
+        return fitz.open(str(source))
+    
+    def page_count(self, document) -> int:
+        return document.page_count
+    
+    def page_text(self, document, index: int) -> str:
+        return document[index].get_text()
+    
+    def close(self, document):
+        document.close()
+
+
+# In order of preference for PDF_BACKEND=auto
+PDF_BACKENDS: Dict[str, PdfBackend] = {
+    backend.name: backend for backend in (PyMuPDFBackend(), PypdfBackend(), PyPDF2Backend())
+}
+
+
+def register_pdf_backend(backend: PdfBackend, preferred: bool = False):
+    """
+    Add an extraction backend.
     
     Args:
-        pdf_bytes: PDF file as bytes
-        
-    Returns:
-        Extracted text as a single string
+        backend: Backend instance; replaces a registered one with the same name
+        preferred: Try it first when the backend is ``auto``
+    """
+    global PDF_BACKENDS
+    others = {name: other for name, other in PDF_BACKENDS.items() if name != backend.name}
+    PDF_BACKENDS = {backend.name: backend, **others} if preferred else {**others, backend.name: backend}
+
+
+def available_pdf_backends() -> List[str]:
+    """Names of the registered backends whose library is installed, preferred first."""
+    return [name for name, backend in PDF_BACKENDS.items() if backend.available()]
+
+
+def get_pdf_backend(name: Optional[str] = None) -> PdfBackend:
     """
-    text_content = []
+    Resolve a backend by name; ``auto`` (the default) picks the first installed one.
     
+    Raises:
+        ValueError: If the backend is unknown or not installed
+    """
+    name = (name or PDF_BACKEND).lower()
+    if name == "auto":
+        available = available_pdf_backends()
+        if not available:
+            raise ValueError("No PDF backend installed. Install it with: pip install PyPDF2")
+        return PDF_BACKENDS[available[0]]
+    backend = PDF_BACKENDS.get(name)
+    if backend is None:
+        raise ValueError(f"Unknown PDF backend '{name}' (known: {', '.join(PDF_BACKENDS)})")
+    if not backend.available():
+        raise ValueError(f"PDF backend '{name}' is not installed (pip install {backend.module})")
+    return backend
+
+
+def pdf_page_count(source: PdfSource, backend: Optional[str] = None) -> int:
+    """Number of pages of a PDF (bytes or path)."""
+    backend = get_pdf_backend(backend)
     try:
-        pdf_file = BytesIO(pdf_bytes)
-        pdf_reader = PyPDF2.PdfReader(pdf_file)
-        
-        for page_num in range(len(pdf_reader.pages)):
-            page = pdf_reader.pages[page_num]
-            text = page.extract_text()
-            if text.strip():
-                text_content.append(text)
+        document = backend.open(Path(source) if isinstance(source, str) else source)
+    except Exception as e:
+        raise ValueError(f"Error reading PDF: {str(e)}")
+    try:
+        return backend.page_count(document)
+    finally:
+        backend.close(document)
+
+
+def iter_pages(
+    source: PdfSource,
+    backend: Optional[str] = None,
+    workers: Optional[int] = None
+) -> Iterator[Tuple[int, str]]:
+    """
+    Yield the text of each page in order, as soon as it is extracted.
+    
+    PDFs shorter than ``PDF_PARALLEL_MIN_PAGES`` pages (or ``workers=1``)
+    are extracted in-process. Longer ones are split into page ranges that
+    worker processes extract ahead of the consumer, at most two ranges per
+    worker, so memory stays bounded however long the PDF is. Pass a path
+    rather than bytes for large files: workers then open the file
+    themselves instead of receiving a copy of it with every page range.
+    
+    Args:
+        source: PDF file as bytes, or its path
+        backend: Backend name or ``auto`` (default from config)
+        workers: Worker processes (default from config; 0 = CPU count, max 8)
+    
+    Yields:
+        (page number starting at 1, text) for pages that have text
+    """
+    if isinstance(source, str):
+        source = Path(source)
+    backend = get_pdf_backend(backend)
+    workers = _worker_count(PDF_EXTRACT_WORKERS if workers is None else workers)
     
+    document = None
+    try:
+        document = backend.open(source)
+        count = backend.page_count(document)
+        if workers > 1 and count >= PDF_PARALLEL_MIN_PAGES:
+            texts = _iter_parallel(backend, document, source, count, workers)
+        else:
+            texts = _iter_serial(backend, document, 0, count)
+        for index, text in enumerate(texts):
+            if text.strip():
+                yield index + 1, text
     except Exception as e:
         raise ValueError(f"Error extracting text from PDF: {str(e)}")
+    finally:
+        if document is not None:
+            backend.close(document)
+
+
+def extract_pages(
+    source: PdfSource,
+    backend: Optional[str] = None,
+    workers: Optional[int] = None
+) -> List[Tuple[int, str]]:
+    """
+    Extract the text of every page (see ``iter_pages``).
+    
+    Returns:
+        List of (page number starting at 1, text) for pages that have text
+    """
+    return list(iter_pages(source, backend, workers))
+
+
+def extract_text_from_pdf(pdf_bytes: bytes) -> str:
+    """
+    Extract text from PDF bytes.
     
-    return "\n\n".join(text_content)
+    Args:
+        pdf_bytes: PDF file as bytes
+    
+    Returns:
+        Extracted text as a single string
+    """
+    return "\n\n".join(text for _, text in iter_pages(pdf_bytes))
+
+
+def _worker_count(workers: int) -> int:
+    if workers <= 0:
+        return min(os.cpu_count() or 1, 8)
+    return workers
+
+
+def _iter_serial(backend: PdfBackend, document, start: int, stop: int) -> Iterator[str]:
+    for index in range(start, stop):
+        yield backend.page_text(document, index)
+        if (index + 1) % PDF_PAGES_PER_TASK == 0:
+            backend.release(document)
+
+
+def _iter_parallel(backend: PdfBackend, document, source: PdfSource, count: int, workers: int) -> Iterator[str]:
+    # At least one range per worker, at most PDF_PAGES_PER_TASK pages each
+    size = max(1, min(PDF_PAGES_PER_TASK, -(-count // workers)))
+    ranges = [(start, min(start + size, count)) for start in range(0, count, size)]
+    pool = _get_process_pool(workers)
+    pending = deque()
+    submitted = 0
+    try:
+        while pending or submitted < len(ranges):
+            while submitted < len(ranges) and len(pending) < 2 * workers:
+                start, stop = ranges[submitted]
+                pending.append((start, pool.submit(_extract_range, backend.name, source, start, stop)))
+                submitted += 1
+            start, future = pending.popleft()
+            try:
+                texts = future.result()
+            except BrokenProcessPool:
+                # A worker died (e.g. killed for memory): drop the pool and finish in-process
+                shutdown_pdf_workers()
+                yield from _iter_serial(backend, document, start, count)
+                return
+            yield from texts
+    finally:
+        # Consumer stopped early or failed: don't leave ranges queued
+        for _, future in pending:
+            future.cancel()
+
+
+# Last document opened by this worker process; consecutive ranges of one file reuse it
+_open_document = (None, None)
+
+def _extract_range(backend_name: str, source: PdfSource, start: int, stop: int) -> List[str]:
+    """Worker-process task: text of pages ``start``..``stop - 1``."""
+    global _open_document
+    backend = PDF_BACKENDS[backend_name]
+    key = None
+    if isinstance(source, Path):
+        stat = source.stat()
+        key = (backend_name, str(source), stat.st_mtime_ns, stat.st_size)
+    if key is not None and _open_document[0] == key:
+        document = _open_document[1]
+    else:
+        if _open_document[1] is not None:
+            PDF_BACKENDS[_open_document[0][0]].close(_open_document[1])
+        document = backend.open(source)
+        _open_document = (key, document) if key is not None else (None, None)
+    try:
+        return [backend.page_text(document, index) for index in range(start, stop)]
+    finally:
+        if key is None:
+            backend.close(document)
+        else:
+            backend.release(document)
+
+
+# Global process pool (spawned: forking a threaded server is unsafe)
+_process_pool = None
+_process_pool_workers = 0
+_process_pool_lock = threading.Lock()
+
+def _get_process_pool(workers: int) -> ProcessPoolExecutor:
+    global _process_pool, _process_pool_workers
+    with _process_pool_lock:
+        if _process_pool is None or _process_pool_workers != workers:
+            if _process_pool is not None:
+                _process_pool.shutdown(wait=False)
+            _process_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _process_pool_workers = workers
+        return _process_pool
+
+
+def shutdown_pdf_workers():
+    """Stop the extraction worker processes (they are restarted on demand)."""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False, cancel_futures=True)
+            _process_pool = None
 
 
 def save_pdf_to_disk(pdf_bytes: bytes, filename: str, save_dir: Path) -> Path:
@@ -41,7 +339,7 @@ def save_pdf_to_disk(pdf_bytes: bytes, filename: str, save_dir: Path) -> Path:
         pdf_bytes: PDF file as bytes
         filename: Original filename
         save_dir: Directory to save the PDF
-        
+    
     Returns:
         Path to saved file
     """
@@ -53,3 +351,33 @@ def save_pdf_to_disk(pdf_bytes: bytes, filename: str, save_dir: Path) -> Path:
     
     return file_path
 
+
+def save_pdf_stream_to_disk(stream: BinaryIO, filename: str, save_dir: Path, block_size: int = 1 << 20) -> Path:
+    """
+    Copy an uploaded file to disk block by block, without reading it into memory.
+    
+    The data is written to a temporary file that is renamed into place,
+    so a half-written upload never replaces an existing file.
+    
+    Args:
+        stream: Readable binary file object (e.g. ``UploadFile.file``)
+        filename: Original filename
+        save_dir: Directory to save the PDF
+        block_size: Bytes copied per read
+    
+    Returns:
+        Path to saved file
+    """
+    save_dir.mkdir(parents=True, exist_ok=True)
+    file_path = save_dir / filename
+    partial = save_dir / f".{filename}.{os.getpid()}.{threading.get_ident()}.part"
+    
+    try:
+        with open(partial, "wb") as f:
+            shutil.copyfileobj(stream, f, block_size)
+        os.replace(partial, file_path)
+    except BaseException:
+        partial.unlink(missing_ok=True)
+        raise
+    
+    return file_path
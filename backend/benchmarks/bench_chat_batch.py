@@ -0,0 +1,92 @@
+"""Wall-clock time of a question set: one /api/chat request at a time vs. /api/chat/batch.
+
+Serves the real FastAPI app with uvicorn against the local fake
+OpenAI-compatible server from ``bench_stream_ttfb.py`` (fixed generation
+latency, retrieval stubbed out), then answers the same question set the
+way nightly evaluation runs did - sequential ``/api/chat`` requests - and
+with one streamed ``/api/chat/batch`` request.
+
+Requires the ``openai`` package (used by the app's OpenAI provider).
+
+Usage (from the backend directory):
+    python benchmarks/bench_chat_batch.py --questions 100 --latency-ms 200
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from bench_stream_ttfb import StubVectorStore, start_fake_llm, free_port
+
+
+def start_app():
+    import uvicorn
+    import app.routes.chat as chat_routes
+    import app.services.batch as batch
+    from app.main import app
+    
+    chat_routes.get_vector_store = batch.get_vector_store = lambda tenant=None: StubVectorStore()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=free_port(), log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{server.config.port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=200, help="Fake LLM time per completion")
+    parser.add_argument("--concurrency", type=int, default=16, help="Batch generations in flight")
+    args = parser.parse_args()
+    
+    fake_llm, _ = start_fake_llm(tokens=1, first_token_ms=args.latency_ms, token_ms=0)
+    os.environ.update({
+        "LLM_PROVIDER": "openai",
+        "USE_GEMINI": "false",
+        "OPENAI_API_KEY": "fake-key",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{fake_llm.server_port}/v1",
+        "ANSWER_CACHE_MAX_ENTRIES": "0",
+    })
+    base_url = start_app()
+    questions = [f"Question number {i}?" for i in range(args.questions)]
+    
+    import httpx
+    with httpx.Client(timeout=None) as client:
+        print(f"{args.questions} questions, {args.latency_ms:.0f} ms per completion\n")
+        print(f"{'mode':>30} {'wall s':>8} {'q/s':>8} {'first result s':>15}")
+        
+        start = time.perf_counter()
+        for question in questions:
+            client.post(f"{base_url}/api/chat", json={"question": question}).raise_for_status()
+        wall = time.perf_counter() - start
+        print(f"{'sequential /api/chat':>30} {wall:>8.2f} {args.questions / wall:>8.1f} {wall / args.questions:>15.2f}")
+        
+        start = time.perf_counter()
+        first = None
+        indexes = []
+        payload = {"questions": questions, "concurrency": args.concurrency}
+        with client.stream("POST", f"{base_url}/api/chat/batch", json=payload) as response:
+            for line in response.iter_lines():
+                if first is None:
+                    first = time.perf_counter() - start
+                result = json.loads(line)
+                if "error" in result:
+                    raise RuntimeError(result["error"])
+                indexes.append(result["index"])
+        wall = time.perf_counter() - start
+        label = f"/api/chat/batch (x{args.concurrency})"
+        print(f"{label:>30} {wall:>8.2f} {args.questions / wall:>8.1f} {first:>15.2f}")
+        print(f"\nbatch results in input order: {indexes == list(range(args.questions))}")
+    
+    fake_llm.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Concurrent /api/chat requests served by a single uvicorn worker.
+
+Fires N simultaneous chat requests at one uvicorn worker backed by the
+local fake OpenAI-compatible server from ``bench_stream_ttfb.py`` (fixed
+generation latency, retrieval stubbed out). Compares the async pooled
+provider clients with the previous behaviour - a synchronous provider
+call inside the ``async`` handler, which blocks the event loop - mounted
+on a benchmark-only route.
+
+Requires the ``openai`` package (used by the app's OpenAI provider).
+
+Usage (from the backend directory):
+    python benchmarks/bench_chat_concurrency.py --requests 100 --latency-ms 300
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from bench_stream_ttfb import StubVectorStore, start_fake_llm, free_port
+
+
+def start_app():
+    import threading
+    import uvicorn
+    import app.routes.chat as chat_routes
+    from app.main import app
+    from app.models.schemas import ChatRequest
+    from app.services.generator import get_response_generator
+    
+    chat_routes.get_vector_store = lambda tenant=None: StubVectorStore()
+    
+    @app.post("/bench/chat-blocking")
+    async def chat_blocking(request: ChatRequest):
+        # Previous behaviour: synchronous provider call on the event loop
+        docs = StubVectorStore().search(request.question)
+        return {"answer": get_response_generator().generate_response(request.question, docs)}
+    
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=free_port(), log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{server.config.port}"
+
+
+async def post_json(host: str, port: int, path: str, payload: dict) -> int:
+    """Minimal HTTP/1.1 POST; avoids measuring a client-side connection pool."""
+    body = json.dumps(payload).encode()
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(
+        f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+    )
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return int(response.split(b" ", 2)[1])
+
+
+async def fire(base_url: str, path: str, count: int):
+    host, port = base_url.split("//")[1].split(":")
+    
+    async def one(i):
+        start = time.perf_counter()
+        status = await post_json(host, int(port), path, {"question": f"Question {i}?"})
+        if status != 200:
+            raise RuntimeError(f"{path} returned HTTP {status}")
+        return time.perf_counter() - start
+    
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(one(i) for i in range(count)))
+    return time.perf_counter() - start, sorted(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=300, help="Fake LLM time per completion")
+    parser.add_argument("--max-concurrency", type=int, default=None, help="Override LLM_MAX_CONCURRENCY")
+    args = parser.parse_args()
+    
+    fake_llm, _ = start_fake_llm(tokens=1, first_token_ms=args.latency_ms, token_ms=0)
+    os.environ.update({
+        "LLM_PROVIDER": "openai",
+        "USE_GEMINI": "false",
+        "OPENAI_API_KEY": "fake-key",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{fake_llm.server_port}/v1",
+        "ANSWER_CACHE_MAX_ENTRIES": "0",
+    })
+    if args.max_concurrency:
+        os.environ["LLM_MAX_CONCURRENCY"] = str(args.max_concurrency)
+    from app.utils.config import LLM_MAX_CONCURRENCY
+    base_url = start_app()
+    
+    print(f"{args.requests} concurrent requests, {args.latency_ms:.0f} ms per completion, "
+          f"LLM_MAX_CONCURRENCY={LLM_MAX_CONCURRENCY}\n")
+    print(f"{'handler':>22} {'wall s':>8} {'req/s':>8} {'p50 s':>7} {'p99 s':>7}")
+    for name, path in (("async clients", "/api/chat"), ("blocking (previous)", "/bench/chat-blocking")):
+        wall, latencies = asyncio.run(fire(base_url, path, args.requests))
+        p50 = latencies[len(latencies) // 2]
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        print(f"{name:>22} {wall:>8.2f} {args.requests / wall:>8.1f} {p50:>7.2f} {p99:>7.2f}")
+    
+    fake_llm.shutdown()
+
+
+if __name__ == "__main__":
+    main()
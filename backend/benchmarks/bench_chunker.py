@@ -0,0 +1,103 @@
+"""Chunker throughput and chunk sizes: character-based chunk_text vs. token-based iter_chunks.
+
+Generates synthetic multi-page text (paragraphs of ``bench_pdf_extraction``
+sentences) of growing sizes and chunks it with
+
+* ``chunk_text``: fixed character windows (``CHUNK_SIZE`` /
+  ``CHUNK_OVERLAP``), cut back to a paragraph or sentence end;
+* ``iter_chunks``: the ingestion chunker - units at paragraph / sentence /
+  line boundaries, packed up to ``CHUNK_TOKENS`` tokens of the
+  embedding model's tokenizer, with page numbers and character offsets.
+
+Throughput is MB of text per second. For both chunkers the chunks are
+then measured with the same tokenizer: how many exceed the model's input
+limit (those would be silently truncated when embedded) and the share of
+tokens that would be lost. ``--tokenizer`` loads a Hugging Face tokenizer
+(requires ``transformers``); by default the ``estimate_tokens`` estimate
+is used.
+
+Usage (from the backend directory):
+    python benchmarks/bench_chunker.py --megabytes 1 4 16
+    python benchmarks/bench_chunker.py --tokenizer sentence-transformers/all-MiniLM-L6-v2 --limit 254
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from bench_pdf_extraction import synthetic_pages
+from app.utils.chunker import chunk_text, iter_chunks, estimate_token_counts
+from app.utils.config import CHUNK_SIZE, CHUNK_OVERLAP, CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS
+
+
+def synthetic_document(rng, megabytes: float, sentences: int):
+    """Pages of ``sentences`` sentences in paragraphs of five, up to ``megabytes`` of text."""
+    pages = []
+    size = 0
+    while size < megabytes * 1e6:
+        paragraphs = synthetic_pages(rng, -(-sentences // 5), 5)
+        pages.append((len(pages) + 1, "\n\n".join(paragraphs)))
+        size += len(pages[-1][1]) + 2
+    return pages
+
+
+def truncation(chunks, count_tokens, limit: int):
+    """Chunks over ``limit`` tokens and the share of all tokens beyond it."""
+    counts = count_tokens(chunks)
+    over = sum(1 for count in counts if count > limit)
+    lost = sum(max(0, count - limit) for count in counts)
+    return over, lost / max(1, sum(counts)), max(counts, default=0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--megabytes", type=float, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--sentences", type=int, default=30, help="Sentences per page")
+    parser.add_argument("--tokenizer", help="Hugging Face tokenizer name (default: estimate_tokens)")
+    parser.add_argument("--limit", type=int, default=CHUNK_TOKENS,
+                        help="Model input limit in tokens, also the iter_chunks chunk size")
+    parser.add_argument("--repeats", type=int, default=3, help="Best of this many runs")
+    args = parser.parse_args()
+    
+    count_tokens = estimate_token_counts
+    if args.tokenizer:
+        from transformers import AutoTokenizer
+        tokenizer = AutoTokenizer.from_pretrained(args.tokenizer)
+        count_tokens = lambda texts: [
+            len(ids) for ids in tokenizer(texts, add_special_tokens=False, verbose=False)["input_ids"]
+        ]
+    
+    print(f"chunk_text: {CHUNK_SIZE} chars, {CHUNK_OVERLAP} overlap; iter_chunks: {args.limit} tokens, "
+          f"{CHUNK_OVERLAP_TOKENS} overlap; tokenizer: {args.tokenizer or 'estimate_tokens'}\n")
+    print(f"{'MB':>6} {'chunker':>12} {'chunks':>8} {'MB/s':>7} {'max tok':>8} {'over limit':>11} {'tokens lost':>12}")
+    
+    rng = np.random.default_rng(0)
+    for megabytes in args.megabytes:
+        pages = synthetic_document(rng, megabytes, args.sentences)
+        text = "\n\n".join(page for _, page in pages)
+        size = len(text) / 1e6
+        
+        runs = {
+            "chunk_text": lambda: chunk_text(text),
+            "iter_chunks": lambda: [
+                chunk["text"] for chunk in iter_chunks(pages, args.limit, CHUNK_OVERLAP_TOKENS, count_tokens)
+            ],
+        }
+        for name, run in runs.items():
+            best = float("inf")
+            for _ in range(args.repeats):
+                start = time.perf_counter()
+                chunks = run()
+                best = min(best, time.perf_counter() - start)
+            over, lost, longest = truncation(chunks, count_tokens, args.limit)
+            print(f"{size:>6.1f} {name:>12} {len(chunks):>8} {size / best:>7.1f} {longest:>8} "
+                  f"{over:>11} {lost:>11.1%}")
+
+
+if __name__ == "__main__":
+    main()
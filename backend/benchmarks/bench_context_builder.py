@@ -0,0 +1,101 @@
+"""Prompt tokens saved by the context builder vs. verbatim chunk concatenation.
+
+Generates synthetic documents, splits them with the app's ``chunk_text``
+(default 1000-char chunks, 200-char overlap) and indexes them in a BM25
+index. Part of the documents is uploaded twice under another filename, as
+happens with re-uploads. Each query is a handful of words from a sentence,
+retrieved with BM25; the top-k hits are assembled verbatim (the previous
+behaviour) and with ``build_context``.
+
+Usage (from the backend directory):
+    python benchmarks/bench_context_builder.py --documents 50 --top-k 5
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.bm25_index import BM25Index
+from app.utils.chunker import chunk_text
+from app.utils.context_builder import build_context
+
+
+def synthetic_document(rng, words, weights, sentences: int) -> str:
+    paragraphs = []
+    for _ in range(sentences // 6):
+        paragraph = []
+        for _ in range(6):
+            body = rng.choice(words, size=int(rng.integers(8, 20)), p=weights)
+            paragraph.append(" ".join(body).capitalize() + ".")
+        paragraphs.append(" ".join(paragraph))
+    return "\n\n".join(paragraphs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, default=50)
+    parser.add_argument("--sentences", type=int, default=300, help="Sentences per document")
+    parser.add_argument("--duplicate-share", type=float, default=0.2, help="Share of documents uploaded twice")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--max-tokens", type=int, default=None, help="Context budget (default CONTEXT_MAX_TOKENS)")
+    args = parser.parse_args()
+    
+    rng = np.random.default_rng(0)
+    words = np.array([f"w{i}" for i in range(3000)])
+    weights = 1.0 / np.arange(1, len(words) + 1)
+    weights /= weights.sum()
+    
+    chunks = {}
+    for d in range(args.documents):
+        text = synthetic_document(rng, words, weights, args.sentences)
+        filenames = [f"doc{d}.pdf"]
+        if rng.random() < args.duplicate_share:
+            filenames.append(f"doc{d} (copy).pdf")
+        for filename in filenames:
+            for index, chunk in enumerate(chunk_text(text)):
+                chunks[f"{filename}#{index}"] = {
+                    "text": chunk, "metadata": {"filename": filename, "chunk_index": index}
+                }
+    
+    with tempfile.TemporaryDirectory() as directory:
+        index = BM25Index(Path(directory) / "bm25.sqlite3")
+        ids = list(chunks)
+        index.add(ids, [chunks[i]["text"] for i in ids], [chunks[i]["metadata"]["filename"] for i in ids])
+        print(f"{args.documents} documents, {len(chunks)} chunks indexed, top_k={args.top_k}\n")
+        
+        before, after, merged, duplicates, truncated, timings = [], [], 0, 0, 0, []
+        for _ in range(args.queries):
+            sentences = chunks[ids[int(rng.integers(len(ids)))]]["text"].split(". ")
+            sentence = sentences[int(rng.integers(len(sentences)))].split()
+            query = " ".join(rng.choice(sentence, min(5, len(sentence)), replace=False))
+            docs = [chunks[doc_id] for doc_id, _ in index.search(query, args.top_k)]
+            if not docs:
+                continue
+            start = time.perf_counter()
+            _, stats = build_context(docs, max_tokens=args.max_tokens)
+            timings.append((time.perf_counter() - start) * 1000)
+            before.append(stats["tokens_before"])
+            after.append(stats["tokens_after"])
+            merged += stats["merged"]
+            duplicates += stats["duplicates"]
+            truncated += stats["truncated"]
+    
+    before, after = np.array(before), np.array(after)
+    saved = before - after
+    print(f"{'':>24} {'mean':>8} {'p50':>8} {'p95':>8}")
+    for name, values in (("tokens verbatim", before), ("tokens assembled", after), ("tokens saved", saved)):
+        print(f"{name:>24} {values.mean():>8.0f} {np.percentile(values, 50):>8.0f} {np.percentile(values, 95):>8.0f}")
+    print(f"\nsaved {saved.sum() / before.sum():.1%} of context tokens over {len(before)} requests; "
+          f"{merged} chunks merged, {duplicates} duplicates dropped, {truncated} passages truncated")
+    print(f"build_context p50 {np.percentile(timings, 50):.2f} ms, p95 {np.percentile(timings, 95):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Recall vs. latency of the FAISS ANN index types against the flat baseline.
+
+Builds a ``FaissSegmentStore`` per index type on the same synthetic,
+clustered corpus, forces training through ``compact()``, then searches
+with a range of ``nprobe`` / ``efSearch`` values. Recall@k is measured
+against the exact (flat) results.
+
+Usage (from the backend directory):
+    python benchmarks/bench_faiss_ann.py --vectors 100000 --dimension 384
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.faiss_store import FaissSegmentStore
+
+
+def synthetic_corpus(n: int, dimension: int, clusters: int, rng) -> np.ndarray:
+    """Unit vectors drawn around random centroids, like topical document chunks."""
+    centroids = rng.standard_normal((clusters, dimension), dtype=np.float32)
+    assignments = rng.integers(0, clusters, size=n)
+    vectors = centroids[assignments] + 0.6 * rng.standard_normal((n, dimension), dtype=np.float32)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def build_store(directory: Path, vectors: np.ndarray, index_type: str) -> FaissSegmentStore:
+    store = FaissSegmentStore(
+        directory, vectors.shape[1], faiss, index_type=index_type, min_train_vectors=len(vectors)
+    )
+    # Append in upload-sized batches; training kicks in once the last batch lands
+    for start in range(0, len(vectors), 5000):
+        batch = vectors[start:start + 5000]
+        store.append(batch, [{} for _ in range(len(batch))])
+    store.wait_for_compaction()
+    store.compact()
+    return store
+
+
+def run_queries(store: FaissSegmentStore, queries: np.ndarray, top_k: int, **params):
+    start = time.perf_counter()
+    ids = []
+    for query in queries:
+        hits = store.search(query[np.newaxis, :], top_k, **params)[0]
+        ids.append([row_id for _, row_id, _ in hits])
+    elapsed = time.perf_counter() - start
+    return ids, elapsed / len(queries) * 1000
+
+
+def recall(found, truth, top_k: int) -> float:
+    return float(np.mean([len(set(f) & set(t)) / top_k for f, t in zip(found, truth)]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vectors", type=int, default=100000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+    
+    rng = np.random.default_rng(0)
+    vectors = synthetic_corpus(args.vectors, args.dimension, clusters=256, rng=rng)
+    queries = vectors[rng.choice(len(vectors), args.queries, replace=False)]
+    queries = queries + 0.1 * rng.standard_normal(queries.shape, dtype=np.float32)
+    faiss.normalize_L2(queries)
+    
+    sweeps = {
+        "flat": [{}],
+        "ivf_flat": [{"nprobe": n} for n in (1, 4, 16, 64)],
+        "ivf_pq": [{"nprobe": n} for n in (1, 4, 16, 64)],
+        "hnsw": [{"ef_search": e} for e in (16, 32, 64, 128)],
+    }
+    
+    truth = None
+    print(f"{'index':>9} {'param':>14} {'build s':>8} {'ms/query':>9} {f'recall@{args.top_k}':>10}")
+    for index_type, settings in sweeps.items():
+        with tempfile.TemporaryDirectory() as directory:
+            start = time.perf_counter()
+            store = build_store(Path(directory), vectors, index_type)
+            build = time.perf_counter() - start
+            for params in settings:
+                found, latency = run_queries(store, queries, args.top_k, **params)
+                if truth is None:
+                    truth = found
+                label = ",".join(f"{k}={v}" for k, v in params.items()) or "exact"
+                print(
+                    f"{index_type:>9} {label:>14} {build:>8.2f} {latency:>9.3f} "
+                    f"{recall(found, truth, args.top_k):>10.3f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
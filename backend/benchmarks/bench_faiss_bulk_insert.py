@@ -0,0 +1,76 @@
+"""Microbenchmark of FAISS bulk insert: per-row loop vs. one contiguous matrix.
+
+The "loop" variant reproduces the old ``add_documents`` behaviour: the
+embedding output is converted to Python lists, and every chunk gets its own
+one-row array, normalization call and ``index.add``. The "bulk" variant
+normalizes the float32 matrix produced by ``EmbeddingService`` in place and
+adds it with a single call. The "segment" column adds the cost of writing
+the result as an append-only segment (``FaissSegmentStore.append``).
+
+Usage (from the backend directory):
+    python benchmarks/bench_faiss_bulk_insert.py --sizes 1000,10000,100000
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.faiss_store import FaissSegmentStore
+
+
+def insert_loop(embeddings: np.ndarray, dimension: int) -> float:
+    index = faiss.IndexFlatIP(dimension)
+    start = time.perf_counter()
+    as_lists = embeddings.tolist()
+    for embedding in as_lists:
+        embedding_array = np.array([embedding], dtype=np.float32)
+        faiss.normalize_L2(embedding_array)
+        index.add(embedding_array)
+    return time.perf_counter() - start
+
+
+def insert_bulk(embeddings: np.ndarray, dimension: int) -> float:
+    index = faiss.IndexFlatIP(dimension)
+    matrix = embeddings.copy()
+    start = time.perf_counter()
+    faiss.normalize_L2(matrix)
+    index.add(matrix)
+    return time.perf_counter() - start
+
+
+def insert_segment(embeddings: np.ndarray, dimension: int) -> float:
+    matrix = embeddings.copy()
+    metadatas = [{"chunk_index": i} for i in range(len(matrix))]
+    with tempfile.TemporaryDirectory() as directory:
+        store = FaissSegmentStore(Path(directory), dimension, faiss)
+        start = time.perf_counter()
+        faiss.normalize_L2(matrix)
+        store.append(matrix, metadatas)
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--dimension", type=int, default=384)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'chunks':>8} {'loop s':>9} {'bulk s':>9} {'segment s':>10} {'speedup':>8}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        embeddings = rng.standard_normal((size, args.dimension), dtype=np.float32)
+        loop = insert_loop(embeddings, args.dimension)
+        bulk = insert_bulk(embeddings, args.dimension)
+        segment = insert_segment(embeddings, args.dimension)
+        print(f"{size:>8} {loop:>9.3f} {bulk:>9.3f} {segment:>10.3f} {loop / bulk:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Filtered FAISS search: filters pushed into the index vs. over-fetching and post-filtering.
+
+Builds a ``FaissSegmentStore`` on a synthetic clustered corpus whose
+chunks belong to documents of ``--chunks-per-doc`` chunks, with pages,
+upload times and tags in the SQLite metadata. Filters of decreasing
+selectivity (a share of the documents, plus a page range and a tag) are
+then searched with
+
+* ``post-filter xN``: an unfiltered search for ``N * top_k`` hits whose
+  metadata is checked afterwards (``SearchFilter.matches``), keeping the
+  first ``top_k`` that match;
+* ``selector``: ``ChunkMetadataStore.matching`` resolves the filter to row
+  ids, which restrict the FAISS search through an ``IDSelectorBatch``;
+* ``subset``: the same row ids, but only their vectors are scored exactly
+  (what ``FaissSegmentStore.search`` does up to ``subset_search_max`` ids).
+
+Latency includes resolving the filter and reading the hits' metadata.
+Recall@k is measured against an exact search over the matching chunks, and
+"short" counts queries that got fewer than ``top_k`` results although
+enough chunks matched.
+
+Usage (from the backend directory):
+    python benchmarks/bench_filtered_search.py --vectors 100000 --dimension 384
+    python benchmarks/bench_filtered_search.py --index-type hnsw
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from bench_faiss_ann import synthetic_corpus
+from app.services.faiss_store import FaissSegmentStore
+from app.services.search_filter import SearchFilter
+
+
+def build_store(directory: Path, vectors: np.ndarray, index_type: str, chunks_per_doc: int, rng) -> FaissSegmentStore:
+    store = FaissSegmentStore(
+        directory, vectors.shape[1], faiss, index_type=index_type, min_train_vectors=len(vectors)
+    )
+    tags = np.array(["legal", "finance", "hr", "tech"])
+    for start in range(0, len(vectors), 5000):
+        batch = vectors[start:start + 5000]
+        metadatas = []
+        for i in range(start, start + len(batch)):
+            doc = i // chunks_per_doc
+            page = (i % chunks_per_doc) // 2 + 1
+            metadatas.append({
+                "id": f"chunk-{i}", "text": "", "filename": f"doc-{doc}.pdf", "chunk_index": i % chunks_per_doc,
+                "page": page, "page_end": page, "uploaded_at": float(doc),
+                "tags": ",".join(tags[rng.random(len(tags)) < 0.5])
+            })
+        store.append(batch, metadatas)
+    store.wait_for_compaction()
+    store.compact()
+    return store
+
+
+def exact_filtered(vectors: np.ndarray, queries: np.ndarray, row_ids: np.ndarray, top_k: int):
+    scores = queries @ vectors[row_ids].T
+    return [list(row_ids[np.argsort(-row)[:top_k]]) for row in scores]
+
+
+def run(search, queries: np.ndarray):
+    start = time.perf_counter()
+    found = [search(query[np.newaxis, :]) for query in queries]
+    return found, (time.perf_counter() - start) / len(queries) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vectors", type=int, default=100000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--chunks-per-doc", type=int, default=100)
+    parser.add_argument("--index-type", default="flat", choices=["flat", "ivf_flat", "ivf_pq", "hnsw"])
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--overfetch", type=int, nargs="+", default=[4, 20], help="Post-filter fetch multipliers")
+    args = parser.parse_args()
+    
+    rng = np.random.default_rng(0)
+    vectors = synthetic_corpus(args.vectors, args.dimension, clusters=256, rng=rng)
+    queries = vectors[rng.choice(len(vectors), args.queries, replace=False)]
+    queries = queries + 0.1 * rng.standard_normal(queries.shape, dtype=np.float32)
+    faiss.normalize_L2(queries)
+    documents = -(-args.vectors // args.chunks_per_doc)
+    
+    # Documents uploaded last: the share of the corpus named in the label, further narrowed below
+    filters = [
+        ("50% docs", SearchFilter(uploaded_after=float(documents // 2))),
+        ("10% docs", SearchFilter(uploaded_after=float(documents - documents // 10))),
+        ("1% docs", SearchFilter(uploaded_after=float(documents - max(1, documents // 100)))),
+        ("1% docs, p1-10, tag", SearchFilter(uploaded_after=float(documents - max(1, documents // 100)),
+                                             page_from=1, page_to=10, tags=["legal"])),
+        ("1 doc", SearchFilter(filenames=[f"doc-{documents // 3}.pdf"])),
+    ]
+    
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        store = build_store(Path(directory), vectors, args.index_type, args.chunks_per_doc, rng)
+        print(f"{args.vectors} vectors, {documents} documents, {args.index_type}, "
+              f"built in {time.perf_counter() - start:.1f}s\n")
+        print(f"{'filter':>20} {'matching':>9} {'method':>15} {'ms/query':>9} "
+              f"{f'recall@{args.top_k}':>10} {'short':>6}")
+        subset_search_max = store.subset_search_max
+        
+        for label, search_filter in filters:
+            row_ids, _ = store.metadata.matching(search_filter)
+            truth = exact_filtered(vectors, queries, row_ids, args.top_k)
+            wanted = min(args.top_k, len(row_ids))
+            
+            def post_filter(query, factor):
+                hits = store.search(query, args.top_k * factor)[0]
+                return [row_id for _, row_id, metadata in hits if search_filter.matches(metadata)][:args.top_k]
+            
+            def pushdown(query, limit):
+                store.subset_search_max = limit
+                ids, _ = store.metadata.matching(search_filter)
+                return [row_id for _, row_id, _ in store.search(query, args.top_k, id_filter=ids)[0]]
+            
+            methods = [(f"post-filter x{factor}", lambda q, f=factor: post_filter(q, f)) for factor in args.overfetch]
+            methods.append(("selector", lambda q: pushdown(q, 0)))
+            methods.append(("subset", lambda q: pushdown(q, len(row_ids))))
+            for name, search in methods:
+                found, latency = run(search, queries)
+                recall = np.mean([len(set(f) & set(t)) / max(1, wanted) for f, t in zip(found, truth)])
+                short = sum(len(f) < wanted for f in found)
+                print(f"{label:>20} {len(row_ids):>9} {name:>15} {latency:>9.3f} {recall:>10.3f} {short:>6}")
+        store.subset_search_max = subset_search_max
+
+
+if __name__ == "__main__":
+    main()
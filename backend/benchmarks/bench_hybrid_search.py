@@ -0,0 +1,153 @@
+"""Recall and latency of dense, BM25 and hybrid (RRF) retrieval.
+
+Builds a synthetic corpus of topical chunks, each carrying a unique
+part-number-style code (``PN-483920``). Dense vectors are a bag of word
+vectors in which codes are spelled out character by character, so - like
+real sentence encoders - near-identical codes land close together. Two
+query sets are measured: "code" queries that name a chunk's code plus a
+couple of its words, and "topic" queries that paraphrase its content.
+
+Usage (from the backend directory):
+    python benchmarks/bench_hybrid_search.py --chunks 20000
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.bm25_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+
+class HashedEncoder:
+    """Deterministic stand-in for an embedding model."""
+    
+    def __init__(self, dimension: int, seed: int = 0):
+        self.dimension = dimension
+        self.seed = seed
+        self._vectors = {}
+    
+    def _word(self, word: str) -> np.ndarray:
+        vector = self._vectors.get(word)
+        if vector is None:
+            rng = np.random.default_rng([self.seed, *word.encode("utf-8")])
+            vector = rng.standard_normal(self.dimension).astype(np.float32)
+            self._vectors[word] = vector
+        return vector
+    
+    def encode(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for token in text.lower().split():
+            if token.startswith("pn-"):
+                # Codes are seen as sub-word pieces, not as one distinctive unit
+                for piece in ["pn", *token[3:]]:
+                    vector += self._word(piece)
+            else:
+                vector += self._word(token)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+
+def synthetic_corpus(n: int, vocabulary: int, rng):
+    words = [f"w{i}" for i in range(vocabulary)]
+    # Zipf-like word frequencies, as in natural text
+    weights = 1.0 / np.arange(1, vocabulary + 1)
+    weights /= weights.sum()
+    codes = rng.choice(900000, n, replace=False) + 100000
+    texts = []
+    for code in codes:
+        body = rng.choice(words, size=int(rng.integers(40, 80)), p=weights)
+        position = int(rng.integers(0, len(body)))
+        texts.append(" ".join([*body[:position], f"PN-{code}", *body[position:]]))
+    return texts, [f"PN-{code}" for code in codes]
+
+
+def make_queries(texts, codes, count: int, rng):
+    picks = rng.choice(len(texts), count, replace=False)
+    code_queries, topic_queries = [], []
+    for i in picks:
+        words = [w for w in texts[i].split() if not w.startswith("PN-")]
+        context = rng.choice(words, 2, replace=False)
+        code_queries.append((f"spec for {codes[i]} {' '.join(context)}", int(i)))
+        topic_queries.append((" ".join(rng.choice(words, 12, replace=False)), int(i)))
+    return code_queries, topic_queries
+
+
+def evaluate(queries, search, top_k: int):
+    hits, latencies = 0, []
+    for query, expected in queries:
+        start = time.perf_counter()
+        found = search(query, top_k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += expected in found
+    return hits / len(queries), float(np.percentile(latencies, 50)), float(np.percentile(latencies, 95))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--vocabulary", type=int, default=5000)
+    parser.add_argument("--dimension", type=int, default=128)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--candidates", type=int, default=4, help="Candidates per retriever = top_k * this")
+    args = parser.parse_args()
+    
+    rng = np.random.default_rng(0)
+    texts, codes = synthetic_corpus(args.chunks, args.vocabulary, rng)
+    code_queries, topic_queries = make_queries(texts, codes, args.queries, rng)
+    encoder = HashedEncoder(args.dimension)
+    
+    start = time.perf_counter()
+    matrix = np.stack([encoder.encode(text) for text in texts])
+    print(f"encoded {len(texts)} chunks in {time.perf_counter() - start:.1f}s")
+    
+    with tempfile.TemporaryDirectory() as directory:
+        index = BM25Index(Path(directory) / "bm25.sqlite3")
+        start = time.perf_counter()
+        for begin in range(0, len(texts), 1000):
+            ids = [str(i) for i in range(begin, min(begin + 1000, len(texts)))]
+            index.add(ids, texts[begin:begin + 1000])
+        elapsed = time.perf_counter() - start
+        tokens = sum(len(tokenize(text)) for text in texts)
+        print(f"BM25 indexed {len(texts)} chunks ({tokens} tokens) in {elapsed:.1f}s "
+              f"({len(texts) / elapsed:.0f} chunks/s)\n")
+        
+        def dense(query, top_k):
+            scores = matrix @ encoder.encode(query)
+            top = np.argpartition(-scores, top_k)[:top_k]
+            return [int(i) for i in top[np.argsort(-scores[top])]]
+        
+        def keyword(query, top_k):
+            return [int(doc_id) for doc_id, _ in index.search(query, top_k)]
+        
+        def hybrid(vector_weight, keyword_weight):
+            def search(query, top_k):
+                depth = top_k * args.candidates
+                fused = reciprocal_rank_fusion(
+                    [dense(query, depth), keyword(query, depth)], [vector_weight, keyword_weight]
+                )
+                return [doc_id for doc_id, _ in fused[:top_k]]
+            return search
+        
+        retrievers = {
+            "dense": dense,
+            "bm25": keyword,
+            "hybrid 1:1": hybrid(1.0, 1.0),
+            "hybrid 2:1": hybrid(2.0, 1.0),
+            "hybrid 1:2": hybrid(1.0, 2.0),
+        }
+        k = args.top_k
+        print(f"{'retriever':>11} {'queries':>7} {f'recall@{k}':>9} {'p50 ms':>8} {'p95 ms':>8}")
+        for name, search in retrievers.items():
+            for label, queries in (("code", code_queries), ("topic", topic_queries)):
+                recall, p50, p95 = evaluate(queries, search, k)
+                print(f"{name:>11} {label:>7} {recall:>9.3f} {p50:>8.2f} {p95:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Peak Python memory of PDF ingestion: materialize-everything vs. the streamed pipeline.
+
+For synthetic text PDFs of increasing page counts, runs
+
+* ``buffered``: the previous flow - read the upload into memory, extract
+  the whole text, chunk it, then embed and index every chunk at once;
+* ``streamed``: spool the upload to disk block by block and run
+  ``ingest_pdf``, which extracts page by page, chunks incrementally and
+  embeds/indexes in batches of ``INGEST_INDEX_BATCH_SIZE`` chunks.
+
+Peak memory is measured with ``tracemalloc`` (Python allocations, numpy
+included), which also slows both flows down. The vector store is a stub
+that computes random embeddings of ``--dimension`` floats per chunk.
+
+Usage (from the backend directory):
+    python benchmarks/bench_ingest_memory.py --pages 100 500 1500
+"""
+import argparse
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from bench_pdf_extraction import synthetic_pages
+from evaluate import make_pdf
+from app.services import vectorstore
+from app.services.document_registry import DocumentRegistry
+from app.services.ingestion import ingest_pdf
+from app.utils.chunker import iter_chunks, estimate_token_counts
+from app.utils.config import CHUNK_TOKENS, INGEST_INDEX_BATCH_SIZE
+from app.utils.pdf_loader import extract_text_from_pdf, save_pdf_stream_to_disk
+
+
+class StubEmbeddingService:
+    """Token counting of a remote model without a local tokenizer."""
+    max_input_tokens = 8191
+    count_tokens = staticmethod(estimate_token_counts)
+
+
+class StubVectorStore:
+    """Embeds with random vectors and keeps only a count."""
+    
+    def __init__(self, dimension: int):
+        self.dimension = dimension
+        self.embedding_service = StubEmbeddingService()
+        self.documents = DocumentRegistry(Path(":memory:"))
+        self.rng = np.random.default_rng(0)
+        self.chunks = 0
+    
+    def add_documents(self, texts, metadatas=None, progress=None):
+        embeddings = self.rng.standard_normal((len(texts), self.dimension), dtype=np.float32)
+        self.chunks += len(embeddings)
+        return [str(i) for i in range(len(texts))]
+    
+    def update_metadata(self, ids, metadatas):
+        pass
+    
+    def delete(self, ids):
+        pass
+    
+    def count(self) -> int:
+        return self.chunks
+
+
+def buffered(upload: Path, directory: Path, store: StubVectorStore) -> int:
+    with open(upload, "rb") as f:
+        data = f.read()
+    (directory / "buffered.pdf").write_bytes(data)
+    chunks = [chunk["text"] for chunk in iter_chunks([(1, extract_text_from_pdf(data))], chunk_tokens=CHUNK_TOKENS)]
+    store.add_documents(chunks, [{"filename": "doc.pdf", "chunk_index": i} for i in range(len(chunks))])
+    return len(chunks)
+
+
+def streamed(upload: Path, directory: Path, store: StubVectorStore) -> int:
+    with open(upload, "rb") as f:
+        path = save_pdf_stream_to_disk(f, "streamed.pdf", directory)
+    return ingest_pdf(path, "doc.pdf")["chunks_count"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[100, 500, 1500])
+    parser.add_argument("--sentences", type=int, default=40, help="Sentences per page")
+    parser.add_argument("--dimension", type=int, default=1536, help="Embedding dimension")
+    args = parser.parse_args()
+    
+    rng = np.random.default_rng(0)
+    print(f"embedding dimension {args.dimension}, INGEST_INDEX_BATCH_SIZE={INGEST_INDEX_BATCH_SIZE}\n")
+    print(f"{'pages':>6} {'MB':>6} {'chunks':>7} {'buffered peak':>14} {'streamed peak':>14} {'buffered s':>11} {'streamed s':>11}")
+    with tempfile.TemporaryDirectory() as directory:
+        directory = Path(directory)
+        # Warm-up: first-use imports and caches would otherwise count against the first run
+        upload = directory / "upload.pdf"
+        upload.write_bytes(make_pdf(synthetic_pages(rng, 2, args.sentences)))
+        for flow in (buffered, streamed):
+            store = StubVectorStore(args.dimension)
+            vectorstore.get_vector_store = lambda tenant=None, store=store: store
+            flow(upload, directory, store)
+        
+        for pages in args.pages:
+            upload = directory / "upload.pdf"
+            upload.write_bytes(make_pdf(synthetic_pages(rng, pages, args.sentences), lines_per_page=1000))
+            results = {}
+            for name, flow in (("buffered", buffered), ("streamed", streamed)):
+                store = StubVectorStore(args.dimension)
+                vectorstore.get_vector_store = lambda tenant=None, store=store: store
+                tracemalloc.start()
+                start = time.perf_counter()
+                chunks = flow(upload, directory, store)
+                seconds = time.perf_counter() - start
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                assert store.chunks == chunks
+                results[name] = (chunks, peak / 1e6, seconds)
+            assert results["buffered"][0] == results["streamed"][0], "flows produced different chunk counts"
+            print(f"{pages:>6} {upload.stat().st_size / 1e6:>6.1f} {results['streamed'][0]:>7} "
+                  f"{results['buffered'][1]:>11.1f} MB {results['streamed'][1]:>11.1f} MB "
+                  f"{results['buffered'][2]:>11.1f} {results['streamed'][2]:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""PDF text extraction throughput (pages/sec) across backends and worker counts.
+
+Writes a synthetic text PDF (by default 500 pages of ~3,000 characters)
+and extracts it with ``extract_pages`` for every installed backend
+(PyMuPDF, pypdf, PyPDF2) and each worker count; ``workers=1`` is the
+previous serial, in-process behaviour. The worker pool is started before
+timing (its one-off start-up is reported separately), and every run is
+checked to return the same pages as the serial run.
+
+Usage (from the backend directory):
+    python benchmarks/bench_pdf_extraction.py --pages 500 --workers 1 2 4 8
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from evaluate import FILLER, make_pdf
+from app.utils.pdf_loader import available_pdf_backends, extract_pages, shutdown_pdf_workers
+
+
+def synthetic_pages(rng, pages: int, sentences: int):
+    weights = 1.0 / np.arange(1, len(FILLER) + 1)
+    weights /= weights.sum()
+    return [
+        " ".join(
+            " ".join(rng.choice(FILLER, int(rng.integers(8, 18)), p=weights)).capitalize() + "."
+            for _ in range(sentences)
+        ) + f" End of page {page + 1}."
+        for page in range(pages)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--sentences", type=int, default=40, help="Sentences per page")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--repeats", type=int, default=3, help="Best of this many runs")
+    args = parser.parse_args()
+    
+    rng = np.random.default_rng(0)
+    data = make_pdf(synthetic_pages(rng, args.pages, args.sentences), lines_per_page=1000)
+    backends = available_pdf_backends()
+    print(f"{args.pages} pages, {len(data) / 1e6:.1f} MB, {os.cpu_count()} CPUs; "
+          f"installed backends: {', '.join(backends)}\n")
+    
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "manual.pdf"
+        path.write_bytes(data)
+        
+        print(f"{'backend':>8} {'workers':>8} {'seconds':>8} {'pages/s':>9} {'speedup':>8}")
+        for backend in backends:
+            reference, serial = None, None
+            for workers in args.workers:
+                if workers > 1:
+                    # Start the pool (spawned processes import the app) outside the timing
+                    start = time.perf_counter()
+                    extract_pages(path, backend=backend, workers=workers)
+                    startup = time.perf_counter() - start
+                best = float("inf")
+                for _ in range(args.repeats):
+                    start = time.perf_counter()
+                    pages = extract_pages(path, backend=backend, workers=workers)
+                    best = min(best, time.perf_counter() - start)
+                if reference is None:
+                    reference, serial = pages, best
+                assert pages == reference, f"{backend} with {workers} workers returned different pages"
+                note = f"  (pool start + first run {startup:.2f}s)" if workers > 1 else ""
+                print(f"{backend:>8} {workers:>8} {best:>8.2f} {args.pages / best:>9.0f} {serial / best:>7.2f}x{note}")
+                shutdown_pdf_workers()
+        print(f"\nall runs returned the same {len(reference)} pages per backend")
+
+
+if __name__ == "__main__":
+    main()
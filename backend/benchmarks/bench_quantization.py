@@ -0,0 +1,129 @@
+"""Memory per million vectors and recall@k of quantized FAISS segments vs. float32.
+
+Builds a ``FaissSegmentStore`` per ``quantization`` ("none" is the float32
+baseline) on the same synthetic, clustered corpus and forces training and
+merging through ``compact()``. Each store is then reopened, as after a
+restart, and searched with each ``--rerank-factor`` (1 = no re-rank).
+
+Memory is reported per million vectors:
+
+* ``index MB/M``: size of the segment index files, which is what
+  ``FaissSegmentStore.memory_bytes`` counts against the tenant budget;
+* ``heap MB/M``: anonymous memory the reopened store added after the
+  searches (indexes FAISS cannot memory-map are loaded here);
+* ``mapped MB/M``: file-backed pages it mapped: memory-mapped indexes and
+  the rows of the float32 copy that re-ranking touched. These are page
+  cache the kernel can reclaim, and fault-around maps neighbouring pages
+  of a file that is already cached, so this over-counts re-ranking reads;
+* ``disk MB/M``: index files plus the exact float32 copy on disk.
+
+Recall@k is measured against an exact float32 search of the whole corpus.
+
+Usage (from the backend directory):
+    python benchmarks/bench_quantization.py --vectors 200000 --dimension 384
+    python benchmarks/bench_quantization.py --index-type hnsw --quantization none fp16 int8
+"""
+import argparse
+import gc
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from bench_faiss_ann import synthetic_corpus, recall
+from app.services.faiss_store import FaissSegmentStore, QUANTIZATIONS
+
+
+def resident_bytes() -> np.ndarray:
+    """Anonymous and file-backed resident memory of this process (Linux; zeros elsewhere)."""
+    sizes = {}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                name, _, value = line.partition(":")
+                if name in ("RssAnon", "RssFile"):
+                    sizes[name] = int(value.split()[0]) * 1024
+    except OSError:
+        pass
+    return np.array([sizes.get("RssAnon", 0), sizes.get("RssFile", 0)])
+
+
+def open_store(directory: Path, dimension: int, args, quantization: str) -> FaissSegmentStore:
+    return FaissSegmentStore(
+        directory, dimension, faiss, index_type=args.index_type, quantization=quantization,
+        pq_m=args.pq_m, min_train_vectors=args.vectors
+    )
+
+
+def build(directory: Path, vectors: np.ndarray, args, quantization: str):
+    store = open_store(directory, vectors.shape[1], args, quantization)
+    for start in range(0, len(vectors), 5000):
+        batch = vectors[start:start + 5000]
+        store.append(batch, [{} for _ in range(len(batch))])
+    store.wait_for_compaction()
+    store.compact()
+
+
+def search(store: FaissSegmentStore, queries: np.ndarray, top_k: int):
+    start = time.perf_counter()
+    found = [[row_id for _, row_id, _ in store.search(query[np.newaxis, :], top_k)[0]] for query in queries]
+    return found, (time.perf_counter() - start) / len(queries) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vectors", type=int, default=200000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--index-type", default="flat", choices=["flat", "ivf_flat", "hnsw"])
+    parser.add_argument("--quantization", nargs="+", default=list(QUANTIZATIONS), choices=QUANTIZATIONS)
+    parser.add_argument("--pq-m", type=int, default=48, help="PQ bytes per vector")
+    parser.add_argument("--rerank-factor", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+    
+    rng = np.random.default_rng(0)
+    vectors = synthetic_corpus(args.vectors, args.dimension, clusters=256, rng=rng)
+    queries = vectors[rng.choice(len(vectors), args.queries, replace=False)]
+    queries = queries + 0.1 * rng.standard_normal(queries.shape, dtype=np.float32)
+    faiss.normalize_L2(queries)
+    truth = [list(np.argsort(-row)[:args.top_k]) for row in queries @ vectors.T]
+    per_million = 1e6 / args.vectors / 2**20
+    
+    print(f"{args.vectors} vectors, dimension {args.dimension}, {args.index_type}, recall@{args.top_k}\n")
+    print(f"{'quantization':>12} {'build s':>8} {'index MB/M':>11} {'disk MB/M':>10} {'rerank':>7} "
+          f"{'recall':>7} {'ms/query':>9} {'heap MB/M':>10} {'mapped MB/M':>12}")
+    with tempfile.TemporaryDirectory() as root:
+        for quantization in args.quantization:
+            directory = Path(root) / quantization
+            start = time.perf_counter()
+            build(directory, vectors, args, quantization)
+            build_seconds = time.perf_counter() - start
+            gc.collect()
+            
+            before = resident_bytes()
+            store = open_store(directory, args.dimension, args, quantization)
+            index_mb = store.memory_bytes() * per_million
+            disk_mb = sum(path.stat().st_size for path in directory.glob("seg_*")) * per_million
+            for rerank_factor in args.rerank_factor:
+                # Re-ranking only applies to lossy segments: float32 is searched once
+                if rerank_factor > 1 and not any(segment.lossy for segment in store.segments):
+                    continue
+                store.rerank_factor = rerank_factor
+                found, latency = search(store, queries, args.top_k)
+                heap, mapped = (resident_bytes() - before) * per_million
+                print(f"{quantization:>12} {build_seconds:>8.1f} {index_mb:>11.1f} {disk_mb:>10.1f} "
+                      f"{f'x{rerank_factor}':>7} {recall(found, truth, args.top_k):>7.3f} {latency:>9.2f} "
+                      f"{heap:>10.1f} {mapped:>12.1f}")
+            del store
+            gc.collect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""Time-to-first-byte of /api/chat vs. the SSE /api/chat/stream endpoint.
+
+Starts a local fake OpenAI-compatible server that streams a fixed number
+of tokens with a per-token delay, points the app at it through
+``OPENAI_BASE_URL`` and serves the real FastAPI app with uvicorn. Retrieval
+is replaced by a stub vector store so only generation latency is measured.
+Also checks that closing a stream early makes the server stop generating.
+
+Requires the ``openai`` package (used by the app's OpenAI provider).
+
+Usage (from the backend directory):
+    python benchmarks/bench_stream_ttfb.py --tokens 200 --token-ms 10
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import numpy as np
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_fake_llm(tokens: int, first_token_ms: float, token_ms: float):
+    """Serve /v1/chat/completions like OpenAI; return (server, stats)."""
+    stats = {"completed": 0, "aborted": 0}
+    lock = threading.Lock()
+    
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+        
+        def log_message(self, *args):
+            pass
+        
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            if body.get("stream"):
+                self._stream()
+            else:
+                time.sleep((first_token_ms + tokens * token_ms) / 1000)
+                payload = json.dumps({
+                    "id": "fake", "object": "chat.completion", "created": 0, "model": "fake",
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": "tok " * tokens}}],
+                    "usage": {"prompt_tokens": 1, "completion_tokens": tokens, "total_tokens": tokens + 1},
+                }).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+                with lock:
+                    stats["completed"] += 1
+        
+        def _stream(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            time.sleep(first_token_ms / 1000)
+            try:
+                for i in range(tokens):
+                    if i:
+                        time.sleep(token_ms / 1000)
+                    chunk = json.dumps({
+                        "id": "fake", "object": "chat.completion.chunk", "created": 0, "model": "fake",
+                        "choices": [{"index": 0, "delta": {"content": "tok "}, "finish_reason": None}],
+                    })
+                    self._write_chunk(f"data: {chunk}\n\n".encode())
+                self._write_chunk(b"data: [DONE]\n\n")
+                self._write_chunk(b"")
+            except (BrokenPipeError, ConnectionResetError):
+                with lock:
+                    stats["aborted"] += 1
+                return
+            with lock:
+                stats["completed"] += 1
+        
+        def _write_chunk(self, data: bytes):
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+    
+    class Server(ThreadingHTTPServer):
+        # Default listen backlog (5) drops connections under concurrent load
+        request_queue_size = 1024
+        daemon_threads = True
+    
+    server = Server(("127.0.0.1", free_port()), Handler)
+    # Clients closing kept-alive connections is expected; don't print tracebacks
+    server.handle_error = lambda request, client_address: None
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stats
+
+
+class StubVectorStore:
+    """Answers retrieval instantly with fixed documents."""
+    
+    version = 0
+    tenant = "default"
+    
+    class embedding_service:
+        @staticmethod
+        async def aembed_query(question):
+            return [1.0] * 8
+        
+        @staticmethod
+        def embed_queries(questions):
+            return np.ones((len(questions), 8), dtype=np.float32)
+    
+    def count(self):
+        return 3
+    
+    def search(self, query, **kwargs):
+        return [
+            {"text": f"Document chunk {i} about the topic.", "metadata": {"filename": "doc.pdf", "chunk_index": i},
+             "score": 1.0 - i / 10}
+            for i in range(3)
+        ]
+    
+    def search_many(self, queries, **kwargs):
+        return [self.search(query) for query in queries]
+
+
+def start_app():
+    import uvicorn
+    import app.routes.chat as chat_routes
+    from app.main import app
+    
+    chat_routes.get_vector_store = lambda tenant=None: StubVectorStore()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=free_port(), log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{server.config.port}"
+
+
+def measure_blocking(client, base_url: str):
+    start = time.perf_counter()
+    response = client.post(f"{base_url}/api/chat", json={"question": "What is this about?"})
+    response.raise_for_status()
+    elapsed = time.perf_counter() - start
+    return elapsed, elapsed, elapsed
+
+
+def measure_stream(client, base_url: str):
+    start = time.perf_counter()
+    first_byte = first_token = None
+    with client.stream("POST", f"{base_url}/api/chat/stream", json={"question": "What is this about?"}) as response:
+        for line in response.iter_lines():
+            if first_byte is None:
+                first_byte = time.perf_counter() - start
+            if first_token is None and line == "event: token":
+                first_token = time.perf_counter() - start
+    return first_byte, first_token, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tokens", type=int, default=200)
+    parser.add_argument("--first-token-ms", type=float, default=300)
+    parser.add_argument("--token-ms", type=float, default=10)
+    parser.add_argument("--requests", type=int, default=10)
+    args = parser.parse_args()
+    
+    fake_llm, llm_stats = start_fake_llm(args.tokens, args.first_token_ms, args.token_ms)
+    os.environ.update({
+        "LLM_PROVIDER": "openai",
+        "USE_GEMINI": "false",
+        "OPENAI_API_KEY": "fake-key",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{fake_llm.server_port}/v1",
+        "ANSWER_CACHE_MAX_ENTRIES": "0",
+    })
+    base_url = start_app()
+    
+    import httpx
+    with httpx.Client(timeout=60) as client:
+        print(f"{args.tokens} tokens, first token after {args.first_token_ms:.0f} ms, "
+              f"{args.token_ms:.0f} ms/token, {args.requests} requests each\n")
+        print(f"{'endpoint':>17} {'TTFB ms':>9} {'1st token ms':>13} {'total ms':>9}")
+        for name, measure in (("/api/chat", measure_blocking), ("/api/chat/stream", measure_stream)):
+            runs = [measure(client, base_url) for _ in range(args.requests)]
+            ttfb, first_token, total = (statistics.median(col) * 1000 for col in zip(*runs))
+            print(f"{name:>17} {ttfb:>9.1f} {first_token:>13.1f} {total:>9.1f}")
+        
+        # Disconnect after the first token; the fake LLM should see the stream aborted
+        aborted_before = llm_stats["aborted"]
+        with client.stream("POST", f"{base_url}/api/chat/stream", json={"question": "Cancel me"}) as response:
+            for line in response.iter_lines():
+                if line == "event: token":
+                    break
+        deadline = time.time() + 5 + args.tokens * args.token_ms / 1000
+        while llm_stats["aborted"] == aborted_before and time.time() < deadline:
+            time.sleep(0.05)
+        print(f"\nupstream generation aborted after client disconnect: {llm_stats['aborted'] > aborted_before}")
+    
+    fake_llm.shutdown()
+
+
+if __name__ == "__main__":
+    main()
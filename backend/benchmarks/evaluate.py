@@ -0,0 +1,422 @@
+"""Offline evaluation: stage timings and retrieval quality on a synthetic corpus.
+
+Generates a reproducible corpus of multi-page PDFs in which every page
+states a few facts ("The launch year of the Velmora Kestrin is 1987."),
+plus one question per fact. Runs the app's own pipeline stages on it -
+PDF extraction, token-based chunking, embedding, FAISS + BM25 indexing, dense /
+BM25 / hybrid search and context assembly with a stub LLM - timing each
+one, and scores retrieval with Precision@k, Recall@k, MRR and NDCG@k
+against the chunks that contain each fact.
+
+Results are written as JSON (``--output``) so runs can be compared
+between commits; ``--baseline`` prints the differences to an earlier
+result file and flags regressions.
+
+The default embedder is a deterministic IDF-weighted hashed bag-of-words model, so no
+model download or API key is needed; ``--embedder service`` uses the
+configured embedding service instead.
+
+Usage (from the backend directory):
+    python benchmarks/evaluate.py --documents 20 --output results/eval.json
+    python benchmarks/evaluate.py --baseline results/eval.json
+"""
+import argparse
+import json
+import math
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from bench_hybrid_search import HashedEncoder
+from app.utils.pdf_loader import extract_pages
+from app.utils.chunker import iter_chunks
+from app.utils.context_builder import build_context
+from app.services.bm25_index import BM25Index, reciprocal_rank_fusion, tokenize
+from app.services.faiss_store import FaissSegmentStore
+
+# Targets from docs/EVALUATION.md
+TARGETS = {"precision": 0.8, "recall": 0.75, "mrr": 0.7, "ndcg": 0.8}
+
+ATTRIBUTES = [
+    "launch year", "chief engineer", "home port", "serial code", "maximum load",
+    "operating depth", "cruising speed", "primary sponsor", "reactor rating", "hull material",
+]
+FILLER = (
+    "the of and a to in is was for on with as by at from that this which system report section "
+    "data results analysis during project team design process model value review plan operation "
+    "performance control quality record maintenance schedule period level standard unit test"
+).split()
+SYLLABLES = ["ka", "lo", "mi", "ren", "tas", "vor", "zel", "qui", "dra", "nos", "bel", "tor", "fen", "sar", "ul"]
+
+
+def pseudo_word(rng, syllables: int) -> str:
+    return "".join(rng.choice(SYLLABLES, syllables))
+
+
+def synthetic_corpus(rng, documents: int, pages: int, facts_per_page: int):
+    """
+    Documents as lists of page texts, and one (question, answer, fact) per fact.
+    
+    Each (attribute, subject) pair is stated once, so each question has
+    exactly one fact; subjects, their first and last names and the
+    attributes all recur in other facts as distractors.
+    """
+    weights = 1.0 / np.arange(1, len(FILLER) + 1)
+    weights /= weights.sum()
+    # Small name pools: subjects share first or last names with distractor facts
+    pool = max(8, int(math.sqrt(documents * pages * facts_per_page)))
+    first_names = [pseudo_word(rng, 3).capitalize() for _ in range(pool)]
+    last_names = [pseudo_word(rng, 2).capitalize() for _ in range(pool)]
+    used = set()
+    corpus, qa_pairs = [], []
+    for d in range(documents):
+        page_texts = []
+        for _ in range(pages):
+            sentences = []
+            for _ in range(facts_per_page):
+                while True:
+                    subject = f"{rng.choice(first_names)} {rng.choice(last_names)}"
+                    attribute = ATTRIBUTES[int(rng.integers(len(ATTRIBUTES)))]
+                    if (subject, attribute) not in used:
+                        used.add((subject, attribute))
+                        break
+                value = str(int(rng.integers(1000, 9999))) if rng.random() < 0.5 else pseudo_word(rng, 3).capitalize()
+                fact = f"The {attribute} of the {subject} is {value}."
+                qa_pairs.append({
+                    "question": f"What is the {attribute} of the {subject}?",
+                    "answer": value,
+                    "fact": fact,
+                    "filename": f"doc{d}.pdf"
+                })
+                sentences.append(fact)
+            for _ in range(30):
+                words = rng.choice(FILLER, int(rng.integers(8, 18)), p=weights)
+                sentences.append(" ".join(words).capitalize() + ".")
+            rng.shuffle(sentences)
+            page_texts.append(" ".join(sentences))
+        corpus.append({"filename": f"doc{d}.pdf", "pages": page_texts})
+    return corpus, qa_pairs
+
+
+def make_pdf(page_texts, line_chars: int = 90, lines_per_page: int = 60) -> bytes:
+    """Minimal single-font PDF; long pages continue on extra PDF pages."""
+    pages = []
+    for text in page_texts:
+        lines, line = [], ""
+        for word in text.split():
+            if line and len(line) + len(word) + 1 > line_chars:
+                lines.append(line)
+                line = word
+            else:
+                line = f"{line} {word}" if line else word
+        lines.append(line)
+        for start in range(0, len(lines), lines_per_page):
+            pages.append(lines[start:start + lines_per_page])
+    
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_refs = []
+    for lines in pages:
+        escaped = [line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") for line in lines]
+        stream = "BT /F1 10 Tf 12 TL 40 800 Td " + " ".join(f"({line}) Tj T*" for line in escaped) + " ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>"
+        )
+        page_refs.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(page_refs)}] /Count {len(page_refs)} >>"
+    
+    out, offsets = bytearray(b"%PDF-1.4\n"), []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+def ranking_metrics(ranked, relevant: set, k: int) -> dict:
+    """Precision@k, Recall@k, reciprocal rank and NDCG@k with binary relevance."""
+    top = ranked[:k]
+    hits = [doc_id in relevant for doc_id in top]
+    first = next((i for i, hit in enumerate(hits) if hit), None)
+    dcg = sum(1 / math.log2(i + 2) for i, hit in enumerate(hits) if hit)
+    ideal = sum(1 / math.log2(i + 2) for i in range(min(len(relevant), k)))
+    return {
+        "precision": sum(hits) / k,
+        "recall": sum(hits) / len(relevant),
+        "mrr": 0.0 if first is None else 1 / (first + 1),
+        "ndcg": dcg / ideal if ideal else 0.0
+    }
+
+
+def summarize(values) -> dict:
+    values = np.asarray(values, dtype=np.float64)
+    return {
+        "mean": round(float(values.mean()), 3),
+        "p50": round(float(np.percentile(values, 50)), 3),
+        "p95": round(float(np.percentile(values, 95)), 3)
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).parent
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class IdfHashedEmbedder:
+    """
+    Hashed word vectors weighted by IDF over the corpus.
+    
+    Without the weighting, filler words dominate every chunk vector; real
+    embedding models largely ignore them too.
+    """
+    
+    def __init__(self, dimension: int, seed: int, corpus):
+        self.encoder = HashedEncoder(dimension, seed=seed)
+        frequency = Counter(token for text in corpus for token in set(tokenize(text)))
+        self.idf = {token: math.log(len(corpus) / count) for token, count in frequency.items()}
+        self.default_idf = math.log(len(corpus) or 1)
+    
+    def embed(self, texts) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.encoder.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in tokenize(text):
+                vectors[row] += self.idf.get(token, self.default_idf) * self.encoder._word(token)
+        return vectors
+
+
+class StubLLM:
+    """Stands in for the provider: answers with the context sentence that best matches the question."""
+    
+    def __init__(self, latency_ms: float):
+        self.latency = latency_ms / 1000
+    
+    def generate(self, question: str, context: str) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+        words = set(tokenize(question))
+        sentences = context.replace("\n", " ").split(". ")
+        return max(sentences, key=lambda sentence: len(words & set(tokenize(sentence))))
+
+
+MIN_COMPARED_MS = 20  # Faster stages are too noisy to flag
+
+
+def compare(result: dict, baseline: dict, tolerance: float, time_tolerance: float) -> int:
+    """Print metric/timing differences to a baseline; return the number of regressions."""
+    print(f"\ncompared with {baseline['meta'].get('commit') or 'baseline'} "
+          f"(tolerance {tolerance:.0%} for quality, {time_tolerance:.0%} for timings):")
+    regressions = 0
+    for mode, metrics in result["retrieval"].items():
+        for name, value in metrics["quality"].items():
+            old = baseline["retrieval"].get(mode, {}).get("quality", {}).get(name)
+            if old is None:
+                continue
+            worse = value < old - tolerance * max(old, 1e-9)
+            regressions += worse
+            print(f"  {mode:>7} {name:>9} {old:>8.3f} -> {value:>8.3f}{'  REGRESSION' if worse else ''}")
+    for stage, timing in result["stages"].items():
+        old = baseline["stages"].get(stage, {}).get("ms")
+        if old is None:
+            continue
+        worse = old >= MIN_COMPARED_MS and timing["ms"] > old * (1 + time_tolerance)
+        regressions += worse
+        print(f"  {stage:>17} {old:>9.1f} ms -> {timing['ms']:>9.1f} ms{'  REGRESSION' if worse else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=5, help="Pages per document")
+    parser.add_argument("--facts-per-page", type=int, default=3)
+    parser.add_argument("--questions", type=int, default=0, help="Evaluate at most this many questions (0 = all)")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--candidates", type=int, default=4, help="Hybrid candidates per retriever = top_k * this")
+    parser.add_argument("--embedder", choices=["hashed", "service"], default="hashed")
+    parser.add_argument("--dimension", type=int, default=256, help="Hashed embedder dimension")
+    parser.add_argument("--llm-ms", type=float, default=0, help="Stub LLM latency per answer")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="Write results JSON here")
+    parser.add_argument("--baseline", type=Path, help="Earlier results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.02, help="Relative quality drop counted as a regression")
+    parser.add_argument("--time-tolerance", type=float, default=0.5, help="Relative slowdown counted as a regression")
+    args = parser.parse_args()
+    
+    rng = np.random.default_rng(args.seed)
+    corpus, qa_pairs = synthetic_corpus(rng, args.documents, args.pages, args.facts_per_page)
+    if args.questions:
+        qa_pairs = [qa_pairs[i] for i in sorted(rng.choice(len(qa_pairs), min(args.questions, len(qa_pairs)), replace=False))]
+    stages = {}
+    
+    def record(stage: str, seconds: float, count: int, unit: str):
+        stages[stage] = {"ms": round(seconds * 1000, 1), unit: count, f"{unit}_per_s": round(count / seconds, 1) if seconds else None}
+    
+    pdfs = [(doc["filename"], make_pdf(doc["pages"])) for doc in corpus]
+    start = time.perf_counter()
+    texts = [(filename, extract_pages(pdf)) for filename, pdf in pdfs]
+    record("pdf_extraction", time.perf_counter() - start, args.documents * args.pages, "pages")
+    
+    start = time.perf_counter()
+    chunks = [
+        (filename, index, chunk["text"])
+        for filename, pages in texts for index, chunk in enumerate(iter_chunks(pages))
+    ]
+    record("chunking", time.perf_counter() - start, len(chunks), "chunks")
+    
+    # Ground truth: chunks that contain the whole fact sentence
+    flat = [" ".join(chunk.split()) for _, _, chunk in chunks]
+    relevant = []
+    for qa in qa_pairs:
+        relevant.append({i for i, text in enumerate(flat) if qa["fact"] in text and chunks[i][0] == qa["filename"]})
+    answerable = [i for i, ids in enumerate(relevant) if ids]
+    
+    if args.embedder == "hashed":
+        embed = IdfHashedEmbedder(args.dimension, args.seed, [chunk for _, _, chunk in chunks]).embed
+    else:
+        from app.services.embedding import get_embedding_service
+        service = get_embedding_service()
+        embed = service.embed_documents
+    
+    start = time.perf_counter()
+    matrix = np.ascontiguousarray(embed([chunk for _, _, chunk in chunks]), dtype=np.float32)
+    record("embedding", time.perf_counter() - start, len(chunks), "chunks")
+    
+    import faiss
+    with tempfile.TemporaryDirectory() as directory:
+        store = FaissSegmentStore(Path(directory) / "faiss", matrix.shape[1], faiss)
+        keyword_index = BM25Index(Path(directory) / "bm25.sqlite3")
+        start = time.perf_counter()
+        faiss.normalize_L2(matrix)
+        row_ids = store.append(matrix, [
+            {"id": str(i), "text": chunk, "filename": filename, "chunk_index": index}
+            for i, (filename, index, chunk) in enumerate(chunks)
+        ])
+        keyword_index.add([str(i) for i in range(len(chunks))], [chunk for _, _, chunk in chunks],
+                          [filename for filename, _, _ in chunks])
+        record("indexing", time.perf_counter() - start, len(chunks), "chunks")
+        
+        questions = [qa_pairs[i]["question"] for i in answerable]
+        start = time.perf_counter()
+        query_matrix = np.ascontiguousarray(embed(questions), dtype=np.float32)
+        faiss.normalize_L2(query_matrix)
+        record("query_embedding", time.perf_counter() - start, len(questions), "queries")
+        
+        depth = args.top_k * args.candidates
+        
+        def dense(q):
+            return [int(metadata["id"]) for _, _, metadata in store.search(query_matrix[q:q + 1], depth)[0]]
+        
+        def keyword(q):
+            return [int(doc_id) for doc_id, _ in keyword_index.search(questions[q], depth)]
+        
+        def hybrid(q):
+            fused = reciprocal_rank_fusion([dense(q), keyword(q)], [1.0, 1.0])
+            return [doc_id for doc_id, _ in fused]
+        
+        retrieval, rankings = {}, {}
+        for mode, search in (("dense", dense), ("bm25", keyword), ("hybrid", hybrid)):
+            latencies, scores = [], []
+            for q, qa_index in enumerate(answerable):
+                start = time.perf_counter()
+                ranked = search(q)
+                latencies.append((time.perf_counter() - start) * 1000)
+                scores.append(ranking_metrics(ranked, relevant[qa_index], args.top_k))
+            rankings[mode] = ranked
+            quality = {name: round(float(np.mean([s[name] for s in scores])), 4) for name in TARGETS}
+            retrieval[mode] = {
+                "quality": quality,
+                "latency_ms": summarize(latencies),
+                "meets_targets": {name: quality[name] >= target for name, target in TARGETS.items()}
+            }
+        
+        # Generation: context assembly + stub LLM over the hybrid top-k
+        llm = StubLLM(args.llm_ms)
+        latencies, context_tokens, answer_hits, saved = [], [], 0, 0
+        for q, qa_index in enumerate(answerable):
+            docs = [
+                {"text": chunks[i][2], "metadata": {"filename": chunks[i][0], "chunk_index": chunks[i][1]}}
+                for i in hybrid(q)[:args.top_k]
+            ]
+            start = time.perf_counter()
+            context, stats = build_context(docs)
+            answer = llm.generate(questions[q], context)
+            latencies.append((time.perf_counter() - start) * 1000)
+            context_tokens.append(stats["tokens_after"])
+            saved += stats["tokens_saved"]
+            answer_hits += qa_pairs[qa_index]["answer"] in answer
+        stages["generation"] = {
+            "ms": round(sum(latencies), 1),
+            "queries": len(latencies),
+            "latency_ms": summarize(latencies),
+            "context_tokens": summarize(context_tokens),
+            "tokens_saved": saved,
+            "answer_accuracy": round(answer_hits / len(answerable), 4)
+        }
+    
+    result = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": {key: str(value) if isinstance(value, Path) else value for key, value in vars(args).items()}
+        },
+        "corpus": {
+            "documents": args.documents,
+            "pages": args.documents * args.pages,
+            "chunks": len(chunks),
+            "questions": len(qa_pairs),
+            "answerable_questions": len(answerable)
+        },
+        "stages": stages,
+        "retrieval": retrieval,
+        "targets": TARGETS
+    }
+    
+    print(f"{args.documents} documents, {len(chunks)} chunks, {len(answerable)}/{len(qa_pairs)} answerable questions\n")
+    for stage, timing in stages.items():
+        rate = next((f"{value:,.0f} {key.replace('_per_s', '')}/s" for key, value in timing.items() if key.endswith("_per_s") and value), "")
+        print(f"  {stage:>17} {timing['ms']:>9.1f} ms  {rate}")
+    k = args.top_k
+    print(f"\n  {'mode':>7} {f'P@{k}':>7} {f'R@{k}':>7} {'MRR':>7} {f'NDCG@{k}':>7} {'p50 ms':>8} {'p95 ms':>8}")
+    for mode, metrics in retrieval.items():
+        quality, latency = metrics["quality"], metrics["latency_ms"]
+        print(f"  {mode:>7} {quality['precision']:>7.3f} {quality['recall']:>7.3f} {quality['mrr']:>7.3f} "
+              f"{quality['ndcg']:>7.3f} {latency['p50']:>8.2f} {latency['p95']:>8.2f}")
+    generation = stages["generation"]
+    print(f"\n  stub answers containing the expected value: {generation['answer_accuracy']:.1%}, "
+          f"context tokens p50 {generation['context_tokens']['p50']:.0f}")
+    
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(result, indent=2))
+        print(f"\nresults written to {args.output}")
+    if args.baseline:
+        regressions = compare(
+            result, json.loads(args.baseline.read_text()), args.tolerance, args.time_tolerance
+        )
+        if regressions:
+            print(f"\n{regressions} regression(s)")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
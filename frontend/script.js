@@ -76,19 +76,36 @@ async function handleUpload() {
         const data = await response.json();
 
         if (response.ok) {
-            showStatus(
-                `✓ PDF uploaded successfully! Processed ${data.chunks_count} chunks.`,
-                'success'
-            );
-            
-            // Enable chat
-            questionInput.disabled = false;
-            sendBtn.disabled = false;
-            
-            // Clear welcome message and show success
-            clearWelcomeMessage();
-            addMessage('ai', 'System', `PDF "${data.filename}" has been uploaded and processed. You can now ask questions about it!`);
-            
+            let job;
+            if (data.status === 'skipped') {
+                // Same content is already indexed; nothing was queued
+                job = { status: 'completed', filename: data.filename, chunks_count: data.chunks_count, skipped: true };
+            } else {
+                // Ingestion runs in the background; poll the job until it finishes
+                showStatus('PDF uploaded. Waiting for processing to start...', 'info');
+                job = await waitForJob(data.job_id);
+            }
+
+            if (job.status === 'completed') {
+                showStatus(
+                    job.skipped
+                        ? `✓ This PDF is already indexed as "${job.filename}" (${job.chunks_count} chunks).`
+                        : `✓ PDF uploaded successfully! Processed ${job.chunks_count} chunks.`,
+                    'success'
+                );
+
+                // Enable chat
+                questionInput.disabled = false;
+                sendBtn.disabled = false;
+
+                // Clear welcome message and show success
+                clearWelcomeMessage();
+                addMessage('ai', 'System', `PDF "${job.filename}" has been uploaded and processed. You can now ask questions about it!`);
+            } else {
+                showStatus(`Error: ${job.error || 'Failed to process PDF'}`, 'error');
+                uploadBtn.disabled = false;
+            }
+
             // Reset upload button
             uploadBtn.textContent = 'Upload PDF';
         } else {
@@ -103,6 +120,33 @@ async function handleUpload() {
     }
 }
 
+async function waitForJob(jobId) {
+    const stageLabels = {
+        queued: 'Waiting in queue',
+        extract: 'Extracting text',
+        embed: 'Generating embeddings',
+        index: 'Indexing'
+    };
+
+    while (true) {
+        const response = await fetch(`${API_BASE_URL}/jobs/${jobId}`);
+        const job = await response.json();
+
+        if (!response.ok) {
+            throw new Error(job.detail || 'Failed to get job status');
+        }
+        if (job.status === 'completed' || job.status === 'failed') {
+            return job;
+        }
+
+        const label = stageLabels[job.stage] || 'Processing';
+        const counts = job.progress_total ? ` (${job.progress_done}/${job.progress_total})` : '';
+        showStatus(`${label}${counts}...`, 'info');
+
+        await new Promise(resolve => setTimeout(resolve, 1000));
+    }
+}
+
 async function handleSendQuestion() {
     const question = questionInput.value.trim();
     
@@ -128,7 +172,7 @@ async function handleSendQuestion() {
     questionInput.value = '';
 
     try {
-        const response = await fetch(`${API_BASE_URL}/chat`, {
+        const response = await fetch(`${API_BASE_URL}/chat/stream`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
@@ -136,17 +180,23 @@ async function handleSendQuestion() {
             body: JSON.stringify({ question })
         });
 
-        const data = await response.json();
-
         if (response.ok) {
-            addMessage('ai', 'AI Assistant', data.answer);
-            
-            // Optionally show sources
-            if (data.sources && data.sources.length > 0) {
-                const sourcesText = `\n\n📚 Sources (${data.sources.length}):\n${data.sources.map((s, i) => `• ${s.text.substring(0, 100)}...`).join('\n')}`;
-                // You can add this as a separate message or include in the main message
-            }
+            // Render the answer as tokens arrive
+            const content = addMessage('ai', 'AI Assistant', '');
+            let answer = '';
+            await readEventStream(response, (event, data) => {
+                if (event === 'token') {
+                    answer += data.text;
+                    content.textContent = answer;
+                    chatMessages.scrollTop = chatMessages.scrollHeight;
+                } else if (event === 'done') {
+                    content.textContent = data.answer;
+                } else if (event === 'error') {
+                    content.textContent = answer ? `${answer}\n\n${data.detail}` : data.detail;
+                }
+            });
         } else {
+            const data = await response.json();
             addMessage('ai', 'Error', data.detail || 'Failed to get response');
         }
     } catch (error) {
@@ -165,6 +215,40 @@ async function handleSendQuestion() {
     }
 }
 
+async function readEventStream(response, onEvent) {
+    // Minimal Server-Sent Events parser over a fetch() body (EventSource cannot POST)
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) {
+            break;
+        }
+        buffer += decoder.decode(value, { stream: true });
+        
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const block = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            
+            let event = 'message';
+            let data = '';
+            for (const line of block.split('\n')) {
+                if (line.startsWith('event: ')) {
+                    event = line.slice(7);
+                } else if (line.startsWith('data: ')) {
+                    data += line.slice(6);
+                }
+            }
+            if (data) {
+                onEvent(event, JSON.parse(data));
+            }
+        }
+    }
+}
+
 function addMessage(type, sender, content) {
     clearWelcomeMessage();
     
@@ -180,6 +264,8 @@ function addMessage(type, sender, content) {
     
     // Scroll to bottom
     chatMessages.scrollTop = chatMessages.scrollHeight;
+    
+    return messageDiv.querySelector('.message-content');
 }
 
 function clearWelcomeMessage() {